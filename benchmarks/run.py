@@ -0,0 +1,271 @@
+"""Benchmarks of the service layer against on-disk SQLite databases.
+
+Run one or several deck sizes and store the results as JSON:
+
+    python -m benchmarks.run --sizes 10000,100000 --out results.json
+
+and compare them against a stored baseline:
+
+    python -m benchmarks.run --sizes 10000 --baseline baseline.json --threshold 0.2
+
+Each size runs in its own process since the engine is bound to one
+database file per process."""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from src.db import config, services, synthetic
+from src.db.cache import cache
+from src.db.config import setup_config
+from src.db.sampler import sampler
+from src.db.tables import init_db
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_THEMES = 20
+DEFAULT_ITERATIONS = 200
+DEFAULT_THRESHOLD = 0.2
+ANSWERS_PER_BATCH = 10
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of values."""
+    ordered = sorted(values)
+    # The rank is rounded up, `round` would round half to even
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies (in seconds) as ops/sec and p50/p99 in ms."""
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else float("inf"),
+        "mean_ms": 1000 * statistics.fmean(latencies),
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+    }
+
+
+def measure(
+    func: Callable, iterations: int, setup: Optional[Callable] = None
+) -> Dict[str, float]:
+    """Time `iterations` calls of func, `setup` runs untimed before each."""
+    latencies = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def seed(n_cards: int, n_themes: int, rng: random.Random):
+    """Fill the configured database with a synthetic deck and a year of stats."""
+    summary = synthetic.generate(n_cards, n_themes, seed=rng.randrange(2**32))
+    return summary["theme_ids"]
+
+
+def run_size(
+    n_cards: int, n_themes: int, iterations: int, database: Optional[str]
+) -> Dict[str, Dict]:
+    """Seed a database of `n_cards` cards and benchmark the services."""
+    rng = random.Random(n_cards)
+    directory = None
+    if database is None:
+        directory = tempfile.TemporaryDirectory(prefix="flashcards-bench-")
+        database = os.path.join(directory.name, "bench.db")
+
+    try:
+        setup_config(database)
+        init_db()
+        start = time.perf_counter()
+        theme_ids = seed(n_cards, n_themes, rng)
+        seed_time = time.perf_counter() - start
+        max_id = services.get_number_of_cards()
+        first, last = datetime.today() - timedelta(days=365), datetime.today()
+
+        results = {
+            "create_card": measure(
+                lambda: services.create_card("Question", "Réponse", 0.5, theme_ids[0]),
+                iterations,
+            ),
+            # Clear the read cache so the database is actually queried
+            "get_cards_by_theme": measure(
+                lambda: services.get_cards_by_theme(rng.choice(theme_ids)),
+                max(1, iterations // 10),
+                setup=cache.clear,
+            ),
+            "update_card_probability": measure(
+                lambda: services.update_card_probability(
+                    rng.randint(1, max_id), rng.random() < 0.5
+                ),
+                iterations,
+            ),
+            "update_stats": measure(
+                lambda: services.update_stats(rng.random() < 0.5), iterations
+            ),
+            # A batch as written by the write-behind mode
+            "record_answers": measure(
+                lambda: services.record_answers(
+                    (rng.randint(1, max_id), rng.random() < 0.5, datetime.now())
+                    for _ in range(ANSWERS_PER_BATCH)
+                ),
+                iterations,
+            ),
+            "record_answer": measure(
+                lambda: services.record_answer(
+                    rng.randint(1, max_id), rng.random() < 0.5
+                ),
+                iterations,
+            ),
+            "get_stats": measure(
+                lambda: services.get_stats(first, last), iterations, setup=cache.clear
+            ),
+            "sample_card": measure(
+                lambda: services.sample_card(theme_ids[:3], rng=rng),
+                iterations,
+                setup=cache.clear,
+            ),
+            "sample_card_cold": measure(
+                lambda: services.sample_card(theme_ids[:3], rng=rng),
+                max(1, iterations // 10),
+                setup=sampler.invalidate,
+            ),
+            "draw_card": measure(lambda: services.draw_card(theme_ids[:3]), iterations),
+        }
+        return {"seed_seconds": seed_time, "services": results}
+    finally:
+        if directory is not None:
+            config.engine.dispose()
+            directory.cleanup()
+
+
+def compare(
+    results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD
+) -> List[str]:
+    """List the regressions of results against a baseline.
+
+    A benchmark regresses when its ops/sec drops, or its p99 latency grows,
+    by more than `threshold` (a fraction) compared to the baseline."""
+    regressions = []
+    for size, current in results.get("sizes", {}).items():
+        reference = baseline.get("sizes", {}).get(size)
+        if reference is None:
+            continue
+        for name, stats in current["services"].items():
+            ref = reference["services"].get(name)
+            if ref is None:
+                continue
+            if stats["ops_per_sec"] < ref["ops_per_sec"] * (1 - threshold):
+                regressions.append(
+                    f"{size} cards, {name}: {stats['ops_per_sec']:.0f} ops/s "
+                    f"vs {ref['ops_per_sec']:.0f} ops/s in the baseline"
+                )
+            if stats["p99_ms"] > ref["p99_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{size} cards, {name}: p99 {stats['p99_ms']:.2f} ms "
+                    f"vs {ref['p99_ms']:.2f} ms in the baseline"
+                )
+    return regressions
+
+
+def _metadata() -> Dict[str, str]:
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def _run_in_subprocess(args, n_cards: int) -> Dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as output:
+        path = output.name
+    try:
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.run",
+            "--single",
+            str(n_cards),
+            "--themes",
+            str(args.themes),
+            "--iterations",
+            str(args.iterations),
+            "--out",
+            path,
+        ]
+        subprocess.run(command, check=True)
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)["sizes"][str(n_cards)]
+    finally:
+        os.remove(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the service layer.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma separated numbers of cards",
+    )
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--themes", type=int, default=DEFAULT_THEMES)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.single is not None:
+        sizes = {
+            str(args.single): run_size(args.single, args.themes, args.iterations, None)
+        }
+    else:
+        sizes = {}
+        for n_cards in (int(size) for size in args.sizes.split(",")):
+            print(f"Benchmarking {n_cards} cards...", file=sys.stderr)
+            sizes[str(n_cards)] = _run_in_subprocess(args, n_cards)
+
+    results = {"meta": _metadata(), "sizes": sizes}
+    with open(args.out, "w", encoding="utf-8") as stream:
+        json.dump(results, stream, indent=2)
+
+    if args.single is not None:
+        return 0
+
+    for size, result in sizes.items():
+        print(f"\n{size} cards (seeded in {result['seed_seconds']:.1f}s)")
+        for name, stats in result["services"].items():
+            print(
+                f"  {name:<24} {stats['ops_per_sec']:>10.0f} ops/s"
+                f"  p50 {stats['p50_ms']:>8.3f} ms  p99 {stats['p99_ms']:>8.3f} ms"
+            )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as stream:
+            regressions = compare(results, json.load(stream), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""Coroutine twins of the services, on SQLAlchemy asyncio and aiosqlite.
+
+The async engine needs the optional aiosqlite driver, and greenlet for
+`run_sync`, both in the `async` extra:
+
+    poetry install -E async
+
+Each coroutine runs the body of the matching synchronous service on an
+`AsyncSession` with `run_sync`: the statements are the very same, and the
+cache versions and the card sampler stay shared with `services`. Callers
+await the database instead of holding a thread per request."""
+
+import asyncio
+import importlib.util
+import logging
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, List, Optional
+
+from sqlalchemy import and_, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+
+from src.db import config, contention, services
+from src.db.cache import acached, cache
+from src.db.sampler import sampler
+from src.db.services import CARD_CONTENTS, CARDS, DAY, STATS, THEMES
+from src.db.tables import (
+    Card,
+    Stat,
+    Theme,
+    add_row,
+    count_rows,
+    create_schema,
+    delete_row,
+    get_all_rows,
+    get_row_by,
+    get_row_by_id,
+    seed_themes,
+    update_row,
+)
+
+logging.debug("Async services module loaded.")
+
+engine = None
+SessionFactory = None  # Async session factory bound to `engine`
+_lock = None  # Serializes the sessions sharing the single in-memory connection
+
+
+def setup_async_config(path: str | None = None, pool: dict | None = None):
+    """Set up the async engine, on the database of `config` by default.
+    The PRAGMAs of `config` are applied to its connections too.
+    :param path: The path to the database file.
+    :param pool: Pool options overriding `config.DEFAULT_POOL` (file databases only).
+    """
+    global engine
+    global SessionFactory
+    global _lock
+
+    if importlib.util.find_spec("aiosqlite") is None:
+        raise ImportError("The async services need aiosqlite: poetry install -E async")
+
+    path = path or config.DATABASE_PATH
+    pool_options = {}
+    if path != ":memory:":
+        pool_options = {**config.DEFAULT_POOL, **(pool or {})}
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **pool_options)
+    # The events are attached to the synchronous engine proxied by the async one
+    event.listen(engine.sync_engine, "connect", config._apply_pragmas)
+    if path != ":memory:":
+        config.listen_transactions(engine.sync_engine)
+    SessionFactory = async_sessionmaker(engine, expire_on_commit=False)
+    _lock = asyncio.Lock() if path == ":memory:" else None
+    logging.debug("Async database configuration initialized.")
+
+
+async def dispose():
+    """Close the connections of the async engine."""
+    if engine is not None:
+        await engine.dispose()
+
+
+async def init_async_db():
+    """Create the schema and the predefined themes through the async engine."""
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(create_schema)
+        async with SessionFactory() as session:
+            await session.run_sync(seed_themes)
+    except SQLAlchemyError as e:
+        logging.error(f"An error occured during table creation: {e}")
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Provide an async session, e.g. for ad hoc queries."""
+    async with SessionFactory() as session:
+        yield session
+
+
+async def _run(func: Callable, *args, **kwargs):
+    """Run the body of a service decorated with `get_session` on an async
+    session, handling errors like the decorator does: transactions failing
+    on the lock of another connection are retried following
+    `contention.policy`, and writes are run by the single writer when it is
+    enabled."""
+    if getattr(func, "write", False) and contention.writer.enabled:
+        # The writer thread owns its connection, wait for it off the loop
+        return await asyncio.to_thread(func, *args, **kwargs)
+    body = func.__wrapped__
+    delays = contention.policy.delays()
+    while True:
+        async with _lock or nullcontext(), SessionFactory() as session:
+            try:
+                return await session.run_sync(
+                    lambda sync_session: body(*args, session=sync_session, **kwargs)
+                )
+            except SQLAlchemyError as e:
+                await session.rollback()
+                if not contention.is_busy(e):
+                    logging.error(
+                        f"An error occured while execution on the database: {e}"
+                    )
+                    return None
+                delay = next(delays, None)
+                if delay is None:
+                    contention.stats.record_failure()
+                    logging.error(f"The database is still locked, giving up: {e}")
+                    return None
+            except Exception as e:
+                await session.rollback()
+                logging.error(f"Unexpected error occured: {e}")
+                return None
+        contention.stats.record_retry(delay)
+        logging.warning(f"The database is locked, retry in {delay:.3f} s")
+        await asyncio.sleep(delay)
+
+
+# --- CRUD operations for the Card entity ---
+
+
+async def create_card(
+    question: str, reponse: str, probabilite: float, id_theme: int
+) -> Card | None:
+    """Create a new card in the database.
+    :param question: The question of the card.
+    :param reponse: The answer to the question.
+    :param probabilite: The probability of the card.
+    :param id_theme: The ID of the theme."""
+    new_card = await _run(
+        services._create_card,
+        question=question,
+        reponse=reponse,
+        probabilite=probabilite,
+        id_theme=id_theme,
+    )
+    cache.bump(CARDS)
+    if new_card is not None:
+        sampler.set_weight(new_card.id, id_theme, probabilite)
+        logging.info(f"Card '{question}' created.")
+    return new_card
+
+
+async def create_cards(cards: Iterable[dict]) -> int | None:
+    """Create cards in bulk, with a single executemany in one transaction.
+    :param cards: Dicts with the question, reponse, probabilite and id_theme.
+    :return: The number of created cards, None if the transaction failed."""
+    cards = list(cards)
+    counter = await _run(services._create_cards, cards=cards)
+    cache.bump(CARDS)
+    if counter is not None:
+        for id_theme in {card["id_theme"] for card in cards}:
+            sampler.invalidate(id_theme)
+        logging.info(f"{counter} card(s) created.")
+    return counter
+
+
+@acached(CARDS)
+async def get_card(id: int) -> Card | None:
+    """Get a card by its ID.
+    :param id: The ID of the card."""
+    return await _run(get_row_by_id, table=Card, id=id)
+
+
+async def get_cards(ids: Iterable[int]) -> List[Card] | None:
+    """Get several cards with a single query.
+    :param ids: The IDs of the cards.
+    :return: The cards found, in the order of `ids`."""
+    ids = list(ids)
+    if not ids:
+        return []
+    return await _run(services._get_cards, ids=ids)
+
+
+async def update_card(
+    id: int, question: str, reponse: str, probabilite: float, id_theme: int
+) -> Card | None:
+    """Update a card in the database.
+    :param id: The ID of the card.
+    :param question: The question of the card.
+    :param reponse: The answer to the question.
+    :param probabilite: The probability of the card.
+    :param id_theme: The ID of the theme."""
+    card = await _run(
+        services._update_card,
+        id=id,
+        question=question,
+        reponse=reponse,
+        probabilite=probabilite,
+        id_theme=id_theme,
+    )
+    cache.bump(CARDS, CARD_CONTENTS)
+    if card is not None:
+        sampler.set_weight(id, id_theme, probabilite)
+        logging.info(f"Card {id} updated")
+    return card
+
+
+async def delete_card(id: int):
+    """Delete a card from the database.
+    :param id: The ID of the card."""
+    await _run(delete_row, table=Card, id=id)
+    cache.bump(CARDS, CARD_CONTENTS)
+    sampler.remove(id)
+    logging.info(f"Card {id} deleted")
+
+
+@acached(CARDS)
+async def get_all_cards() -> List[Card] | None:
+    """Get all cards from the database."""
+    return await _run(get_all_rows, table=Card)
+
+
+@acached(CARDS)
+async def get_number_of_cards() -> int | None:
+    """Get the number of cards in the database."""
+    return await _run(count_rows, table=Card)
+
+
+@acached(CARDS, THEMES)
+async def get_cards_by_theme(id_theme: int) -> List[Card] | None:
+    """Get all cards by theme, with the theme relationship loaded."""
+    return await _run(
+        get_all_rows, table=Card, id_theme=id_theme, options=[joinedload(Card.theme)]
+    )
+
+
+@acached(CARDS)
+async def list_cards(
+    theme_id: int,
+    after_id: Optional[int] = None,
+    limit: int = 50,
+    order_by: str = "id",
+) -> List[Card] | None:
+    """Get a page of the cards of a theme with keyset pagination,
+    see `services.list_cards`."""
+    if order_by not in services.CARD_ORDERS:
+        raise ValueError(f"Cannot order cards by '{order_by}'")
+    return await _run(
+        services._list_cards,
+        theme_id=theme_id,
+        after_id=after_id,
+        limit=limit,
+        order_by=order_by,
+    )
+
+
+async def next_due_cards(
+    theme_ids: Iterable[int],
+    n: int = 10,
+    now: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> List[Card] | None:
+    """Get the cards due for a review among the given themes, the most
+    overdue first, see `services.next_due_cards`."""
+    theme_ids = list(theme_ids)
+    if not theme_ids or n <= 0:
+        return []
+    return await _run(
+        services._next_due_cards,
+        theme_ids=theme_ids,
+        n=n,
+        now=now or datetime.today(),
+        user_id=user_id,
+    )
+
+
+# --- CRUD operations for the Themes entity ---
+
+
+async def create_theme(theme: str) -> Theme | None:
+    """Create a new theme in the database.
+    :param theme: The theme of the card."""
+    new_theme = await _run(add_row, table=Theme, theme=theme)
+    cache.bump(THEMES)
+    logging.info(f"Theme '{theme}' created.")
+    return new_theme
+
+
+@acached(THEMES)
+async def get_theme(id_theme: int) -> Theme | None:
+    """Get a theme by its ID.
+    :param id_theme: The ID of the theme."""
+    return await _run(get_row_by_id, table=Theme, id=id_theme)
+
+
+async def get_or_create_theme(name: str) -> Theme | None:
+    """Get a theme by its name. Create it otherwise"""
+    theme = await _run(get_row_by, Theme, theme=name)
+    if theme is None:
+        theme = await create_theme(name)
+    return theme
+
+
+async def update_theme(id_theme: int, theme: str) -> Theme | None:
+    """Update a theme in the database.
+    :param id_theme: The ID of the theme.
+    :param theme: The theme of the card."""
+    row = await _run(update_row, table=Theme, id=id_theme, theme=theme)
+    cache.bump(THEMES)
+    return row
+
+
+async def delete_theme(id_theme: int):
+    """Delete a theme from the database.
+    :param id_theme: The ID of the theme."""
+    await _run(delete_row, table=Theme, id=id_theme)
+    cache.bump(THEMES, CARDS, CARD_CONTENTS)  # Cards are deleted in cascade
+    sampler.invalidate(id_theme)
+    logging.info(f"Theme {id_theme} deleted")
+
+
+@acached(THEMES)
+async def get_all_themes() -> List[Theme] | None:
+    """Get all themes from the database."""
+    return await _run(get_all_rows, table=Theme)
+
+
+# --- operations for the Stats and the Reviews ---
+
+
+async def record_answer(
+    card_id: int,
+    is_correct: bool,
+    latency_ms: int | None = None,
+    user_id: int | None = None,
+) -> float | None:
+    """Record an answer in a single transaction, see `services.record_answer`.
+    :return: The new probability of the card, None if it was not found."""
+    results = await record_answers([(card_id, is_correct, None, latency_ms, user_id)])
+    if not results:
+        return None
+    return results[0][2]
+
+
+async def record_answers(answers: Iterable[tuple]) -> List[tuple] | None:
+    """Record a batch of answers in a single transaction.
+    :param answers: (card_id, is_correct, answered_at[, latency_ms[, user_id]])
+        tuples, `answered_at` defaults to now.
+    :return: (card_id, id_theme, new_probability) for each recorded answer,
+        None if the transaction failed."""
+    results = await _run(services._record_answers, answers=list(answers))
+    cache.bump(CARDS, STATS)
+    if results is None:
+        return None
+    for card_id, id_theme, new_prob, user_id in results:
+        sampler.set_weight(card_id, id_theme, new_prob, user_id=user_id)
+    logging.info(f"{len(results)} answer(s) recorded")
+    return [result[:3] for result in results]
+
+
+async def add_reviews(reviews: Iterable[dict]) -> int | None:
+    """Append reviews to the log in bulk, without touching the cards.
+    :param reviews: Dicts with the columns of the `Review` table.
+    :return: The number of inserted reviews."""
+    return await _run(services._add_reviews, reviews=list(reviews))
+
+
+async def rollup_reviews() -> int | None:
+    """Fold the reviews added since the last rollup into the daily stats.
+    :return: The number of reviews folded."""
+    counter = await _run(services._run_rollup)
+    cache.bump(STATS)
+    return counter
+
+
+@acached(STATS)
+async def get_stats(
+    start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+) -> List[Stat] | None:
+    """Get the daily statistics of a period.
+    :param start_date: The start date
+    :param end_date: The end date"""
+    filters = []
+    if start_date:
+        filters.append(Stat.date >= start_date)
+    if end_date:
+        filters.append(Stat.date <= end_date)
+    return await _run(
+        get_all_rows, table=Stat, filters=and_(*filters) if filters else None
+    )
+
+
+async def get_stats_summary(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: str = DAY,
+    user_id: Optional[int] = None,
+) -> dict | None:
+    """Get the answer totals of a period and their series by bucket,
+    see `services.get_stats_summary`."""
+    if bucket not in services.BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'")
+    start_date = services._as_date(start_date) if start_date else None
+    end_date = services._as_date(end_date) if end_date else None
+    return await _cached_stats_summary(start_date, end_date, bucket, user_id)
+
+
+@acached(STATS)
+async def _cached_stats_summary(start_date, end_date, bucket, user_id=None):
+    series = await _run(
+        services._stats_series,
+        start_date=start_date,
+        end_date=end_date,
+        bucket=bucket,
+        user_id=user_id,
+    )
+    if series is None:
+        return None
+    return {
+        "bonnes_reponses": sum(series["bonnes_reponses"]),
+        "mauvaises_reponses": sum(series["mauvaises_reponses"]),
+        "series": series,
+    }
@@ -0,0 +1,143 @@
+import functools
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+from src.db import config
+
+logging.debug("Cache module loaded.")
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class VersionedCache:
+    """Bounded LRU cache of read results, keyed by data versions.
+
+    Each table has a monotonically increasing version which writes bump.
+    A cached result is stored with the versions of the tables it was read
+    from, so a bump makes every older entry unreachable: they are never
+    served again and end up evicted."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # type: OrderedDict
+        self._versions = {}  # type: Dict[str, int]
+        self._lock = threading.Lock()
+        self._engine = None
+
+    def _check_engine(self):
+        # A new engine means a new database: drop everything
+        if self._engine is not config.engine:
+            self._entries.clear()
+            self._engine = config.engine
+
+    def version(self, *tables: str) -> Tuple[int, ...]:
+        """Return the current versions of the given tables."""
+        with self._lock:
+            self._check_engine()
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables: str):
+        """Invalidate the cached reads of the given tables."""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+        logging.debug(f"Cache version bumped for {tables}.")
+
+    def lookup(self, key) -> Tuple[bool, object]:
+        """Return (True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            self._check_engine()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, key, value):
+        with self._lock:
+            self._check_engine()
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters and the number of entries."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+cache = VersionedCache()
+
+
+def cached(*tables: str) -> Callable:
+    """Decorator serving a read function from the cache.
+    :param tables: The tables the function reads from."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Read the versions before querying, a concurrent write then
+            # only ever makes the stored entry unreachable
+            key = (
+                func.__name__,
+                args,
+                tuple(sorted(kwargs.items())),
+                cache.version(*tables),
+            )
+            hit, value = cache.lookup(key)
+            if not hit:
+                value = func(*args, **kwargs)
+                if value is None:
+                    return None  # Do not cache failures
+                cache.store(key, value)
+            # Hand out copies of lists so callers cannot alter the cache
+            return list(value) if isinstance(value, list) else value
+
+        return wrapper
+
+    return decorator
+
+
+def acached(*tables: str) -> Callable:
+    """Decorator serving a coroutine read function from the cache.
+    :param tables: The tables the function reads from."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Keyed by module too, not to collide with a synchronous twin
+            key = (
+                func.__module__,
+                func.__name__,
+                args,
+                tuple(sorted(kwargs.items())),
+                cache.version(*tables),
+            )
+            hit, value = cache.lookup(key)
+            if not hit:
+                value = await func(*args, **kwargs)
+                if value is None:
+                    return None  # Do not cache failures
+                cache.store(key, value)
+            return list(value) if isinstance(value, list) else value
+
+        return wrapper
+
+    return decorator
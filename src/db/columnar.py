@@ -0,0 +1,41 @@
+import logging
+from typing import Dict, List
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, only needed for arrays
+    numpy = None
+
+logging.debug("Columnar reads module loaded.")
+
+# Column-oriented result: the name of each selected column and its values
+Columns = Dict[str, List]
+
+
+def select_columns(session: Session, stmt: Select) -> Columns:
+    """Execute a Core select and transpose its rows into columns.
+    Rows are plain tuples, no ORM object is built nor tracked.
+    :param session: The database session.
+    :param stmt: The select, its labels are the column names.
+    :return: The values of each column, in row order."""
+    result = session.execute(stmt)
+    names = list(result.keys())
+    rows = result.all()
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def to_arrays(columns: Columns, dtypes: Dict[str, str]) -> Dict:
+    """Convert numeric columns to NumPy arrays, the others are left as lists.
+    :param columns: The columns, as returned by `select_columns`.
+    :param dtypes: The NumPy dtype of each column to convert."""
+    if numpy is None:
+        raise ImportError("NumPy is required to read columns as arrays")
+    return {
+        name: numpy.asarray(values, dtype=dtypes[name]) if name in dtypes else values
+        for name, values in columns.items()
+    }
@@ -1,8 +1,10 @@
+import functools
 import logging
 import os
+import sqlite3
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 global _engine_initialized
@@ -10,10 +12,96 @@ global _engine_initialized
 DATABASE_PATH = os.path.join(os.path.expanduser("~"), ".flashcards", "flashcards.db")
 engine = None
 engine_initialized = False  # Variable globale pour suivre l'état de l'engine
+SessionFactory = None  # Session factory bound to the current engine
 
+# Queue quiz answers and write them from a background thread
+WRITE_BEHIND = os.environ.get("FLASHCARDS_WRITE_BEHIND", "0") == "1"
 
-def setup_config(path: str | None = None):
-    """Set up the configuration for the database."""
+# Record the SQL statements of every service and show them in the sidebar
+INSTRUMENTATION = os.environ.get("FLASHCARDS_INSTRUMENTATION", "0") == "1"
+
+# Retries of the transactions failing on the lock of another connection,
+# the first one waits up to BUSY_RETRY_DELAY seconds and each next one twice more
+BUSY_RETRIES = int(os.environ.get("FLASHCARDS_BUSY_RETRIES", "5"))
+BUSY_RETRY_DELAY = float(os.environ.get("FLASHCARDS_BUSY_RETRY_DELAY", "0.02"))
+
+# Run every write from a single thread and connection
+SINGLE_WRITER = os.environ.get("FLASHCARDS_SINGLE_WRITER", "0") == "1"
+
+# PRAGMAs applied to every new SQLite connection of the pool
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",  # readers do not block on the writer
+    "synchronous": "NORMAL",  # safe with WAL, avoids an fsync per commit
+    "cache_size": -64000,  # in KiB when negative, i.e. 64 MiB
+    "mmap_size": 268435456,  # 256 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # in ms
+    "foreign_keys": "ON",
+}
+
+# Pool options used for file databases
+DEFAULT_POOL = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 3600,
+}
+
+pragmas = dict(DEFAULT_PRAGMAS)
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """Apply the configured PRAGMAs on a newly opened connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if DATABASE_PATH == ":memory:" and name in ("journal_mode", "mmap_size"):
+                continue  # Not applicable to in-memory databases
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+@functools.cache
+def has_math_functions() -> bool:
+    """Whether the SQLite library has the math functions, e.g. `ln`. They
+    are only built with SQLITE_ENABLE_MATH_FUNCTIONS, checked once."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("SELECT ln(1)")
+        return True
+    except sqlite3.OperationalError:
+        logging.warning("SQLite has no math functions, cards are drawn in memory.")
+        return False
+    finally:
+        conn.close()
+
+
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    """Stop pysqlite from opening (and committing) transactions by itself:
+    it commits before any DDL, which would break the atomicity of the
+    migrations. `_begin` emits the BEGIN instead."""
+    dbapi_connection.isolation_level = None
+
+
+def _begin(conn):
+    """Open the transaction of a SQLAlchemy connection, DDL included."""
+    conn.exec_driver_sql("BEGIN")
+
+
+def listen_transactions(engine):
+    """Let SQLAlchemy control the transactions of a (sync) SQLite engine."""
+    event.listen(engine, "connect", _disable_driver_transactions)
+    event.listen(engine, "begin", _begin)
+
+
+def setup_config(
+    path: str | None = None, pragmas: dict | None = None, pool: dict | None = None
+):
+    """Set up the configuration for the database.
+    :param path: The path to the database file.
+    :param pragmas: PRAGMAs overriding `DEFAULT_PRAGMAS`, a None value disables one.
+    :param pool: Pool options overriding `DEFAULT_POOL` (file databases only)."""
     global engine_initialized
     global DATABASE_PATH
 
@@ -25,15 +113,39 @@ def setup_config(path: str | None = None):
     if path is not None:  # Only update if a new path is provided
         DATABASE_PATH = path
 
+    _set_pragmas(pragmas)
+
+    pool_options = {}
+    if DATABASE_PATH != ":memory:":
+        # In-memory databases use a SingletonThreadPool, keep its defaults
+        pool_options = {**DEFAULT_POOL, **(pool or {})}
+
     global engine
-    engine = create_engine(f"sqlite:///{DATABASE_PATH}", echo=False)
+    global SessionFactory
+    if engine is not None:
+        engine.dispose()
+    engine = create_engine(f"sqlite:///{DATABASE_PATH}", echo=False, **pool_options)
+    event.listen(engine, "connect", _apply_pragmas)
+    if DATABASE_PATH != ":memory:":
+        # The in-memory database has a single connection shared by nested
+        # sessions, a second BEGIN on it would fail
+        listen_transactions(engine)
+    SessionFactory = sessionmaker(bind=engine)
     engine_initialized = True
     logging.debug("Database configuration initialized.")
 
 
+def _set_pragmas(overrides: dict | None):
+    global pragmas
+    pragmas = {
+        name: value
+        for name, value in {**DEFAULT_PRAGMAS, **(overrides or {})}.items()
+        if value is not None
+    }
+
+
 @contextmanager
 def get_session():
     """Provide a transactional scope around a series of operations."""
-    Session = sessionmaker(bind=engine)
-    with Session() as session:
+    with SessionFactory() as session:
         yield session
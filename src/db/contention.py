@@ -0,0 +1,187 @@
+"""Handling of the write contention on the SQLite database.
+
+SQLite has a single writer: concurrent sessions wait up to `busy_timeout`
+for the lock, and a transaction upgrading from a read to a write fails at
+once with SQLITE_BUSY. `get_session` retries such failures following the
+`policy`, with a jittered exponential backoff, instead of dropping the
+write. The `writer` can also run every write from a single thread on a
+single connection, so the writes queue up in the process instead of
+competing for the lock."""
+
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.db import config
+
+logging.debug("Contention module loaded.")
+
+# Result codes of SQLITE_BUSY and SQLITE_LOCKED, extended codes included
+_BUSY_CODES = {5, 6}
+_BUSY_MESSAGES = ("database is locked", "database is busy", "database table is locked")
+
+
+def is_busy(error: Exception) -> bool:
+    """Whether an error is due to the lock of another connection."""
+    if not isinstance(error, OperationalError):
+        return False
+    code = getattr(error.orig, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _BUSY_CODES
+    return any(message in str(error.orig) for message in _BUSY_MESSAGES)
+
+
+class RetryPolicy:
+    """Retries of the busy errors with a jittered exponential backoff.
+
+    The n-th retry waits a random delay between 0 and
+    min(max_delay, base_delay * 2 ** n), so that the sessions which failed
+    together do not retry together."""
+
+    def __init__(
+        self,
+        attempts: int = 5,
+        base_delay: float = 0.02,
+        max_delay: float = 1.0,
+        rng=random,
+    ):
+        self.attempts = attempts  # Retries after the first try, 0 disables them
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+
+    def delays(self) -> Iterator[float]:
+        """The delays to wait before each retry, in seconds."""
+        for attempt in range(self.attempts):
+            ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+            yield self.rng.uniform(0, ceiling)
+
+
+class ContentionStats:
+    """Thread-safe counters of the busy errors and of the writer queue."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.retries = 0
+            self.retry_seconds = 0.0  # time spent in the backoff delays
+            self.failures = 0  # busy errors given up after the last retry
+            self.writes = 0  # writes run by the single writer
+            self.queue_seconds = 0.0  # time the writes waited for the writer
+
+    def record_retry(self, delay: float):
+        with self._lock:
+            self.retries += 1
+            self.retry_seconds += delay
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def record_write(self, waited: float):
+        with self._lock:
+            self.writes += 1
+            self.queue_seconds += waited
+
+    def stats(self) -> Dict[str, float]:
+        """Return the counters."""
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "retry_seconds": self.retry_seconds,
+                "failures": self.failures,
+                "writes": self.writes,
+                "queue_seconds": self.queue_seconds,
+            }
+
+
+class SingleWriter:
+    """Thread running the writes one at a time on its own connection.
+
+    Callers block until their write is done and get its result, so the
+    services behave the same with or without the writer. It needs a file
+    database: each thread has its own in-memory database."""
+
+    def __init__(self):
+        self._queue = queue.Queue()  # type: queue.Queue
+        self._thread = None  # type: Optional[threading.Thread]
+        self._connection = None
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def is_current(self) -> bool:
+        """Whether the calling thread is the writer."""
+        return self._thread is threading.current_thread()
+
+    def enable(self):
+        """Start the writer thread."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="single-writer", daemon=True
+                )
+                self._thread.start()
+        logging.debug("Single writer started.")
+
+    def disable(self):
+        """Stop the writer thread once the queued writes are done."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        logging.debug("Single writer stopped.")
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """Run a function on the writer thread and wait for its result."""
+        future = Future()
+        self._queue.put((future, time.perf_counter(), func, args, kwargs))
+        return future.result()
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """Provide a session on the connection of the writer."""
+        # A new engine means a new database: reconnect
+        if self._engine is not config.engine:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = config.engine.connect()
+            self._engine = config.engine
+        with Session(bind=self._connection) as session:
+            yield session
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, queued_at, func, args, kwargs = item
+            stats.record_write(time.perf_counter() - queued_at)
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            self._engine = None
+
+
+policy = RetryPolicy(attempts=config.BUSY_RETRIES, base_delay=config.BUSY_RETRY_DELAY)
+stats = ContentionStats()
+writer = SingleWriter()
@@ -0,0 +1,149 @@
+"""Near-duplicate detection of the card questions.
+
+Questions are normalized (case, accents and punctuation ignored) and cut
+into overlapping byte shingles. A MinHash signature of the shingles
+is split into bands, each band hashed into a bucket: two questions sharing
+a bucket are candidates, confirmed by their actual Jaccard similarity.
+Lookups then only compare the cards sharing a bucket instead of every pair."""
+
+import hashlib
+import logging
+import re
+import unicodedata
+import zlib
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+logging.debug("Duplicate detection module loaded.")
+
+SHINGLE_SIZE = 4
+BANDS = 5
+ROWS = 4  # per band, the signature has BANDS * ROWS slots
+THRESHOLD = 0.8  # Jaccard similarity of two near-duplicate questions
+
+_HASHES = BANDS * ROWS
+_MASK = (1 << 64) - 1
+# The buckets are stored in the database: changing these constants, or how
+# the buckets are computed, needs a migration rebuilding them
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_INCREMENT = 0x632BE59BD9B4E019
+_EMPTY = _MASK  # Value of a signature slot without any shingle
+
+Shingles = FrozenSet[int]
+
+
+def normalize(text: str) -> str:
+    """Lower case words without accents nor punctuation."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def fingerprint(text: str) -> str:
+    """Hash of the normalized text, equal for exact duplicates."""
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+def shingles(text: str) -> Shingles:
+    """Hashes of the overlapping byte shingles of the normalized text."""
+    data = normalize(text).encode("utf-8")
+    if len(data) <= SHINGLE_SIZE:
+        return frozenset([zlib.crc32(data)] if data else [])
+    last = len(data) - SHINGLE_SIZE + 1
+    return frozenset(map(zlib.crc32, (data[i : i + SHINGLE_SIZE] for i in range(last))))
+
+
+def buckets(hashes: Shingles) -> List[int]:
+    """LSH buckets of a set of shingles, one per band of its MinHash.
+    The signature uses one permutation hashing: each shingle is hashed once
+    and lands in one slot, which keeps its minimum. A short question leaves
+    whole bands empty: they get no bucket, every short question would
+    share it."""
+    if not hashes:
+        return []
+    signature = [_EMPTY] * _HASHES
+    for h in hashes:
+        mixed = (h * _MULTIPLIER + _INCREMENT) & _MASK
+        slot, value = mixed % _HASHES, mixed // _HASHES
+        if value < signature[slot]:
+            signature[slot] = value
+    result = []
+    for band in range(BANDS):
+        values = signature[band * ROWS : (band + 1) * ROWS]
+        if all(value == _EMPTY for value in values):
+            continue
+        digest = hashlib.blake2b(repr((band, values)).encode(), digest_size=8)
+        # Signed to fit in a SQLite INTEGER
+        result.append(int.from_bytes(digest.digest(), "little", signed=True))
+    return result
+
+
+def similarity(a: Shingles, b: Shingles) -> float:
+    """Jaccard similarity of two sets of shingles."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def index_rows(card_id: int, question: str) -> List[Dict[str, int]]:
+    """Rows of the bucket table for a card."""
+    return [
+        {"bucket": bucket, "card_id": card_id}
+        for bucket in set(buckets(shingles(question)))
+    ]
+
+
+class DuplicateIndex:
+    """In-memory LSH index, e.g. to find the duplicates within an import."""
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self._entries = []  # type: List[Tuple[object, Shingles]]
+        self._buckets = {}  # type: Dict[Tuple[object, int], List[int]]
+        self._exact = {}  # type: Dict[Tuple[object, str], object]
+
+    def find(self, scope, question: str) -> Optional[object]:
+        """Return the key of a near-duplicate question in the same scope."""
+        # Exact duplicates are found without comparing any shingles
+        key = self._exact.get((scope, fingerprint(question)))
+        if key is not None:
+            return key
+        hashes = shingles(question)
+        seen = set()
+        for bucket in buckets(hashes):
+            for index in self._buckets.get((scope, bucket), ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                key, other = self._entries[index]
+                if similarity(hashes, other) >= self.threshold:
+                    return key
+        return None
+
+    def add(self, scope, key, question: str):
+        """Index a question under a key, duplicates are only searched for
+        within the same scope (e.g. the theme)."""
+        self._exact.setdefault((scope, fingerprint(question)), key)
+        hashes = shingles(question)
+        self._entries.append((key, hashes))
+        for bucket in set(buckets(hashes)):
+            self._buckets.setdefault((scope, bucket), []).append(len(self._entries) - 1)
+
+
+def group_pairs(rows: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """Group the IDs linked by pairs, e.g. duplicates of duplicates.
+    :return: The groups of IDs, sorted."""
+    parent = {}  # type: Dict[int, int]
+
+    def root(item: int) -> int:
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for a, b in rows:
+        parent[root(a)] = root(b)
+    groups = {}  # type: Dict[int, List[int]]
+    for item in parent:
+        groups.setdefault(root(item), []).append(item)
+    return sorted(sorted(group) for group in groups.values())
@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import logging
+import os
+import struct
+from typing import IO, Dict, Iterable, Iterator, Tuple
+
+logging.debug("Deck formats module loaded.")
+
+# Columns of a deck file
+COLUMNS = ["question", "reponse", "probabilite", "theme"]
+
+CSV = "csv"
+JSONL = "jsonl"
+BINARY = "fcd"
+FORMATS = [CSV, JSONL, BINARY]
+
+# Compact binary format: the magic number, then per card the probability as
+# a little-endian double followed by the question, the answer and the theme,
+# each as a uint32 byte length and UTF-8 bytes.
+BINARY_MAGIC = b"FCD1"
+_PROBABILITY = struct.Struct("<d")
+_LENGTH = struct.Struct("<I")
+
+MIME_TYPES = {
+    CSV: "text/csv",
+    JSONL: "application/x-ndjson",
+    BINARY: "application/octet-stream",
+}
+
+
+def guess_format(filename: str) -> str:
+    """Guess the format of a deck file from its extension.
+    :param filename: The name of the file."""
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return JSONL
+    if extension == "csv":
+        return CSV
+    if extension == BINARY:
+        return BINARY
+    raise ValueError(f"Unknown deck format for file '{filename}'")
+
+
+def read_csv(stream: IO[str]) -> Iterator[Tuple[int, Dict]]:
+    """Lazily read the records of a CSV deck with a header line.
+    :param stream: The text stream to read.
+    :return: (line number, record) pairs."""
+    reader = csv.DictReader(stream)
+    missing = {"question", "reponse", "theme"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Missing column(s) in CSV header: {sorted(missing)}")
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_jsonl(stream: IO[str]) -> Iterator[Tuple[int, Dict]]:
+    """Lazily read the records of a JSON Lines deck.
+    Invalid lines are yielded as `None` records.
+    :param stream: The text stream to read.
+    :return: (line number, record) pairs."""
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        yield line_num, record if isinstance(record, dict) else None
+
+
+def read_binary(stream: IO[bytes]) -> Iterator[Tuple[int, Dict]]:
+    """Lazily read the records of a binary deck.
+    :param stream: The binary stream to read.
+    :return: (record number, record) pairs."""
+    if stream.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("Not a binary deck file")
+
+    def read_exactly(size: int) -> bytes:
+        data = stream.read(size)
+        if len(data) != size:
+            raise ValueError("Truncated binary deck file")
+        return data
+
+    record_num = 0
+    while header := stream.read(_PROBABILITY.size):
+        record_num += 1
+        if len(header) != _PROBABILITY.size:
+            raise ValueError("Truncated binary deck file")
+        (probabilite,) = _PROBABILITY.unpack(header)
+        record = {"probabilite": probabilite}
+        for column in ("question", "reponse", "theme"):
+            (length,) = _LENGTH.unpack(read_exactly(_LENGTH.size))
+            record[column] = read_exactly(length).decode("utf-8")
+        yield record_num, record
+
+
+READERS = {CSV: read_csv, JSONL: read_jsonl, BINARY: read_binary}
+
+
+def write_csv(rows: Iterable[Tuple], chunk_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % chunk_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def write_jsonl(rows: Iterable[Tuple], chunk_size: int) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+        if len(lines) == chunk_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def write_binary(rows: Iterable[Tuple], chunk_size: int) -> Iterator[bytes]:
+    chunk = bytearray(BINARY_MAGIC)
+    for i, (question, reponse, probabilite, theme) in enumerate(rows, start=1):
+        chunk += _PROBABILITY.pack(probabilite or 0.0)
+        for text in (question, reponse, theme):
+            data = (text or "").encode("utf-8")
+            chunk += _LENGTH.pack(len(data))
+            chunk += data
+        if i % chunk_size == 0:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+WRITERS = {CSV: write_csv, JSONL: write_jsonl, BINARY: write_binary}
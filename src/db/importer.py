@@ -0,0 +1,203 @@
+import argparse
+import logging
+import time
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+from src.db import services
+from src.db.config import setup_config
+from src.db.dedup import DuplicateIndex
+from src.db.formats import BINARY, FORMATS, READERS, guess_format
+from src.db.tables import init_db
+
+logging.debug("Deck importer module loaded.")
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PROBABILITY = 0.5
+MAX_REPORTED_REJECTIONS = 100  # Only the first rejections are kept in memory
+
+
+class ImportReport:
+    """Outcome of a deck import."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.rejections = []  # type: List[Tuple[int, str]]
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Inserted cards per second."""
+        return self.inserted / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line_num: int, reason: str):
+        self.rejected += 1
+        if len(self.rejections) < MAX_REPORTED_REJECTIONS:
+            self.rejections.append((line_num, reason))
+        logging.debug(f"Line {line_num} rejected: {reason}")
+
+    def __str__(self) -> str:
+        return (
+            f"{self.inserted} card(s) imported, {self.rejected} rejected "
+            f"in {self.elapsed:.2f}s ({self.throughput:.0f} cards/s)"
+        )
+
+
+class _ThemeCache:
+    """Resolve theme names to IDs, hitting the database once per name."""
+
+    def __init__(self):
+        self._ids = {}  # type: Dict[str, int]
+
+    def get_id(self, name: str) -> Optional[int]:
+        if name not in self._ids:
+            theme = services.get_or_create_theme(name)
+            if theme is None:
+                return None
+            self._ids[name] = theme.id
+        return self._ids[name]
+
+
+def _to_card(
+    record: Optional[Dict], themes: _ThemeCache
+) -> Tuple[Optional[Dict], Optional[str]]:
+    """Validate a record and convert it to the columns of a card.
+    :return: The card, or None with the reason of the rejection."""
+    if record is None:
+        return None, "invalid record"
+    question = str(record.get("question") or "").strip()
+    reponse = str(record.get("reponse") or "").strip()
+    theme = str(record.get("theme") or "").strip()
+    if not question or not reponse or not theme:
+        return None, "question, reponse and theme are required"
+
+    probabilite = record.get("probabilite")
+    try:
+        probabilite = (
+            DEFAULT_PROBABILITY if probabilite in (None, "") else float(probabilite)
+        )
+    except (TypeError, ValueError):
+        return None, f"invalid probabilite '{probabilite}'"
+    if not 0.1 <= probabilite <= 1:
+        return None, f"probabilite {probabilite} out of range [0.1, 1]"
+
+    id_theme = themes.get_id(theme)
+    if id_theme is None:
+        return None, f"theme '{theme}' could not be created"
+    return {
+        "question": question,
+        "reponse": reponse,
+        "probabilite": probabilite,
+        "id_theme": id_theme,
+    }, None
+
+
+def import_records(
+    records: Iterable[Tuple[int, Optional[Dict]]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    skip_duplicates: bool = False,
+) -> ImportReport:
+    """Import deck records, inserting them by batches.
+    :param records: (line number, record) pairs.
+    :param batch_size: The number of cards inserted per transaction.
+    :param skip_duplicates: Reject the near-duplicates of a question of the
+        same theme, already in the database or earlier in the deck."""
+    report = ImportReport()
+    themes = _ThemeCache()
+    seen = DuplicateIndex()
+    start = time.perf_counter()
+    batch = []  # type: List[Tuple[int, Dict]]
+
+    def flush():
+        if skip_duplicates:
+            # One lookup per batch, sharing the bucket queries
+            similar = services.find_similar_cards(
+                (card["question"], card["id_theme"]) for _, card in batch
+            )
+            for (line_num, _), card_id in zip(batch, similar or ()):
+                if card_id is not None:
+                    report.reject(line_num, f"duplicate of card {card_id}")
+            if similar:
+                batch[:] = [item for item, id in zip(batch, similar) if id is None]
+        if not batch:
+            return
+        if services.create_cards(card for _, card in batch) is None:
+            for line_num, _ in batch:
+                report.reject(line_num, "database error")
+        else:
+            report.inserted += len(batch)
+        batch.clear()
+
+    for line_num, record in records:
+        card, reason = _to_card(record, themes)
+        if card is None:
+            report.reject(line_num, reason)
+            continue
+        if skip_duplicates:
+            duplicate = seen.find(card["id_theme"], card["question"])
+            if duplicate is not None:
+                report.reject(line_num, f"duplicate of line {duplicate}")
+                continue
+            seen.add(card["id_theme"], line_num, card["question"])
+        batch.append((line_num, card))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    report.elapsed = time.perf_counter() - start
+    logging.info(f"Import done: {report}")
+    return report
+
+
+def import_cards(
+    stream: IO,
+    format: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    skip_duplicates: bool = False,
+) -> ImportReport:
+    """Import cards from a CSV, JSON Lines or binary deck.
+    The stream is read lazily so memory does not depend on its size.
+    :param stream: The stream to read, binary for `formats.BINARY`, text otherwise.
+    :param format: One of `formats.FORMATS`.
+    :param batch_size: The number of cards inserted per transaction.
+    :param skip_duplicates: Reject the near-duplicate questions."""
+    if format not in READERS:
+        raise ValueError(f"Unknown deck format '{format}'")
+    return import_records(
+        READERS[format](stream),
+        batch_size=batch_size,
+        skip_duplicates=skip_duplicates,
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point: python -m src.db.importer deck.csv"""
+    parser = argparse.ArgumentParser(description="Import cards from a deck file.")
+    parser.add_argument("path", help="CSV, JSON Lines or binary file to import")
+    parser.add_argument("--format", choices=FORMATS, help="Guessed if omitted")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--database", help="Path of the database file")
+    parser.add_argument(
+        "--skip-duplicates",
+        action="store_true",
+        help="Reject the near-duplicates of existing or earlier questions",
+    )
+    args = parser.parse_args(argv)
+
+    setup_config(args.database)
+    init_db()
+    format = args.format or guess_format(args.path)
+    if format == BINARY:
+        stream = open(args.path, "rb")
+    else:
+        stream = open(args.path, encoding="utf-8", newline="")
+    with stream:
+        report = import_cards(stream, format, args.batch_size, args.skip_duplicates)
+    print(report)
+    for line_num, reason in report.rejections:
+        print(f"  line {line_num}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
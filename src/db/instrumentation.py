@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logging.debug("Instrumentation module loaded.")
+
+# Label of the statements executed outside of any service
+OUTSIDE = "<hors service>"
+
+# An identical statement repeated this many times in one scope is reported
+DEFAULT_REPEAT_THRESHOLD = 5
+
+_service = ContextVar("service", default=OUTSIDE)
+_scopes = ContextVar("scopes", default=())
+
+
+class ServiceStats:
+    """Counters of one service function."""
+
+    def __init__(self):
+        self.calls = 0
+        self.statements = 0
+        self.rows = 0
+        self.seconds = 0.0  # wall time of the calls
+        self.sql_seconds = 0.0  # time spent executing statements
+
+
+class Scope:
+    """Statements and service calls recorded between two points in time,
+    e.g. one Streamlit rerun."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.services = {}  # type: Dict[str, ServiceStats]
+        # (service, statement) -> [executions, seconds]
+        self.statements = {}  # type: Dict[Tuple[str, str], List]
+
+    def _stats(self, service: str) -> ServiceStats:
+        if service not in self.services:
+            self.services[service] = ServiceStats()
+        return self.services[service]
+
+    @property
+    def total_statements(self) -> int:
+        return sum(stats.statements for stats in self.services.values())
+
+    @property
+    def total_sql_seconds(self) -> float:
+        return sum(stats.sql_seconds for stats in self.services.values())
+
+    def repeated(
+        self, threshold: int = DEFAULT_REPEAT_THRESHOLD
+    ) -> List[Tuple[str, str, int]]:
+        """List the statements executed at least `threshold` times by the same
+        service, the signature of an N+1 query pattern.
+        :return: (service, statement, executions) tuples, most repeated first."""
+        repeated = [
+            (service, statement, executions)
+            for (service, statement), (executions, _) in self.statements.items()
+            if executions >= threshold
+        ]
+        return sorted(repeated, key=lambda item: item[2], reverse=True)
+
+    def service_rows(self) -> List[Dict]:
+        """The counters of each service, slowest first, e.g. for a dataframe."""
+        rows = [
+            {
+                "service": service,
+                "appels": stats.calls,
+                "requêtes": stats.statements,
+                "lignes": stats.rows,
+                "temps (ms)": round(1000 * stats.seconds, 2),
+                "temps SQL (ms)": round(1000 * stats.sql_seconds, 2),
+            }
+            for service, stats in self.services.items()
+        ]
+        return sorted(rows, key=lambda row: row["temps SQL (ms)"], reverse=True)
+
+    def summary(self, threshold: int = DEFAULT_REPEAT_THRESHOLD) -> str:
+        """A multi-line summary for the log."""
+        lines = [
+            f"{self.name}: {self.total_statements} statement(s) "
+            f"in {1000 * self.total_sql_seconds:.2f} ms"
+        ]
+        for row in self.service_rows():
+            lines.append(
+                f"  {row['service']}: {row['appels']} call(s), "
+                f"{row['requêtes']} statement(s), {row['lignes']} row(s), "
+                f"{row['temps (ms)']:.2f} ms ({row['temps SQL (ms)']:.2f} ms SQL)"
+            )
+        for service, statement, executions in self.repeated(threshold):
+            lines.append(
+                f"  Possible N+1 in {service}: {executions} x {_shorten(statement)}"
+            )
+        return "\n".join(lines)
+
+
+def _shorten(statement: str, length: int = 120) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= length else statement[: length - 3] + "..."
+
+
+def _count_rows(result) -> int:
+    """Rows returned by a service: the length of a list, one for an object."""
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+class Instrumentation:
+    """Opt-in recorder of the SQL statements executed by the services.
+
+    The engine events time every statement and attribute it to the innermost
+    service running in the current context (set by the `get_session`
+    decorator) and to every open scope. `totals` accumulates since enable."""
+
+    def __init__(self):
+        self.enabled = False
+        self.totals = Scope("total")
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def enable(self):
+        """Start recording, for every engine."""
+        with self._lock:
+            if not self._listening:
+                # Listening on the class covers the engines created later on
+                event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+                self._listening = True
+            self.enabled = True
+        logging.info("SQL instrumentation enabled.")
+
+    def disable(self):
+        with self._lock:
+            if self._listening:
+                event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+                event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+                self._listening = False
+            self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.totals = Scope("total")
+
+    def _scopes(self) -> Tuple[Scope, ...]:
+        return (self.totals,) + _scopes.get()
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[Scope]:
+        """Record what runs inside the block into a new scope.
+        :param name: The name of the scope, e.g. the page."""
+        scope = Scope(name)
+        token = _scopes.set(_scopes.get() + (scope,))
+        try:
+            yield scope
+        finally:
+            _scopes.reset(token)
+
+    @contextmanager
+    def service(self, name: str) -> Iterator[List]:
+        """Attribute the statements executed inside the block to a service.
+        Append the service result to the yielded list to count its rows."""
+        if not self.enabled:
+            yield []
+            return
+        token = _service.set(name)
+        result = []
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            elapsed = time.perf_counter() - start
+            _service.reset(token)
+            rows = _count_rows(result[0]) if result else 0
+            with self._lock:
+                for scope in self._scopes():
+                    stats = scope._stats(name)
+                    stats.calls += 1
+                    stats.rows += rows
+                    stats.seconds += elapsed
+
+    def _record(self, statement: str, elapsed: float):
+        service = _service.get()
+        with self._lock:
+            for scope in self._scopes():
+                stats = scope._stats(service)
+                stats.statements += 1
+                stats.sql_seconds += elapsed
+                entry = scope.statements.setdefault((service, statement), [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+
+
+instrumentation = Instrumentation()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    if instrumentation.enabled:
+        instrumentation._record(statement, elapsed)
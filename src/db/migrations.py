@@ -0,0 +1,194 @@
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.db import dedup
+from src.db.scheduler import DEFAULT_EASE
+
+logging.debug("Database migrations module loaded.")
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _execute(*statements: str) -> Callable[[Connection], None]:
+    """Build a migration running SQL statements in order."""
+
+    def upgrade(conn: Connection):
+        for statement in statements:
+            conn.execute(text(statement))
+
+    return upgrade
+
+
+def _index_duplicates(conn: Connection):
+    """Add the question fingerprints and LSH buckets, then index the cards."""
+    columns = [row[1] for row in conn.execute(text("PRAGMA table_info(cards)"))]
+    if "fingerprint" not in columns:
+        conn.execute(text("ALTER TABLE cards ADD COLUMN fingerprint VARCHAR"))
+    _execute(
+        "CREATE INDEX IF NOT EXISTS ix_cards_fingerprint ON cards (fingerprint)",
+        """
+        CREATE TABLE IF NOT EXISTS card_buckets (
+            bucket INTEGER NOT NULL,
+            card_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, card_id),
+            FOREIGN KEY(card_id) REFERENCES cards (id) ON DELETE CASCADE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_card_buckets_card_id ON card_buckets (card_id)",
+    )(conn)
+
+    cards = conn.execute(
+        text("SELECT id, question FROM cards WHERE fingerprint IS NULL")
+    ).all()
+    if cards:
+        conn.execute(
+            text("UPDATE cards SET fingerprint = :fingerprint WHERE id = :id"),
+            [{"id": id, "fingerprint": dedup.fingerprint(q)} for id, q in cards],
+        )
+        rows = [row for id, q in cards for row in dedup.index_rows(id, q)]
+        if rows:
+            conn.execute(
+                text(
+                    "INSERT OR IGNORE INTO card_buckets (bucket, card_id) "
+                    "VALUES (:bucket, :card_id)"
+                ),
+                rows,
+            )
+
+
+def _add_review_users(conn: Connection):
+    """Add the user of the reviews, the user tables are new and created by
+    `create_all`, the SM-2 schedule of the users and its index included."""
+    columns = [row[1] for row in conn.execute(text("PRAGMA table_info(reviews)"))]
+    if "user_id" not in columns:
+        conn.execute(text("ALTER TABLE reviews ADD COLUMN user_id INTEGER"))
+
+
+def _schedule_cards(conn: Connection):
+    """Add the SM-2 schedule of the cards, every existing card is due now."""
+    columns = [row[1] for row in conn.execute(text("PRAGMA table_info(cards)"))]
+    for name, definition in [
+        ("due_at", "DATETIME"),
+        ("interval", "FLOAT DEFAULT 0"),
+        ("ease", f"FLOAT DEFAULT {DEFAULT_EASE}"),
+        ("repetitions", "INTEGER DEFAULT 0"),
+    ]:
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE cards ADD COLUMN {name} {definition}"))
+    conn.execute(
+        text("UPDATE cards SET due_at = :now WHERE due_at IS NULL"),
+        # Formatted like the DateTime columns, the dates are compared as text
+        {"now": datetime.today().strftime("%Y-%m-%d %H:%M:%S.%f")},
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_cards_id_theme_due_at "
+            "ON cards (id_theme, due_at)"
+        )
+    )
+
+
+# Migrations must be idempotent: on a new database the tables created by
+# `create_all` already match the models and every migration is run anyway.
+MIGRATIONS = [
+    Migration(
+        1,
+        "Index the cards by theme",
+        _execute("CREATE INDEX IF NOT EXISTS ix_cards_id_theme ON cards (id_theme)"),
+    ),
+    Migration(
+        2,
+        "Merge duplicated daily stats and make the date unique",
+        _execute(
+            """
+            UPDATE stats SET
+                bonnes_reponses = (
+                    SELECT SUM(s.bonnes_reponses) FROM stats s WHERE s.date = stats.date
+                ),
+                mauvaises_reponses = (
+                    SELECT SUM(s.mauvaises_reponses) FROM stats s WHERE s.date = stats.date
+                )
+            WHERE id IN (SELECT MIN(id) FROM stats GROUP BY date HAVING COUNT(*) > 1)
+            """,
+            "DELETE FROM stats WHERE id NOT IN (SELECT MIN(id) FROM stats GROUP BY date)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_stats_date ON stats (date)",
+        ),
+    ),
+    Migration(
+        3,
+        "Index the questions and answers for full-text search",
+        _execute(
+            # External content table: the text is only stored in `cards`
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+                question, reponse,
+                content='cards', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+                INSERT INTO cards_fts (rowid, question, reponse)
+                VALUES (new.id, new.question, new.reponse);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+                INSERT INTO cards_fts (cards_fts, rowid, question, reponse)
+                VALUES ('delete', old.id, old.question, old.reponse);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS cards_fts_update
+            AFTER UPDATE OF question, reponse ON cards BEGIN
+                INSERT INTO cards_fts (cards_fts, rowid, question, reponse)
+                VALUES ('delete', old.id, old.question, old.reponse);
+                INSERT INTO cards_fts (rowid, question, reponse)
+                VALUES (new.id, new.question, new.reponse);
+            END
+            """,
+            # Index the existing cards
+            "INSERT INTO cards_fts (cards_fts) VALUES ('rebuild')",
+        ),
+    ),
+    Migration(4, "Index the questions for duplicate detection", _index_duplicates),
+    Migration(5, "Record the user of the reviews", _add_review_users),
+    Migration(6, "Schedule the cards for spaced repetition", _schedule_cards),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Get the schema version stored in the database file."""
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(conn: Connection) -> List[int]:
+    """Apply the migrations newer than the stored schema version.
+    Must be called inside a transaction, the version is stored with them.
+    On a file database the engine lets SQLAlchemy emit the BEGIN, so the DDL
+    is part of it and a failing migration rolls every step back
+    (see `config.listen_transactions`).
+    :param conn: The database connection.
+    :return: The versions of the applied migrations."""
+    current = get_schema_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logging.info(f"Apply migration {migration.version}: {migration.description}")
+        migration.upgrade(conn)
+        applied.append(migration.version)
+    if applied:
+        # PRAGMA does not accept bound parameters
+        conn.execute(text(f"PRAGMA user_version = {int(applied[-1])}"))
+    return applied
@@ -0,0 +1,174 @@
+import logging
+import threading
+from collections import deque
+from typing import Deque, Iterable, Optional, Tuple
+
+from src.db import services
+from src.db.cache import cache
+from src.db.tables import Card
+
+logging.debug("Prefetch module loaded.")
+
+DEFAULT_SIZE = 10
+DEFAULT_LOW_WATER = 3
+
+
+class CardPrefetcher:
+    """Buffer of the next quiz cards of one session.
+
+    The current card is pinned until `advance` is called, so reruns keep
+    showing it without any query. The next cards are read in advance, `size`
+    at a time, and the buffer is refilled in a background thread when it
+    drops below `low_water` cards. The cards due for a review (see the
+    scheduler module) come first, the rest is drawn by probability, and a
+    card is never buffered twice. Editing or deleting cards drops the
+    buffer and reloads the current card."""
+
+    def __init__(
+        self,
+        size: int = DEFAULT_SIZE,
+        low_water: int = DEFAULT_LOW_WATER,
+        background: bool = True,
+    ):
+        self.size = size
+        self.low_water = low_water
+        self.background = background  # Refill from a thread, needs a file database
+        self._lock = threading.Lock()
+        self._buffer = deque()  # type: Deque[Card]
+        self._current = None  # type: Optional[Card]
+        # Answered cards stay due until the answer is written (write-behind)
+        self._answered = deque(maxlen=size)  # type: Deque[int]
+        self._selection = ((), None)  # type: Tuple[Tuple[int, ...], Optional[int]]
+        self._generation = 0  # Bumped on each new selection, to drop stale refills
+        self._contents = cache.version(services.CARD_CONTENTS)
+        self._refill_thread = None  # type: Optional[threading.Thread]
+
+    @property
+    def buffered(self) -> int:
+        """The number of cards drawn in advance."""
+        with self._lock:
+            return len(self._buffer)
+
+    def select(self, theme_ids: Iterable[int], user_id: Optional[int] = None):
+        """Set the themes and the user to draw the cards for. A new selection
+        drops the buffer, and the current card if it does not belong to it.
+        :param theme_ids: The IDs of the themes to draw from.
+        :param user_id: The ID of the user, whose probabilities are used."""
+        selection = (tuple(sorted(set(theme_ids))), user_id)
+        with self._lock:
+            if selection == self._selection:
+                return
+            if self._current is not None and (
+                self._current.id_theme not in selection[0]
+                or user_id != self._selection[1]
+            ):
+                self._current = None
+            self._selection = selection
+            self._generation += 1
+            self._buffer.clear()
+
+    def current(self) -> Optional[Card]:
+        """The card to show, the same one until `advance` is called.
+        :return: The card, None if the selected themes have none."""
+        self._reload_if_edited()
+        with self._lock:
+            if self._current is None and self._buffer:
+                self._current = self._buffer.popleft()
+            card = self._current
+        if card is None:
+            # Nothing drawn in advance, e.g. on the first rerun
+            self._refill(self._generation)
+            with self._lock:
+                if self._current is None and self._buffer:
+                    self._current = self._buffer.popleft()
+                card = self._current
+        self._refill_if_low()
+        return card
+
+    def advance(self):
+        """Move on to the next card, e.g. once the current one was answered."""
+        with self._lock:
+            if self._current is not None:
+                self._answered.append(self._current.id)
+            self._current = self._buffer.popleft() if self._buffer else None
+        self._refill_if_low()
+
+    def wait(self, timeout: float | None = None):
+        """Wait for the background refill, if any."""
+        thread = self._refill_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _reload_if_edited(self):
+        contents = cache.version(services.CARD_CONTENTS)
+        with self._lock:
+            if contents == self._contents:
+                return
+            self._contents = contents
+            self._generation += 1
+            self._buffer.clear()
+            current, self._current = self._current, None
+        if current is not None:
+            # Read again, it may have been edited, moved or deleted
+            card = services.get_card(current.id)
+            with self._lock:
+                theme_ids = self._selection[0]
+                if card is not None and card.id_theme in theme_ids:
+                    self._current = card
+
+    def _refill_if_low(self):
+        with self._lock:
+            if len(self._buffer) >= self.low_water or self._refill_thread is not None:
+                return
+            generation = self._generation
+            if self.background:
+                self._refill_thread = threading.Thread(
+                    target=self._refill,
+                    args=(generation,),
+                    name="cards-prefetch",
+                    daemon=True,
+                )
+                self._refill_thread.start()
+                return
+        self._refill(generation)
+
+    def _refill(self, generation: int):
+        try:
+            with self._lock:
+                theme_ids, user_id = self._selection
+                missing = self.size - len(self._buffer)
+                # Cards already shown or buffered are not buffered again
+                taken = {card.id for card in self._buffer}
+                if self._current is not None:
+                    taken.add(self._current.id)
+                answered = set(self._answered)
+            if not theme_ids or missing <= 0:
+                return
+            due = services.next_due_cards(
+                theme_ids, missing + len(taken | answered), user_id=user_id
+            )
+            cards = []
+            for card in due or ():
+                if card.id not in taken and card.id not in answered:
+                    cards.append(card)
+                    taken.add(card.id)
+            if len(cards) < missing:
+                # Drawn with replacement: skip the repeats, a later refill
+                # tops the buffer up
+                drawn = services.sample_cards(
+                    theme_ids, missing - len(cards), user_id=user_id
+                )
+                for card in drawn or ():
+                    if card.id not in taken:
+                        cards.append(card)
+                        taken.add(card.id)
+            cards = cards[:missing]
+            with self._lock:
+                # The selection may have changed meanwhile
+                if cards and generation == self._generation:
+                    self._buffer.extend(cards)
+            logging.debug(f"{len(cards)} card(s) prefetched.")
+        finally:
+            with self._lock:
+                if threading.current_thread() is self._refill_thread:
+                    self._refill_thread = None
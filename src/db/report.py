@@ -0,0 +1,96 @@
+"""Data of the activity report, without any Streamlit dependency.
+
+The answers queued by the write-behind mode are not in the database yet:
+they are counted per day by `write_behind.pending_counts` and folded here
+into the buckets (day, week or month) read from the database."""
+
+import datetime
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from src.db import services
+
+logging.debug("Report module loaded.")
+
+TODAY = "Aujourd´hui"
+LAST_5_DAY = "5 derniers jours"
+LAST_MONTH = "Dernier mois"
+THIS_YEAR = "Cette année"
+PERIODS = [TODAY, LAST_5_DAY, LAST_MONTH, THIS_YEAR]
+
+Pending = Dict[datetime.date, Tuple[int, int]]
+
+
+def period_range(
+    period: str, today: datetime.date
+) -> Tuple[Optional[datetime.date], Optional[datetime.date], str]:
+    """The first and last days of a period and the length of its points.
+    :param period: One of PERIODS, any other value covers every answer.
+    :param today: The current day, the periods end on it.
+    :return: The first day, the last day (None when unbounded) and the bucket."""
+    # Longer periods are plotted by week to keep the number of points low
+    if period == TODAY:
+        return today, today, services.DAY
+    if period == LAST_5_DAY:
+        return today - datetime.timedelta(days=5), today, services.DAY
+    if period == LAST_MONTH:
+        return today - datetime.timedelta(days=30), today, services.DAY
+    if period == THIS_YEAR:
+        return today - datetime.timedelta(days=365), today, services.WEEK
+    return None, None, services.MONTH
+
+
+def pending_in_period(
+    pending: Pending,
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+) -> Pending:
+    """Keep the pending answers of the days of a period.
+    :param pending: The (correct, incorrect) answers not written yet, per day.
+    :param start_date: The first day, None when unbounded.
+    :param end_date: The last day, None when unbounded."""
+    return {
+        day: counts
+        for day, counts in pending.items()
+        if (start_date is None or start_date <= day)
+        and (end_date is None or day <= end_date)
+    }
+
+
+def prepare_data(
+    summary: Optional[dict], pending: Pending, bucket: str
+) -> Tuple[List[dict], dict]:
+    """Merge the pending answers into the summary read from the database.
+    :param summary: The summary of `services.get_stats_summary`, may be None.
+    :param pending: The (correct, incorrect) answers not written yet, per day.
+    :param bucket: The bucket of the summary, the pending days are folded
+        into the first day of their bucket.
+    :return: The rows of the line chart ordered by date, and the totals of
+        the pie chart."""
+    data = {}
+    good_total, bad_total = 0, 0
+    if summary:
+        series = summary["series"]
+        data = {
+            day: {"date": day, "bonnes_reponses": good, "mauvaises_reponses": bad}
+            for day, good, bad in zip(
+                series["date"], series["bonnes_reponses"], series["mauvaises_reponses"]
+            )
+        }
+        good_total = summary["bonnes_reponses"]
+        bad_total = summary["mauvaises_reponses"]
+    for day, (good, bad) in pending.items():
+        start = services.bucket_start(day, bucket)
+        row = data.setdefault(
+            start, {"date": start, "bonnes_reponses": 0, "mauvaises_reponses": 0}
+        )
+        row["bonnes_reponses"] += good
+        row["mauvaises_reponses"] += bad
+        good_total += good
+        bad_total += bad
+    data = sorted(data.values(), key=lambda d: d["date"])
+    pie_data = {
+        "Réponses": ["Bonnes réponses", "Mauvaises réponses"],
+        "Nombre": [good_total, bad_total],
+    }
+    return data, pie_data
@@ -0,0 +1,330 @@
+import logging
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, false, func, select
+
+from src.db import config
+from src.db.tables import Card, UserCardState, get_session
+
+logging.debug("Card sampler module loaded.")
+
+# Weights below this threshold are considered as floating point residue
+_EPSILON = 1e-9
+
+# Each user index copies the weights of a whole theme, only the indexes of
+# the users who drew last are kept
+DEFAULT_MAX_USER_INDEXES = 32
+
+_Key = Tuple[Optional[int], int]  # (user_id, id_theme) of an index
+
+
+class FenwickTree:
+    """Binary indexed tree over float weights.
+
+    Supports point updates, prefix sums and the inverse lookup (which slot
+    holds a given cumulative weight) in O(log n)."""
+
+    def __init__(self, weights: Optional[List[float]] = None):
+        self._weights = []  # type: List[float]
+        self._tree = [0.0]  # 1-based, index 0 unused
+        self.rebuild(weights or [])
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def rebuild(self, weights: List[float]):
+        """Rebuild the tree from scratch in O(n)."""
+        self._weights = list(weights)
+        n = len(self._weights)
+        self._tree = [0.0] + self._weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+
+    def append(self, weight: float) -> int:
+        """Append a new slot and return its index."""
+        index = len(self._weights)
+        self._weights.append(0.0)
+        self._tree.append(0.0)
+        # The new node covers a range of already existing slots
+        i = index + 1
+        low = i - (i & -i)
+        j = i - 1
+        while j > low:
+            self._tree[i] += self._tree[j]
+            j -= j & -j
+        self.set(index, weight)
+        return index
+
+    def get(self, index: int) -> float:
+        return self._weights[index]
+
+    def set(self, index: int, weight: float):
+        """Set the weight of a slot."""
+        delta = weight - self._weights[index]
+        self._weights[index] = weight
+        i = index + 1
+        n = len(self._weights)
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def total(self) -> float:
+        """Return the sum of all weights."""
+        return self.prefix_sum(len(self._weights))
+
+    def prefix_sum(self, count: int) -> float:
+        """Return the sum of the first `count` weights."""
+        result = 0.0
+        i = count
+        while i > 0:
+            result += self._tree[i]
+            i -= i & -i
+        return result
+
+    def find(self, value: float) -> int:
+        """Return the slot whose cumulative range contains `value`."""
+        n = len(self._weights)
+        pos = 0
+        step = 1 << n.bit_length() if n else 0
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= value:
+                pos = nxt
+                value -= self._tree[nxt]
+            step >>= 1
+        # Guard against floating point drift past the last positive slot
+        while pos >= n or self._weights[pos] <= _EPSILON:
+            pos -= 1
+            if pos < 0:
+                raise ValueError("Cannot draw from an empty tree")
+        return pos
+
+
+class _ThemeIndex:
+    """Weighted index of the cards of one theme."""
+
+    def __init__(self, rows: Iterable, overridden: Iterable[int] = ()):
+        ids = []
+        weights = []
+        for card_id, probabilite in rows:
+            ids.append(card_id)
+            weights.append(probabilite or 0.0)
+        self.ids = ids  # type: List[Optional[int]]
+        self.slots = {card_id: slot for slot, card_id in enumerate(ids)}
+        self.free = []  # type: List[int]
+        self.tree = FenwickTree(weights)
+        # Cards weighted by the state of the user rather than their own probability
+        self.overridden = set(overridden)  # type: Set[int]
+
+    def total(self) -> float:
+        return self.tree.total()
+
+    def set(self, card_id: int, weight: float):
+        slot = self.slots.get(card_id)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+                self.ids[slot] = card_id
+                self.tree.set(slot, weight)
+            else:
+                slot = self.tree.append(weight)
+                self.ids.append(card_id)
+            self.slots[card_id] = slot
+        else:
+            self.tree.set(slot, weight)
+
+    def remove(self, card_id: int):
+        slot = self.slots.pop(card_id, None)
+        self.overridden.discard(card_id)
+        if slot is not None:
+            self.tree.set(slot, 0.0)
+            self.ids[slot] = None
+            self.free.append(slot)
+
+    def draw(self, value: float) -> int:
+        return self.ids[self.tree.find(value)]
+
+
+@get_session
+def _load_theme_weights(id_theme: int, user_id: Optional[int] = None, **kwargs):
+    """Load the (id, probabilite, overridden) rows of the cards of a theme,
+    with the probabilities of a user if any."""
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    logging.debug(f"Load sampler weights for theme {id_theme} and user {user_id}.")
+    if user_id is None:
+        stmt = select(Card.id, Card.probabilite, false())
+    else:
+        stmt = select(
+            Card.id,
+            func.coalesce(UserCardState.probabilite, Card.probabilite),
+            UserCardState.card_id.is_not(None),
+        ).outerjoin(
+            UserCardState,
+            and_(UserCardState.card_id == Card.id, UserCardState.user_id == user_id),
+        )
+    return session.execute(stmt.where(Card.id_theme == id_theme)).all()
+
+
+class CardSampler:
+    """In-memory, per-theme weighted index of card ids.
+
+    A card is drawn with a probability proportional to `Card.probabilite`,
+    or to the probability of the user once they answered it: each user gets
+    their own indexes. Indexes are loaded lazily on the first draw of a
+    theme and then kept up to date through `set_weight`/`remove` instead of
+    being reloaded. At most `max_user_indexes` user indexes are kept, the
+    least recently drawn from is dropped and reloaded on its next draw."""
+
+    def __init__(self, max_user_indexes: int = DEFAULT_MAX_USER_INDEXES):
+        self.max_user_indexes = max_user_indexes
+        self._lock = threading.RLock()
+        self._engine = None
+        # Ordered from the least to the most recently drawn from
+        self._indexes = OrderedDict()  # type: OrderedDict[_Key, _ThemeIndex]
+        self._card_theme = {}  # type: Dict[int, int]
+
+    def _check_engine(self):
+        # A new engine means a new database: drop everything
+        if self._engine is not config.engine:
+            self._indexes.clear()
+            self._card_theme.clear()
+            self._engine = config.engine
+
+    def _get_index(
+        self, id_theme: int, user_id: Optional[int]
+    ) -> Optional[_ThemeIndex]:
+        key = (user_id, id_theme)
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+        else:
+            rows = _load_theme_weights(id_theme=id_theme, user_id=user_id)
+            if rows is None:
+                return None
+            index = _ThemeIndex(
+                [(card_id, weight) for card_id, weight, _ in rows],
+                [card_id for card_id, _, overridden in rows if overridden],
+            )
+            self._indexes[key] = index
+            for card_id, _, _ in rows:
+                self._card_theme[card_id] = id_theme
+            if user_id is not None:
+                self._evict_user_indexes()
+        return index
+
+    def _evict_user_indexes(self):
+        user_keys = [key for key in self._indexes if key[0] is not None]
+        for key in user_keys[: max(0, len(user_keys) - self.max_user_indexes)]:
+            logging.debug(f"Drop the sampler index of user {key[0]}, theme {key[1]}.")
+            del self._indexes[key]
+
+    @property
+    def user_indexes(self) -> List[Tuple[int, int]]:
+        """The (user_id, id_theme) of the loaded user indexes, the least
+        recently drawn from first."""
+        with self._lock:
+            return [key for key in self._indexes if key[0] is not None]
+
+    def _theme_indexes(self, id_theme: int) -> List[Tuple[Optional[int], _ThemeIndex]]:
+        return [
+            (user_id, index)
+            for (user_id, theme), index in self._indexes.items()
+            if theme == id_theme
+        ]
+
+    def draw(
+        self, theme_ids: Iterable[int], rng=random, user_id: Optional[int] = None
+    ) -> Optional[int]:
+        """Draw a card ID among the given themes.
+        :param theme_ids: The IDs of the themes to draw from.
+        :param rng: The random generator to use.
+        :param user_id: The ID of the user, None to use the card probabilities."""
+        with self._lock:
+            self._check_engine()
+            indexes = []
+            total = 0.0
+            for id_theme in theme_ids:
+                index = self._get_index(id_theme, user_id)
+                if index is not None and index.total() > _EPSILON:
+                    indexes.append(index)
+                    total += index.total()
+            if not indexes:
+                return None
+
+            value = rng.random() * total
+            for index in indexes:
+                weight = index.total()
+                if value < weight:
+                    return index.draw(value)
+                value -= weight
+            return indexes[-1].draw(indexes[-1].total())
+
+    def set_weight(
+        self,
+        card_id: int,
+        id_theme: int,
+        probabilite: float,
+        user_id: Optional[int] = None,
+    ):
+        """Insert or update the weight of a card.
+        :param card_id: The ID of the card.
+        :param id_theme: The ID of the theme of the card.
+        :param probabilite: The new probability of the card.
+        :param user_id: The ID of the user whose probability changed, None
+            when it is the probability of the card itself."""
+        with self._lock:
+            self._check_engine()
+            previous_theme = self._card_theme.get(card_id)
+            if previous_theme is not None and previous_theme != id_theme:
+                self.remove(card_id)
+                # The user probabilities of the card are unknown here
+                for other_user, _ in self._theme_indexes(id_theme):
+                    if other_user is not None:
+                        del self._indexes[(other_user, id_theme)]
+            for index_user, index in self._theme_indexes(id_theme):
+                if user_id is None and card_id in index.overridden:
+                    continue  # The probability of the user prevails
+                if user_id is not None and index_user != user_id:
+                    continue
+                index.set(card_id, probabilite or 0.0)
+                if user_id is not None:
+                    index.overridden.add(card_id)
+                self._card_theme[card_id] = id_theme
+
+    def remove(self, card_id: int):
+        """Remove a card from the indexes.
+        :param card_id: The ID of the card."""
+        with self._lock:
+            self._check_engine()
+            id_theme = self._card_theme.pop(card_id, None)
+            if id_theme is not None:
+                for _, index in self._theme_indexes(id_theme):
+                    index.remove(card_id)
+
+    def invalidate(self, id_theme: Optional[int] = None):
+        """Drop the indexes of a theme (or of all themes) so they get reloaded.
+        :param id_theme: The ID of the theme, None for all themes."""
+        with self._lock:
+            if id_theme is None:
+                self._indexes.clear()
+                self._card_theme.clear()
+                return
+            for user_id, index in self._theme_indexes(id_theme):
+                del self._indexes[(user_id, id_theme)]
+                for card_id in index.slots:
+                    self._card_theme.pop(card_id, None)
+
+    def drop_user(self, user_id: int):
+        """Drop the indexes of a user.
+        :param user_id: The ID of the user."""
+        with self._lock:
+            for key in [key for key in self._indexes if key[0] == user_id]:
+                del self._indexes[key]
+
+
+sampler = CardSampler()
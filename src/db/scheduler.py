@@ -0,0 +1,59 @@
+"""SM-2 spaced repetition scheduling of the cards.
+
+Each card has an ease factor, a number of successful repetitions in a row
+and an interval in days: a correct answer multiplies the interval by the
+ease, an incorrect one brings the card back the next day. The card is due
+`interval` days after the answer."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+logging.debug("Scheduler module loaded.")
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# SM-2 grades the answers from 0 to 5, the quiz only knows right and wrong
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+
+# Intervals of the first two successful repetitions, in days
+FIRST_INTERVAL = 1.0
+SECOND_INTERVAL = 6.0
+# The intervals grow exponentially, cap them within the range of a datetime
+MAX_INTERVAL = 36500.0
+
+
+class Schedule(NamedTuple):
+    repetitions: int = 0
+    interval: float = 0.0  # in days
+    ease: float = DEFAULT_EASE
+
+
+def quality(is_correct: bool) -> int:
+    """The SM-2 grade of an answer."""
+    return QUALITY_CORRECT if is_correct else QUALITY_INCORRECT
+
+
+def review(schedule: Schedule, grade: int) -> Schedule:
+    """The schedule of a card after an answer.
+    :param schedule: The schedule before the answer.
+    :param grade: The SM-2 grade of the answer, from 0 to 5."""
+    miss = 5 - grade
+    ease = max(MIN_EASE, schedule.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    if grade < 3:
+        return Schedule(0, FIRST_INTERVAL, ease)
+    if schedule.repetitions == 0:
+        interval = FIRST_INTERVAL
+    elif schedule.repetitions == 1:
+        interval = SECOND_INTERVAL
+    else:
+        # The interval grows with the ease the card had until now
+        interval = min(round(schedule.interval * schedule.ease), MAX_INTERVAL)
+    return Schedule(schedule.repetitions + 1, interval, ease)
+
+
+def due_at(schedule: Schedule, answered_at: datetime) -> datetime:
+    """When a card answered at `answered_at` is due again."""
+    return answered_at + timedelta(days=schedule.interval)
@@ -1,26 +1,64 @@
 import logging
-from datetime import datetime
-from typing import List, Optional
+import random
+import re
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
 
-from sqlalchemy import and_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import (
+    Date,
+    Integer,
+    and_,
+    cast,
+    column,
+    delete,
+    func,
+    or_,
+    select,
+    table,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import aliased, joinedload
 
+from src.db import config, contention, dedup, scheduler
+from src.db.cache import cache, cached
+from src.db.columnar import Columns, select_columns, to_arrays
+from src.db.formats import CSV, WRITERS
+from src.db.sampler import sampler
+from src.db.scheduler import Schedule
 from src.db.tables import (
     Card,
+    CardBucket,
+    Review,
+    RollupState,
     Stat,
     Theme,
+    ThemeStat,
+    User,
+    UserCardState,
+    UserStat,
     add_row,
     count_rows,
     delete_row,
     get_all_rows,
     get_row_by,
     get_row_by_id,
+    get_session,
     update_row,
 )
 
 FACTEUR_PROBA_CORRECT = 0.9
 FACTEUR_PROBA_INCORRECT = 1.1
 
+# Cache versions, bumped by the services writing to the matching tables
+CARDS = "cards"
+THEMES = "themes"
+STATS = "stats"
+USERS = "users"
+# Questions and answers of the cards only, not bumped by the answers
+CARD_CONTENTS = "card_contents"
+
 # --- CRUD operations for the Card entity ---
 
 
@@ -30,22 +68,94 @@ def create_card(question: str, reponse: str, probabilite: float, id_theme: int):
     :param reponse: The answer to the question.
     :param probabilite: The probability of the card.
     :param id_theme: The ID of the theme."""
-    new_card = add_row(
-        table=Card,
+    new_card = _create_card(
         question=question,
         reponse=reponse,
         probabilite=probabilite,
         id_theme=id_theme,
     )
+    cache.bump(CARDS)
+    if new_card is not None:
+        sampler.set_weight(new_card.id, id_theme, probabilite)
     logging.info(f"Card '{question}' created.")
     return new_card
 
 
+def create_cards(cards: Iterable[dict]) -> int | None:
+    """Create cards in bulk, with a single executemany in one transaction.
+    :param cards: Dicts with the question, reponse, probabilite and id_theme.
+    :return: The number of created cards, None if the transaction failed."""
+    cards = list(cards)
+    counter = _create_cards(cards=cards)
+    cache.bump(CARDS)
+    if counter is not None:
+        # The new cards are picked up when the themes are reloaded
+        for id_theme in {card["id_theme"] for card in cards}:
+            sampler.invalidate(id_theme)
+        logging.info(f"{counter} card(s) created.")
+    return counter
+
+
+@get_session(write=True)
+def _create_card(**kwargs) -> Card:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    card = Card(fingerprint=dedup.fingerprint(kwargs["question"]), **kwargs)
+    session.add(card)
+    session.flush()  # Get the ID of the card to index it
+    _index_cards(session, [(card.id, card.question)])
+    session.commit()
+    session.refresh(card)
+    logging.debug(f"Row {card.id} in table 'cards' created")
+    return card
+
+
+@get_session(write=True)
+def _create_cards(cards: List[dict], **kwargs) -> int:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    if cards:
+        rows = [
+            dict(card, fingerprint=dedup.fingerprint(card["question"]))
+            for card in cards
+        ]
+        # Return the questions too: the rows may come back in any order
+        inserted = session.execute(
+            insert(Card).returning(Card.id, Card.question), rows
+        ).all()
+        _index_cards(session, inserted)
+        session.commit()
+    return len(cards)
+
+
+def _index_cards(session, cards: Iterable[tuple]):
+    """Insert the LSH buckets of (card ID, question) pairs."""
+    rows = [row for id, question in cards for row in dedup.index_rows(id, question)]
+    if rows:
+        session.execute(insert(CardBucket), rows)
+
+
+@cached(CARDS)
 def get_card(id: int) -> Card | None:
     """Get a card by its ID.
     :param id: The ID of the card.
     """
-    return get_row_by_id(table=Card, id=id)
+    return get_row_by_id(table=Card, id=id, service="get_card")
+
+
+def get_cards(ids: Iterable[int]) -> List[Card] | None:
+    """Get several cards with a single query.
+    :param ids: The IDs of the cards.
+    :return: The cards found, in the order of `ids`."""
+    ids = list(ids)
+    if not ids:
+        return []
+    return _get_cards(ids=ids)
+
+
+@get_session
+def _get_cards(ids: List[int], **kwargs) -> List[Card]:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    cards = {c.id: c for c in session.scalars(select(Card).where(Card.id.in_(ids)))}
+    return [cards[id] for id in ids if id in cards]
 
 
 def update_card(
@@ -58,60 +168,567 @@ def update_card(
     :param probabilite: The probability of the card.
     :param id_theme: The ID of the theme.
     """
-    card = update_row(
-        table=Card,
+    card = _update_card(
         id=id,
         question=question,
         reponse=reponse,
         probabilite=probabilite,
         id_theme=id_theme,
     )
+    cache.bump(CARDS, CARD_CONTENTS)
+    if card is not None:
+        sampler.set_weight(id, id_theme, probabilite)
     logging.info(f"Card {id} updated")
     return card
 
 
+@get_session(write=True)
+def _update_card(id: int, **kwargs) -> Card | None:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    card = session.get(Card, id)
+    if card is None:
+        logging.error(f"Row in table 'cards' with id={id} not found.")
+        return None
+    if kwargs["question"] != card.question:
+        kwargs["fingerprint"] = dedup.fingerprint(kwargs["question"])
+        session.execute(delete(CardBucket).where(CardBucket.card_id == id))
+        _index_cards(session, [(id, kwargs["question"])])
+    for key, value in kwargs.items():
+        setattr(card, key, value)
+    session.commit()
+    session.refresh(card)
+    logging.debug(f"Row in table 'cards' with id={id} updated")
+    return card
+
+
 def delete_card(id: int):
     """Delete a card from the database.
     :param id: The ID of the card.
     """
-    delete_row(table=Card, id=id)
+    delete_row(table=Card, id=id, service="delete_card")
+    cache.bump(CARDS, CARD_CONTENTS)
+    sampler.remove(id)
     logging.info(f"Card {id} deleted")
 
 
+@cached(CARDS)
 def get_all_cards() -> List[Card]:
     """Get all cards from the database."""
-    return get_all_rows(table=Card)
+    return get_all_rows(table=Card, service="get_all_cards")
 
 
+@cached(CARDS)
 def get_number_of_cards() -> int:
     """Get the number of cards in the database."""
-    return count_rows(table=Card)
+    return count_rows(table=Card, service="get_number_of_cards")
 
 
+@cached(CARDS, THEMES)
 def get_cards_by_theme(id_theme: int) -> List[Card]:
     """Get all cards by theme, with the theme relationship loaded."""
-    return get_all_rows(table=Card, id_theme=id_theme, options=[joinedload(Card.theme)])
+    return get_all_rows(
+        table=Card,
+        id_theme=id_theme,
+        options=[joinedload(Card.theme)],
+        service="get_cards_by_theme",
+    )
+
+
+# Sort keys accepted by `list_cards`
+CARD_ORDERS = {
+    "id": Card.id,
+    "question": Card.question,
+    "reponse": Card.reponse,
+    "probabilite": Card.probabilite,
+}
+
+
+@cached(CARDS)
+def list_cards(
+    theme_id: int,
+    after_id: Optional[int] = None,
+    limit: int = 50,
+    order_by: str = "id",
+) -> List[Card]:
+    """Get a page of the cards of a theme with keyset pagination.
+
+    Pages are addressed by the last card of the previous page rather than
+    an offset, so fetching any page only reads `limit` rows.
+    :param theme_id: The ID of the theme.
+    :param after_id: The ID of the last card of the previous page, None for
+        the first page.
+    :param limit: The maximum number of cards to return.
+    :param order_by: One of `CARD_ORDERS`, ties are broken by ID.
+    """
+    if order_by not in CARD_ORDERS:
+        raise ValueError(f"Cannot order cards by '{order_by}'")
+    return _list_cards(
+        theme_id=theme_id, after_id=after_id, limit=limit, order_by=order_by
+    )
+
+
+@get_session
+def _list_cards(theme_id, after_id, limit, order_by, **kwargs) -> List[Card]:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    stmt = _page_of_cards(select(Card), theme_id, after_id, limit, order_by)
+    return session.execute(stmt).scalars().all()
+
+
+@cached(CARDS)
+def list_card_columns(
+    theme_id: int,
+    after_id: Optional[int] = None,
+    limit: int = 50,
+    order_by: str = "id",
+) -> Columns | None:
+    """Same page as `list_cards`, as columns without building Card objects.
+    The columns are shared with the cache and must not be modified.
+    :return: The id, question, reponse and probabilite columns."""
+    if order_by not in CARD_ORDERS:
+        raise ValueError(f"Cannot order cards by '{order_by}'")
+    return _list_card_columns(
+        theme_id=theme_id, after_id=after_id, limit=limit, order_by=order_by
+    )
+
+
+@get_session
+def _list_card_columns(theme_id, after_id, limit, order_by, **kwargs) -> Columns:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    stmt = select(Card.id, Card.question, Card.reponse, Card.probabilite)
+    stmt = _page_of_cards(stmt, theme_id, after_id, limit, order_by)
+    return select_columns(session, stmt)
+
+
+def _page_of_cards(stmt, theme_id, after_id, limit, order_by):
+    column = CARD_ORDERS[order_by]
+    stmt = stmt.where(Card.id_theme == theme_id)
+    if after_id is not None:
+        if column is Card.id:
+            stmt = stmt.where(Card.id > after_id)
+        else:
+            cursor = select(column).where(Card.id == after_id).scalar_subquery()
+            stmt = stmt.where(
+                or_(column > cursor, and_(column == cursor, Card.id > after_id))
+            )
+    return stmt.order_by(column, Card.id).limit(limit)
+
+
+def sample_card(
+    theme_ids: Iterable[int], rng=random, user_id: Optional[int] = None
+) -> Card | None:
+    """Draw a card among the given themes, weighted by its probability.
+    :param theme_ids: The IDs of the themes to draw from.
+    :param rng: The random generator to use.
+    :param user_id: The ID of the user, whose probabilities are used.
+    """
+    card_id = sampler.draw(theme_ids, rng=rng, user_id=user_id)
+    if card_id is None:
+        return None
+    return get_card(card_id)
+
+
+def sample_cards(
+    theme_ids: Iterable[int], n: int, rng=random, user_id: Optional[int] = None
+) -> List[Card] | None:
+    """Draw several cards among the given themes, independently of each
+    other, and read them with a single query.
+    :param theme_ids: The IDs of the themes to draw from.
+    :param n: The number of draws.
+    :param rng: The random generator to use.
+    :param user_id: The ID of the user, whose probabilities are used.
+    :return: The drawn cards in order, a card may be drawn several times."""
+    theme_ids = list(theme_ids)
+    ids = []
+    for _ in range(n):
+        card_id = sampler.draw(theme_ids, rng=rng, user_id=user_id)
+        if card_id is None:
+            break
+        ids.append(card_id)
+    return get_cards(ids)
+
+
+def draw_card(theme_ids: Iterable[int], user_id: Optional[int] = None) -> Card | None:
+    """Draw a card among the given themes, weighted by its probability.
+
+    The draw is done in a single query: each card gets the exponential key
+    ln(u) / probabilite with u uniform in (0, 1] and the card with the
+    largest key wins, which selects it with a probability proportional to
+    `probabilite` while SQLite only keeps the current best row in memory.
+    Without the math functions of SQLite, the card is drawn by `sample_card`.
+    :param theme_ids: The IDs of the themes to draw from.
+    :param user_id: The ID of the user, whose probabilities are used.
+    """
+    theme_ids = list(theme_ids)
+    if not theme_ids:
+        return None
+    if not config.has_math_functions():
+        return sample_card(theme_ids, user_id=user_id)
+    return _draw_card(theme_ids=theme_ids, user_id=user_id)
+
+
+@get_session
+def _draw_card(theme_ids: List[int], user_id: Optional[int], **kwargs) -> Card | None:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    # 53 random bits plus one, over 2**53: exact doubles in (0, 1], ln(u) is never NULL
+    uniform = (func.random().op("&")(2**53 - 1) + 1) / float(2**53)
+    stmt = select(Card).where(Card.id_theme.in_(theme_ids))
+    probabilite = Card.probabilite
+    if user_id is not None:
+        stmt = stmt.outerjoin(
+            UserCardState,
+            and_(UserCardState.card_id == Card.id, UserCardState.user_id == user_id),
+        )
+        probabilite = func.coalesce(UserCardState.probabilite, Card.probabilite)
+    stmt = (
+        stmt.where(probabilite > 0)
+        .order_by((func.ln(uniform) / probabilite).desc())
+        .limit(1)
+    )
+    return session.execute(stmt).scalar_one_or_none()
+
+
+def next_due_cards(
+    theme_ids: Iterable[int],
+    n: int = 10,
+    now: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> List[Card] | None:
+    """Get the cards due for a review among the given themes, the most
+    overdue first.
+
+    Each theme reads at most `n` cards from the (id_theme, due_at) index and
+    the themes are merged with a UNION ALL, so only the due cards are read
+    whatever the size of the deck. With a user, the schedule of the user
+    applies to the cards they answered: their due states are read from the
+    (user_id, due_at) index, and the cards of each theme are read from the
+    (id_theme, due_at) index skipping the cards the user answered.
+    :param theme_ids: The IDs of the themes to review.
+    :param n: The maximum number of cards to return.
+    :param now: The current time, cards due until then are returned.
+    :param user_id: The ID of the user, None for the shared schedule."""
+    theme_ids = list(theme_ids)
+    if not theme_ids or n <= 0:
+        return []
+    return _next_due_cards(
+        theme_ids=theme_ids, n=n, now=now or datetime.today(), user_id=user_id
+    )
+
+
+def _due_cards_of_theme(id_theme: int, n: int, now: datetime, user_id=None):
+    """Select the IDs and due dates of the `n` most overdue cards of a theme,
+    without the cards having a state for the user if any."""
+    stmt = select(Card.id, Card.due_at).where(
+        Card.id_theme == id_theme, Card.due_at <= now
+    )
+    if user_id is not None:
+        answered = select(UserCardState.card_id).where(
+            UserCardState.user_id == user_id, UserCardState.card_id == Card.id
+        )
+        stmt = stmt.where(~answered.exists())
+    return stmt.order_by(Card.due_at).limit(n).subquery()
+
+
+def _due_cards_of_user(theme_ids: List[int], n: int, now: datetime, user_id: int):
+    """Select the IDs and due dates of the `n` most overdue cards of the
+    given themes that the user answered, on their own schedule."""
+    return (
+        select(UserCardState.card_id.label("id"), UserCardState.due_at)
+        .join(Card, Card.id == UserCardState.card_id)
+        .where(
+            UserCardState.user_id == user_id,
+            UserCardState.due_at <= now,
+            Card.id_theme.in_(theme_ids),
+        )
+        .order_by(UserCardState.due_at)
+        .limit(n)
+        .subquery()
+    )
+
+
+@get_session
+def _next_due_cards(
+    theme_ids: List[int], n: int, now: datetime, user_id=None, **kwargs
+):
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    # LIMIT is not allowed in the members of a compound select, wrap them
+    parts = [_due_cards_of_theme(id_theme, n, now, user_id) for id_theme in theme_ids]
+    if user_id is not None:
+        parts.append(_due_cards_of_user(theme_ids, n, now, user_id))
+    due = union_all(*[select(part.c.id, part.c.due_at) for part in parts]).subquery()
+    stmt = (
+        select(Card)
+        .join(due, due.c.id == Card.id)
+        .order_by(due.c.due_at, Card.id)
+        .limit(n)
+    )
+    return session.execute(stmt).scalars().all()
+
+
+@cached(CARDS)
+def find_duplicates(theme_id: int) -> List[List[Card]] | None:
+    """Find the groups of cards of a theme with near-duplicate questions.
+    Only the cards sharing an LSH bucket are compared, not every pair.
+    :param theme_id: The ID of the theme.
+    :return: The groups of cards, each one ordered by ID."""
+    return _find_duplicates(theme_id=theme_id)
+
+
+@get_session
+def _find_duplicates(theme_id: int, **kwargs) -> List[List[Card]]:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    # Exact duplicates share the indexed fingerprint, no shingles to compare
+    repeated = (
+        select(Card.fingerprint)
+        .where(Card.id_theme == theme_id)
+        .group_by(Card.fingerprint)
+        .having(func.count() > 1)
+    )
+    exact = session.execute(
+        select(Card.fingerprint, Card.id)
+        .where(Card.id_theme == theme_id, Card.fingerprint.in_(repeated))
+        .order_by(Card.fingerprint, Card.id)
+    ).all()
+    duplicates = [
+        (a, b)
+        for (fingerprint, a), (other, b) in zip(exact, exact[1:])
+        if fingerprint == other
+    ]
+
+    bucket, other = aliased(CardBucket), aliased(CardBucket)
+    card, other_card = aliased(Card), aliased(Card)
+    candidates = session.execute(
+        select(bucket.card_id, other.card_id)
+        .distinct()
+        .join(
+            other, and_(bucket.bucket == other.bucket, bucket.card_id < other.card_id)
+        )
+        .join(card, card.id == bucket.card_id)
+        .join(other_card, other_card.id == other.card_id)
+        .where(
+            card.id_theme == theme_id,
+            other_card.id_theme == theme_id,
+            card.fingerprint != other_card.fingerprint,
+        )
+    ).all()
+    ids = {id for pair in candidates + duplicates for id in pair}
+    cards = {c.id: c for c in session.scalars(select(Card).where(Card.id.in_(ids)))}
+    hashes = {
+        id: dedup.shingles(cards[id].question) for pair in candidates for id in pair
+    }
+    duplicates += [
+        (a, b)
+        for a, b in candidates
+        if dedup.similarity(hashes[a], hashes[b]) >= dedup.THRESHOLD
+    ]
+    return [[cards[id] for id in group] for group in dedup.group_pairs(duplicates)]
+
+
+def find_similar_cards(cards: Iterable[tuple]) -> List[int | None] | None:
+    """Find an existing near-duplicate of each card, in its own theme.
+    :param cards: (question, id_theme) pairs.
+    :return: The ID of a near-duplicate card, or None, for each pair."""
+    return _find_similar_cards(cards=list(cards))
+
+
+# Bound parameters per query, well below the SQLite limit
+_MAX_PARAMETERS = 5000
+
+
+@get_session
+def _find_similar_cards(cards: List[tuple], **kwargs) -> List[int | None]:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    fingerprints = [dedup.fingerprint(question) for question, _ in cards]
+
+    # Exact duplicates first, through the indexed fingerprints
+    exact = {}  # (fingerprint, id_theme) -> id
+    wanted = list(set(fingerprints))
+    for start in range(0, len(wanted), _MAX_PARAMETERS):
+        rows = session.execute(
+            select(Card.fingerprint, Card.id_theme, Card.id)
+            .where(Card.fingerprint.in_(wanted[start : start + _MAX_PARAMETERS]))
+            .order_by(Card.id)
+        )
+        for fingerprint, id_theme, id in rows:
+            exact.setdefault((fingerprint, id_theme), id)
+    results = [
+        exact.get((fingerprint, id_theme))
+        for fingerprint, (_, id_theme) in zip(fingerprints, cards)
+    ]
+
+    # Then the near-duplicates of the others, through the LSH buckets
+    remaining = [i for i, match in enumerate(results) if match is None]
+    hashes = {i: dedup.shingles(cards[i][0]) for i in remaining}
+    card_buckets = {i: dedup.buckets(hashes[i]) for i in remaining}
+    wanted = list({b for bs in card_buckets.values() for b in bs})
+
+    # bucket -> [(id, id_theme, shingles)] of the existing cards
+    existing = {}
+    shingles_by_id = {}
+    for start in range(0, len(wanted), _MAX_PARAMETERS):
+        rows = session.execute(
+            select(CardBucket.bucket, Card.id, Card.id_theme, Card.question)
+            .join(Card, Card.id == CardBucket.card_id)
+            .where(CardBucket.bucket.in_(wanted[start : start + _MAX_PARAMETERS]))
+        )
+        for bucket, id, id_theme, question in rows:
+            if id not in shingles_by_id:
+                shingles_by_id[id] = dedup.shingles(question)
+            existing.setdefault(bucket, []).append((id, id_theme))
+
+    for i in remaining:
+        id_theme = cards[i][1]
+        for bucket in card_buckets[i]:
+            for id, other_theme in existing.get(bucket, ()):
+                if other_theme != id_theme:
+                    continue
+                if dedup.similarity(hashes[i], shingles_by_id[id]) >= dedup.THRESHOLD:
+                    results[i] = id
+                    break
+            if results[i] is not None:
+                break
+    return results
+
+
+# Full-text index of the questions and answers, maintained by triggers
+cards_fts = table("cards_fts", column("rowid"), column("cards_fts"), column("rank"))
+
+
+def _match_query(query: str) -> str:
+    """Turn user input into an FTS5 query matching every word as a prefix."""
+    # Quoting the words escapes the FTS5 syntax (AND, NEAR, "...", ...)
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+
+def search_cards(
+    query: str, theme_ids: Optional[Iterable[int]] = None, limit: int = 20
+) -> List[Card] | None:
+    """Search the cards whose question or answer contain every word of a
+    query, as a word or a word prefix, the most relevant first (BM25).
+    :param query: The words to search for, case and accents are ignored.
+    :param theme_ids: The IDs of the themes to search, None for all.
+    :param limit: The maximum number of cards to return."""
+    match = _match_query(query)
+    if not match:
+        return []
+    if theme_ids is not None:
+        theme_ids = tuple(sorted(set(theme_ids)))  # Hashable cache key
+    return _cached_search_cards(match, theme_ids, limit)
+
+
+@cached(CARDS)
+def _cached_search_cards(match, theme_ids, limit):
+    return _search_cards(match=match, theme_ids=theme_ids, limit=limit)
+
+
+@get_session
+def _search_cards(match, theme_ids, limit, **kwargs) -> List[Card]:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    stmt = (
+        select(Card)
+        .join(cards_fts, cards_fts.c.rowid == Card.id)
+        .where(cards_fts.c.cards_fts.match(match))
+        .order_by(cards_fts.c.rank)
+        .limit(limit)
+    )
+    if theme_ids is not None:
+        stmt = stmt.where(Card.id_theme.in_(theme_ids))
+    return session.execute(stmt).scalars().all()
+
+
+def export_cards(
+    theme_ids: Optional[Iterable[int]] = None,
+    format: str = CSV,
+    chunk_size: int = 1000,
+) -> Iterator[bytes]:
+    """Stream the cards as a deck file, chunk by chunk.
+
+    Rows are read from a Core select joined with the themes and consumed
+    with `yield_per`, so neither ORM objects nor the whole deck are held in
+    memory. The session stays open until the generator is exhausted.
+    :param theme_ids: The IDs of the themes to export, None for all.
+    :param format: One of `formats.FORMATS`.
+    :param chunk_size: The number of cards per yielded chunk."""
+    if format not in WRITERS:
+        raise ValueError(f"Unknown deck format '{format}'")
+    stmt = (
+        select(Card.question, Card.reponse, Card.probabilite, Theme.theme)
+        .join(Theme, Card.id_theme == Theme.id)
+        .order_by(Card.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if theme_ids is not None:
+        stmt = stmt.where(Card.id_theme.in_(list(theme_ids)))
+    logging.debug(f"Export cards as {format}.")
+    with config.get_session() as session:
+        rows = session.execute(stmt)
+        yield from WRITERS[format](rows, chunk_size)
+
+
+def get_card_columns(
+    theme_ids: Optional[Iterable[int]] = None, arrays: bool = False
+) -> Columns | None:
+    """Get the cards as columns, without building Card objects.
+    The columns are shared with the cache and must not be modified.
+    :param theme_ids: The IDs of the themes to read, None for all.
+    :param arrays: Return `id`, `probabilite` and `id_theme` as NumPy arrays.
+    :return: The id, question, reponse, probabilite, id_theme and theme
+        columns, ordered by card ID."""
+    if theme_ids is not None:
+        theme_ids = tuple(sorted(set(theme_ids)))  # Hashable cache key
+    return _cached_card_columns(theme_ids, arrays)
+
+
+@cached(CARDS, THEMES)
+def _cached_card_columns(theme_ids, arrays):
+    columns = _card_columns(theme_ids=theme_ids)
+    if columns is not None and arrays:
+        columns = to_arrays(
+            columns, {"id": "int64", "probabilite": "float64", "id_theme": "int64"}
+        )
+    return columns
+
+
+@get_session
+def _card_columns(theme_ids, **kwargs) -> Columns:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    stmt = (
+        select(
+            Card.id,
+            Card.question,
+            Card.reponse,
+            Card.probabilite,
+            Card.id_theme,
+            Theme.theme,
+        )
+        .join(Theme, Card.id_theme == Theme.id)
+        .order_by(Card.id)
+    )
+    if theme_ids is not None:
+        stmt = stmt.where(Card.id_theme.in_(theme_ids))
+    return select_columns(session, stmt)
 
 
 # --- CRUD operations for the Themes entity ---
 def create_theme(theme: str):
     """Create a new theme in the database.
     :param theme: The theme of the card."""
-    new_theme = add_row(table=Theme, theme=theme)
+    new_theme = add_row(table=Theme, theme=theme, service="create_theme")
+    cache.bump(THEMES)
     logging.info(f"Theme '{theme}' created.")
     return new_theme
 
 
+@cached(THEMES)
 def get_theme(id_theme: int):
     """Get a theme by its ID.
     :param id_theme: The ID of the theme.
     """
-    return get_row_by_id(table=Theme, id=id_theme)
+    return get_row_by_id(table=Theme, id=id_theme, service="get_theme")
 
 
 def get_or_create_theme(name: str) -> Theme:
     """Get a theme by its name. Create it otherwise"""
-    theme = get_row_by(Theme, theme=name)
+    theme = get_row_by(Theme, theme=name, service="get_or_create_theme")
     if theme is None:
         theme = create_theme(name)
     return theme
@@ -122,20 +739,60 @@ def update_theme(id_theme: int, theme: str):
     :param id_theme: The ID of the theme.
     :param theme: The theme of the card.
     """
-    return update_row(table=Theme, id=id_theme, theme=theme)
+    row = update_row(table=Theme, id=id_theme, theme=theme, service="update_theme")
+    cache.bump(THEMES)
+    return row
 
 
 def delete_theme(id_theme: int):
     """Delete a theme from the database.
     :param id_theme: The ID of the theme.
     """
-    delete_row(table=Theme, id=id_theme)
+    delete_row(table=Theme, id=id_theme, service="delete_theme")
+    cache.bump(THEMES, CARDS, CARD_CONTENTS)  # Cards are deleted in cascade
+    sampler.invalidate(id_theme)
     logging.info(f"Theme {id_theme} deleted")
 
 
+@cached(THEMES)
 def get_all_themes() -> List[Theme]:
     """Get all themes from the database."""
-    return get_all_rows(table=Theme)
+    return get_all_rows(table=Theme, service="get_all_themes")
+
+
+# --- CRUD operations for the Users entity ---
+
+
+def create_user(name: str) -> User | None:
+    """Create a new user in the database.
+    :param name: The name of the user."""
+    user = add_row(table=User, name=name, service="create_user")
+    cache.bump(USERS)
+    logging.info(f"User '{name}' created.")
+    return user
+
+
+def get_or_create_user(name: str) -> User | None:
+    """Get a user by its name. Create it otherwise"""
+    user = get_row_by(User, name=name, service="get_or_create_user")
+    if user is None:
+        user = create_user(name)
+    return user
+
+
+@cached(USERS)
+def get_all_users() -> List[User]:
+    """Get all users from the database."""
+    return get_all_rows(table=User, service="get_all_users")
+
+
+def delete_user(user_id: int):
+    """Delete a user, with their card probabilities and stats.
+    :param user_id: The ID of the user."""
+    delete_row(table=User, id=user_id, service="delete_user")
+    cache.bump(USERS, STATS)
+    sampler.drop_user(user_id)
+    logging.info(f"User {user_id} deleted")
 
 
 # --- operations for the Stats entity ---
@@ -149,28 +806,43 @@ def update_stats(is_correct: bool):
 
     is_created = False
 
-    if stats := get_row_by(table=Stat, date=date):
+    if stats := get_row_by(table=Stat, date=date, service="update_stats"):
         # Update the stats
         if is_correct:
             row = update_row(
-                table=Stat, id=stats.id, bonnes_reponses=stats.bonnes_reponses + 1
+                table=Stat,
+                id=stats.id,
+                bonnes_reponses=stats.bonnes_reponses + 1,
+                service="update_stats",
             )
         else:
             row = update_row(
-                table=Stat, id=stats.id, mauvaises_reponses=stats.mauvaises_reponses + 1
+                table=Stat,
+                id=stats.id,
+                mauvaises_reponses=stats.mauvaises_reponses + 1,
+                service="update_stats",
             )
     else:
         # Create a new entry
         if is_correct:
             row = add_row(
-                table=Stat, date=date, bonnes_reponses=1, mauvaises_reponses=0
+                table=Stat,
+                date=date,
+                bonnes_reponses=1,
+                mauvaises_reponses=0,
+                service="update_stats",
             )
         else:
             row = add_row(
-                table=Stat, date=date, bonnes_reponses=0, mauvaises_reponses=1
+                table=Stat,
+                date=date,
+                bonnes_reponses=0,
+                mauvaises_reponses=1,
+                service="update_stats",
             )
         is_created = True
 
+    cache.bump(STATS)
     return row, is_created
 
 
@@ -185,10 +857,18 @@ def update_card_probability(card_id: int, is_correct: bool):
         # Limit the probability to be between 0.1 and 1.0
         new_prob = max(0.1, min(new_prob, 1.0))
 
-        update_row(table=Card, id=card_id, probabilite=new_prob)
+        update_row(
+            table=Card,
+            id=card_id,
+            probabilite=new_prob,
+            service="update_card_probability",
+        )
+        cache.bump(CARDS)
+        sampler.set_weight(card_id, card.id_theme, new_prob)
         logging.info(f"Card with ID {card_id} probability updated to {new_prob}")
 
 
+@cached(STATS)
 def get_stats(
     start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
 ) -> List[Stat]:
@@ -204,4 +884,460 @@ def get_stats(
         filters.append(Stat.date <= end_date)
 
     # Utilisez get_all_rows avec les filtres
-    return get_all_rows(table=Stat, filters=and_(*filters) if filters else None)
+    return get_all_rows(
+        table=Stat, filters=and_(*filters) if filters else None, service="get_stats"
+    )
+
+
+def record_answer(
+    card_id: int,
+    is_correct: bool,
+    latency_ms: int | None = None,
+    user_id: int | None = None,
+) -> float | None:
+    """Record an answer in a single transaction.
+
+    The answer is appended to the review log, the probability of the card is
+    updated in SQL and today's stats are incremented by the rollup, so
+    concurrent answers are never lost. The answers of a user update their
+    own probability of the card and their own stats instead, so users never
+    write to the same rows.
+    :param card_id: The ID of the card.
+    :param is_correct: Whether the user answered correctly or not.
+    :param latency_ms: The time taken to answer, in milliseconds.
+    :param user_id: The ID of the user, None for the shared state.
+    :return: The new probability of the card, None if it was not found."""
+    results = record_answers([(card_id, is_correct, None, latency_ms, user_id)])
+    if not results:
+        return None
+    return results[0][2]
+
+
+def record_answers(answers: Iterable[tuple]) -> List[tuple] | None:
+    """Record a batch of answers in a single transaction.
+    :param answers: (card_id, is_correct, answered_at[, latency_ms[, user_id]])
+        tuples, `answered_at` defaults to now.
+    :return: (card_id, id_theme, new_probability) for each recorded answer,
+        None if the transaction failed."""
+    results = _record_answers(answers=list(answers))
+    cache.bump(CARDS, STATS)
+    if results is None:
+        return None
+    for card_id, id_theme, new_prob, user_id in results:
+        sampler.set_weight(card_id, id_theme, new_prob, user_id=user_id)
+    logging.info(f"{len(results)} answer(s) recorded")
+    return [result[:3] for result in results]
+
+
+@get_session(write=True)
+def _record_answers(answers: List[tuple], **kwargs):
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    results = []
+    reviews = []
+    user_stats = {}
+    schedules = {}  # The new schedule and due date of the answered cards
+    for card_id, is_correct, answered_at, *extra in answers:
+        latency_ms, user_id = (extra + [None, None])[:2]
+        answered_at = answered_at or datetime.today()
+        fac = FACTEUR_PROBA_CORRECT if is_correct else FACTEUR_PROBA_INCORRECT
+        if user_id is None:
+            row = session.execute(
+                update(Card)
+                .where(Card.id == card_id)
+                .values(
+                    probabilite=func.max(0.1, func.min(Card.probabilite * fac, 1.0))
+                )
+                .returning(
+                    Card.id_theme,
+                    Card.probabilite,
+                    Card.repetitions,
+                    Card.interval,
+                    Card.ease,
+                )
+                .execution_options(synchronize_session=False)
+            ).first()
+            if row is not None:
+                schedule = schedules.get(card_id, (Schedule(*row[2:]), None))[0]
+                schedule = scheduler.review(schedule, scheduler.quality(is_correct))
+                schedules[card_id] = schedule, scheduler.due_at(schedule, answered_at)
+                row = row[:2]
+        else:
+            row = _update_user_card(
+                session, user_id, card_id, fac, is_correct, answered_at
+            )
+        if row is None:
+            logging.error(f"Row in table 'cards' with id={card_id} not found.")
+            continue
+        id_theme, new_prob = row
+        results.append((card_id, id_theme, new_prob, user_id))
+        reviews.append(
+            {
+                "card_id": card_id,
+                "theme_id": id_theme,
+                "reviewed_at": answered_at,
+                "correct": bool(is_correct),
+                "latency_ms": latency_ms,
+                "user_id": user_id,
+            }
+        )
+        if user_id is not None:
+            counter = user_stats.setdefault((user_id, answered_at.date()), [0, 0])
+            counter[0 if is_correct else 1] += 1
+
+    if reviews:
+        session.execute(insert(Review), reviews)
+    if schedules:
+        # Bulk update by primary key, a single executemany
+        session.execute(
+            update(Card),
+            [
+                {"id": card_id, "due_at": due_at, **schedule._asdict()}
+                for card_id, (schedule, due_at) in schedules.items()
+            ],
+        )
+    if user_stats:
+        _add_user_stats(session, user_stats)
+    if reviews:
+        # Fold every batch, whoever answered: `theme_stats` counts the answers
+        # of the users too, and nothing else runs the rollup
+        _rollup_reviews(session)
+    session.commit()
+    return results
+
+
+def _update_user_card(
+    session,
+    user_id: int,
+    card_id: int,
+    fac: float,
+    is_correct: bool,
+    answered_at: datetime,
+):
+    """Update the probability and the schedule of a card for a user, starting
+    from those of the card on their first answer.
+    :return: The theme of the card and its new probability, None if the
+        card was not found."""
+    card = session.execute(
+        select(
+            Card.id_theme,
+            func.coalesce(UserCardState.probabilite, Card.probabilite),
+            func.coalesce(UserCardState.repetitions, Card.repetitions),
+            func.coalesce(UserCardState.interval, Card.interval),
+            func.coalesce(UserCardState.ease, Card.ease),
+        )
+        .outerjoin(
+            UserCardState,
+            and_(UserCardState.card_id == Card.id, UserCardState.user_id == user_id),
+        )
+        .where(Card.id == card_id)
+    ).first()
+    if card is None:
+        return None
+    id_theme, probabilite, *schedule = card
+    schedule = scheduler.review(Schedule(*schedule), scheduler.quality(is_correct))
+    values = dict(
+        probabilite=max(0.1, min(probabilite * fac, 1.0)),
+        due_at=scheduler.due_at(schedule, answered_at),
+        **schedule._asdict(),
+    )
+    stmt = insert(UserCardState).values(user_id=user_id, card_id=card_id, **values)
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserCardState.user_id, UserCardState.card_id],
+            set_=values,
+        )
+    )
+    return id_theme, values["probabilite"]
+
+
+def _add_user_stats(session, counters: dict):
+    """Increment the daily stats of the users.
+    :param counters: The [correct, incorrect] answers per (user_id, date)."""
+    stmt = insert(UserStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStat.user_id, UserStat.date],
+        set_={
+            "bonnes_reponses": UserStat.bonnes_reponses + stmt.excluded.bonnes_reponses,
+            "mauvaises_reponses": UserStat.mauvaises_reponses
+            + stmt.excluded.mauvaises_reponses,
+        },
+    )
+    session.execute(
+        stmt,
+        [
+            {
+                "user_id": user_id,
+                "date": day,
+                "bonnes_reponses": good,
+                "mauvaises_reponses": bad,
+            }
+            for (user_id, day), (good, bad) in counters.items()
+        ],
+    )
+
+
+# --- operations for the Reviews log ---
+
+
+def _as_date(value: date | datetime) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+ROLLUP_DAILY = "daily"
+
+
+def add_reviews(reviews: Iterable[dict]) -> int | None:
+    """Append reviews to the log in bulk, without touching the cards.
+    Call `rollup_reviews` to fold them into the daily aggregates.
+    :param reviews: Dicts with the columns of the `Review` table.
+    :return: The number of inserted reviews."""
+    return _add_reviews(reviews=list(reviews))
+
+
+@get_session(write=True)
+def _add_reviews(reviews: List[dict], **kwargs) -> int:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    if reviews:
+        session.execute(insert(Review), reviews)
+        session.commit()
+    logging.debug(f"{len(reviews)} review(s) added")
+    return len(reviews)
+
+
+def rollup_reviews() -> int | None:
+    """Fold the reviews added since the last rollup into the daily stats.
+    :return: The number of reviews folded."""
+    counter = _run_rollup()
+    cache.bump(STATS)
+    return counter
+
+
+@get_session(write=True)
+def _run_rollup(**kwargs) -> int:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    counter = _rollup_reviews(session)
+    session.commit()
+    return counter
+
+
+def _rollup_reviews(session) -> int:
+    """Incrementally maintain `stats` and `theme_stats` from the review log.
+
+    Only the reviews above the stored high-water mark are aggregated, with
+    one INSERT ... SELECT ... GROUP BY ... ON CONFLICT per table, then the
+    mark is moved. `stats` only counts the reviews without a user, the users
+    have their own `user_stats`. Must run inside the caller's transaction."""
+    last_id = session.scalar(
+        select(RollupState.last_review_id).where(RollupState.name == ROLLUP_DAILY)
+    )
+    last_id = last_id or 0
+    upper_id, counter = session.execute(
+        select(func.max(Review.id), func.count()).where(Review.id > last_id)
+    ).one()
+    if upper_id is None:
+        return 0
+
+    day = func.date(Review.reviewed_at)
+    good = func.sum(cast(Review.correct, Integer))
+    bad = func.count() - good
+    in_window = and_(Review.id > last_id, Review.id <= upper_id)
+
+    stmt = insert(Stat).from_select(
+        ["date", "bonnes_reponses", "mauvaises_reponses"],
+        select(day, good, bad).where(in_window, Review.user_id.is_(None)).group_by(day),
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Stat.date],
+            set_={
+                "bonnes_reponses": Stat.bonnes_reponses + stmt.excluded.bonnes_reponses,
+                "mauvaises_reponses": Stat.mauvaises_reponses
+                + stmt.excluded.mauvaises_reponses,
+            },
+        )
+    )
+
+    stmt = insert(ThemeStat).from_select(
+        ["theme_id", "date", "bonnes_reponses", "mauvaises_reponses"],
+        select(Review.theme_id, day, good, bad)
+        .where(in_window, Review.theme_id.is_not(None))
+        .group_by(Review.theme_id, day),
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ThemeStat.theme_id, ThemeStat.date],
+            set_={
+                "bonnes_reponses": ThemeStat.bonnes_reponses
+                + stmt.excluded.bonnes_reponses,
+                "mauvaises_reponses": ThemeStat.mauvaises_reponses
+                + stmt.excluded.mauvaises_reponses,
+            },
+        )
+    )
+
+    stmt = insert(RollupState).values(name=ROLLUP_DAILY, last_review_id=upper_id)
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[RollupState.name],
+            set_={"last_review_id": stmt.excluded.last_review_id},
+        )
+    )
+    logging.debug(f"{counter} review(s) rolled up")
+    return counter
+
+
+@cached(STATS)
+def get_theme_stats(
+    id_theme: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> List[ThemeStat]:
+    """Get the daily statistics of a theme.
+    :param id_theme: The ID of the theme.
+    :param start_date: The start date
+    :param end_date: The end date
+    """
+    filters = [ThemeStat.theme_id == id_theme]
+    # Compare on dates, a datetime would be bound with its time part
+    if start_date:
+        filters.append(ThemeStat.date >= _as_date(start_date))
+    if end_date:
+        filters.append(ThemeStat.date <= _as_date(end_date))
+    return get_all_rows(
+        table=ThemeStat, filters=and_(*filters), service="get_theme_stats"
+    )
+
+
+def get_stats_columns(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    arrays: bool = False,
+) -> Columns | None:
+    """Get the daily statistics as columns, without building Stat objects.
+    The columns are shared with the cache and must not be modified.
+    :param start_date: The start date
+    :param end_date: The end date
+    :param arrays: Return the answer counters as NumPy arrays.
+    :return: The date, bonnes_reponses and mauvaises_reponses columns,
+        ordered by date."""
+    # Compare on dates, a datetime would be bound with its time part
+    start_date = _as_date(start_date) if start_date else None
+    end_date = _as_date(end_date) if end_date else None
+    return _cached_stats_columns(start_date, end_date, arrays)
+
+
+@cached(STATS)
+def _cached_stats_columns(start_date, end_date, arrays):
+    columns = _stats_columns(start_date=start_date, end_date=end_date)
+    if columns is not None and arrays:
+        columns = to_arrays(
+            columns, {"bonnes_reponses": "int64", "mauvaises_reponses": "int64"}
+        )
+    return columns
+
+
+@get_session
+def _stats_columns(start_date, end_date, **kwargs) -> Columns:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    stmt = select(Stat.date, Stat.bonnes_reponses, Stat.mauvaises_reponses)
+    if start_date:
+        stmt = stmt.where(Stat.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Stat.date <= end_date)
+    return select_columns(session, stmt.order_by(Stat.date))
+
+
+# Buckets of `get_stats_summary`, weeks start on Monday
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+BUCKETS = {
+    DAY: lambda column: column,
+    WEEK: lambda column: func.date(column, "weekday 0", "-6 days", type_=Date),
+    MONTH: lambda column: func.date(column, "start of month", type_=Date),
+}
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """The first day of the bucket of a day, as computed in SQL.
+    :param day: The day.
+    :param bucket: One of `BUCKETS`."""
+    if bucket == WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def get_stats_summary(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: str = DAY,
+    user_id: Optional[int] = None,
+) -> dict | None:
+    """Get the answer totals of a period and their series by bucket,
+    aggregated by the database.
+    :param start_date: The start date
+    :param end_date: The end date
+    :param bucket: One of `BUCKETS`, the length of a point of the series.
+    :param user_id: The ID of the user, None for the answers without a user.
+    :return: The bonnes_reponses and mauvaises_reponses totals, and the
+        series as date (first day of each bucket), bonnes_reponses and
+        mauvaises_reponses columns ordered by date."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'")
+    # Compare on dates, a datetime would be bound with its time part
+    start_date = _as_date(start_date) if start_date else None
+    end_date = _as_date(end_date) if end_date else None
+    return _cached_stats_summary(start_date, end_date, bucket, user_id)
+
+
+@cached(STATS)
+def _cached_stats_summary(start_date, end_date, bucket, user_id=None):
+    series = _stats_series(
+        start_date=start_date, end_date=end_date, bucket=bucket, user_id=user_id
+    )
+    if series is None:
+        return None
+    return {
+        "bonnes_reponses": sum(series["bonnes_reponses"]),
+        "mauvaises_reponses": sum(series["mauvaises_reponses"]),
+        "series": series,
+    }
+
+
+@get_session
+def _stats_series(start_date, end_date, bucket, user_id=None, **kwargs) -> Columns:
+    session = kwargs.pop("session")  # type: sqlalchemy.orm.session.Session
+    table = Stat if user_id is None else UserStat
+    period = BUCKETS[bucket](table.date).label("date")
+    stmt = select(
+        period,
+        func.coalesce(func.sum(table.bonnes_reponses), 0).label("bonnes_reponses"),
+        func.coalesce(func.sum(table.mauvaises_reponses), 0).label(
+            "mauvaises_reponses"
+        ),
+    )
+    if user_id is not None:
+        stmt = stmt.where(UserStat.user_id == user_id)
+    if start_date:
+        stmt = stmt.where(table.date >= start_date)
+    if end_date:
+        stmt = stmt.where(table.date <= end_date)
+    return select_columns(session, stmt.group_by(period).order_by(period))
+
+
+def get_data_version(*tables: str) -> tuple:
+    """Get the cache versions of tables, which change on every write.
+    :param tables: Any of CARDS, THEMES, STATS and USERS."""
+    return cache.version(*tables)
+
+
+def get_cache_stats() -> dict:
+    """Get the hit/miss counters of the read cache."""
+    return cache.stats()
+
+
+def get_contention_stats() -> dict:
+    """Get the counters of the busy retries and of the single writer."""
+    return contention.stats.stats()
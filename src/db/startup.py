@@ -0,0 +1,69 @@
+"""Timing of the startup of a process.
+
+A new worker pays for the engine setup, the schema check and the imports
+of the heavy libraries. Each step is timed once per process and the
+breakdown is shown in the debug sidebar. The heavy libraries are imported
+with `lazy_import`, by the pages needing them, rather than at startup."""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Dict, Iterator, List
+
+logging.debug("Startup module loaded.")
+
+
+class StartupTimings:
+    """Durations of the startup steps, in the order they ran."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = []  # type: List[tuple]
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Time the block as a startup step.
+        :param name: The name of the step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._steps.append((name, elapsed))
+            logging.debug(f"Startup step {name}: {1000 * elapsed:.1f} ms")
+
+    @property
+    def total_seconds(self) -> float:
+        with self._lock:
+            return sum(seconds for _, seconds in self._steps)
+
+    def rows(self) -> List[Dict]:
+        """The steps as rows, e.g. for `st.dataframe`."""
+        with self._lock:
+            return [
+                {"étape": name, "ms": round(1000 * seconds, 1)}
+                for name, seconds in self._steps
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._steps = []
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module on first use, timing the import as a startup step.
+    :param name: The name of the module, e.g. "plotly.express"."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with timings.step(f"import {name}"):
+        return importlib.import_module(name)
+
+
+timings = StartupTimings()
+lock = threading.Lock()  # Held by the session initializing the process
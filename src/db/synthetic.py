@@ -0,0 +1,213 @@
+"""Deterministic synthetic decks and review history for load testing.
+
+    python -m src.db.synthetic --database /tmp/load.db --cards 100000 --themes 200
+
+The same seed, sizes and end date always produce the same database."""
+
+import argparse
+import logging
+import math
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func, select
+
+from src.db import config, services
+from src.db.config import setup_config
+from src.db.tables import Card, init_db
+
+logging.debug("Synthetic data module loaded.")
+
+DEFAULT_BATCH_SIZE = 10_000
+
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo "
+    "consequat duis aute irure in reprehenderit voluptate velit esse cillum "
+    "fugiat nulla pariatur excepteur sint occaecat cupidatat non proident sunt "
+    "culpa qui officia deserunt mollit anim id est laborum fonction variable "
+    "classe objet requête index transaction commit branche fusion intégrale "
+    "dérivée matrice vecteur théorème preuve algorithme complexité mémoire"
+).split()
+
+
+def _text(rng: random.Random, mean_words: float) -> str:
+    """Random text whose length follows a log-normal distribution."""
+    words = max(1, int(rng.lognormvariate(math.log(mean_words), 0.6)))
+    return " ".join(rng.choices(_WORDS, k=words)).capitalize()
+
+
+def _probability(rng: random.Random) -> float:
+    """Most cards are well known (low probability), a few are hard ones."""
+    return round(min(1.0, max(0.1, rng.betavariate(2, 5))), 2)
+
+
+def theme_weights(n_themes: int, skew: float) -> List[float]:
+    """Zipf-like relative sizes of the themes, the first one is the largest."""
+    return [1 / (rank**skew) for rank in range(1, n_themes + 1)]
+
+
+def generate(
+    n_cards: int,
+    n_themes: int = 50,
+    seed: int = 0,
+    days: int = 365,
+    reviews_per_day: int = 100,
+    skew: float = 1.1,
+    end_date: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict:
+    """Bulk-write a synthetic dataset into the configured database.
+    :param n_cards: The number of cards.
+    :param n_themes: The number of themes, with Zipf-skewed sizes.
+    :param seed: The seed of the random generator.
+    :param days: The number of days of review history.
+    :param reviews_per_day: The mean number of reviews per day.
+    :param skew: The exponent of the theme size distribution.
+    :param end_date: The last day of history, defaults to today.
+    :param batch_size: The number of rows inserted per transaction.
+    :return: The generated theme ids, the number of rows and the elapsed time.
+    :raises RuntimeError: If a batch could not be written, the reviews would
+        point to missing cards."""
+    rng = random.Random(seed)
+    end_date = end_date or datetime.today().date()
+    start = time.perf_counter()
+
+    theme_ids = [
+        services.get_or_create_theme(f"Synthetic theme {i:04d}").id
+        for i in range(n_themes)
+    ]
+    weights = theme_weights(n_themes, skew)
+
+    # Themes of the generated cards, in insertion order, for the reviews
+    card_themes = array("l")
+    first_id = _next_card_id()
+    for batch_start in range(0, n_cards, batch_size):
+        cards = []
+        for _ in range(batch_start, min(batch_start + batch_size, n_cards)):
+            id_theme = rng.choices(theme_ids, weights)[0]
+            card_themes.append(id_theme)
+            cards.append(
+                {
+                    "question": _text(rng, 12) + " ?",
+                    "reponse": _text(rng, 30),
+                    "probabilite": _probability(rng),
+                    "id_theme": id_theme,
+                }
+            )
+        if services.create_cards(cards) is None:
+            raise RuntimeError(
+                f"Could not write the synthetic cards {batch_start} to "
+                f"{batch_start + len(cards) - 1}, see the logged database error"
+            )
+
+    n_reviews = 0
+    if n_cards and reviews_per_day:
+        batch = []
+        for review in _reviews(
+            rng, first_id, card_themes, days, reviews_per_day, end_date
+        ):
+            batch.append(review)
+            if len(batch) == batch_size:
+                n_reviews += _add_reviews(batch)
+                batch = []
+        n_reviews += _add_reviews(batch)
+        services.rollup_reviews()
+
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Generated {n_themes} themes, {n_cards} cards and {n_reviews} reviews "
+        f"in {elapsed:.1f}s"
+    )
+    return {
+        "theme_ids": theme_ids,
+        "themes": n_themes,
+        "cards": n_cards,
+        "reviews": n_reviews,
+        "seconds": elapsed,
+    }
+
+
+def _add_reviews(batch: List[tuple]) -> int:
+    inserted = services.add_reviews(batch)
+    if inserted is None:
+        raise RuntimeError(
+            f"Could not write a batch of {len(batch)} synthetic reviews, "
+            "see the logged database error"
+        )
+    return inserted
+
+
+def _next_card_id() -> int:
+    with config.get_session() as session:
+        return (session.scalar(select(func.max(Card.id))) or 0) + 1
+
+
+def _reviews(
+    rng: random.Random,
+    first_id: int,
+    card_themes: array,
+    days: int,
+    reviews_per_day: int,
+    end_date: date,
+) -> Iterator[Dict]:
+    """Review history with a weekly pattern and a slowly improving accuracy."""
+    for day in range(days, 0, -1):
+        current = end_date - timedelta(days=day - 1)
+        weekend = current.weekday() >= 5
+        counter = max(0, int(rng.gauss(reviews_per_day * (1.5 if weekend else 1), 10)))
+        accuracy = 0.55 + 0.3 * (days - day) / max(1, days)
+        moment = datetime.combine(current, datetime.min.time())
+        for _ in range(counter):
+            index = rng.randrange(len(card_themes))
+            yield {
+                "card_id": first_id + index,
+                "theme_id": card_themes[index],
+                "reviewed_at": moment + timedelta(seconds=rng.randrange(86400)),
+                "correct": rng.random() < accuracy,
+                "latency_ms": int(rng.lognormvariate(math.log(6000), 0.5)),
+            }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic database.")
+    parser.add_argument("--database", required=True, help="Path of the database file")
+    parser.add_argument("--cards", type=int, default=100_000)
+    parser.add_argument("--themes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--reviews-per-day", type=int, default=100)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument(
+        "--end-date",
+        type=date.fromisoformat,
+        help="Last day of history (YYYY-MM-DD), defaults to today",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    setup_config(args.database)
+    init_db()
+    summary = generate(
+        n_cards=args.cards,
+        n_themes=args.themes,
+        seed=args.seed,
+        days=args.days,
+        reviews_per_day=args.reviews_per_day,
+        skew=args.skew,
+        end_date=args.end_date,
+        batch_size=args.batch_size,
+    )
+    print(
+        f"{summary['themes']} themes, {summary['cards']} cards and "
+        f"{summary['reviews']} reviews written in {summary['seconds']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,30 @@
+import functools
 import logging
 import os
+import time
+from datetime import datetime
 
 import sqlalchemy
 from sqlalchemy import (
+    Boolean,
     CheckConstraint,
     Column,
     Date,
+    DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
+    select,
     text,
 )
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.orm import declarative_base, relationship
 
-from src.db import config
+from src.db import config, contention, migrations, startup
+from src.db.instrumentation import instrumentation
+from src.db.scheduler import DEFAULT_EASE
 
 Base = declarative_base()
 
@@ -30,7 +39,13 @@ class Card(Base):
     question = Column(String)
     reponse = Column(String)
     probabilite = Column(Float)
-    id_theme = Column(Integer, ForeignKey("themes.id", ondelete="CASCADE"))
+    id_theme = Column(Integer, ForeignKey("themes.id", ondelete="CASCADE"), index=True)
+    fingerprint = Column(String, index=True)  # Hash of the normalized question
+    # SM-2 schedule, see the scheduler module
+    due_at = Column(DateTime, default=datetime.today)
+    interval = Column(Float, default=0.0)  # in days
+    ease = Column(Float, default=DEFAULT_EASE)
+    repetitions = Column(Integer, default=0)
 
     theme = relationship("Theme", back_populates="cards")
 
@@ -38,6 +53,7 @@ class Card(Base):
         CheckConstraint(
             "probabilite >= 0.1 AND probabilite <= 1", name="probabilite_range"
         ),
+        Index("ix_cards_id_theme_due_at", "id_theme", "due_at"),
     )
 
     def to_dict(self) -> dict:
@@ -52,6 +68,19 @@ class Card(Base):
         }
 
 
+class CardBucket(Base):
+    """LSH buckets of the card questions, for the near-duplicate lookups."""
+
+    __tablename__ = "card_buckets"
+
+    bucket = Column(Integer, primary_key=True)
+    card_id = Column(
+        Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    __table_args__ = (Index("ix_card_buckets_card_id", "card_id"),)
+
+
 class Theme(Base):
     __tablename__ = "themes"
 
@@ -69,6 +98,103 @@ class Stat(Base):
     mauvaises_reponses = Column(Integer)
     date = Column(Date)
 
+    __table_args__ = (Index("ix_stats_date", "date", unique=True),)
+
+
+class Review(Base):
+    """Append-only log of the answers.
+
+    Card and theme IDs are kept as plain columns so deleting a card neither
+    rewrites nor loses its history."""
+
+    __tablename__ = "reviews"
+
+    id = Column(Integer, primary_key=True)
+    card_id = Column(Integer, nullable=False)
+    theme_id = Column(Integer)
+    reviewed_at = Column(DateTime, nullable=False)
+    correct = Column(Boolean, nullable=False)
+    latency_ms = Column(Integer)  # Time taken to answer, if known
+    user_id = Column(Integer)  # None for the answers without a user
+
+    __table_args__ = (Index("ix_reviews_card_id", "card_id"),)
+
+
+class ThemeStat(Base):
+    """Daily aggregates of the reviews per theme."""
+
+    __tablename__ = "theme_stats"
+
+    id = Column(Integer, primary_key=True)
+    theme_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    bonnes_reponses = Column(Integer)
+    mauvaises_reponses = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_theme_stats_theme_id_date", "theme_id", "date", unique=True),
+    )
+
+
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class UserCardState(Base):
+    """Probability and SM-2 schedule of a card for a user, once the user
+    answered it. Until then, those of the card itself apply."""
+
+    __tablename__ = "user_card_states"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    card_id = Column(
+        Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True
+    )
+    probabilite = Column(Float, nullable=False)
+    # SM-2 schedule, see the scheduler module
+    due_at = Column(DateTime, default=datetime.today)
+    interval = Column(Float, default=0.0)  # in days
+    ease = Column(Float, default=DEFAULT_EASE)
+    repetitions = Column(Integer, default=0)
+
+    __table_args__ = (
+        CheckConstraint(
+            "probabilite >= 0.1 AND probabilite <= 1", name="user_probabilite_range"
+        ),
+        Index("ix_user_card_states_card_id", "card_id"),
+        Index("ix_user_card_states_user_id_due_at", "user_id", "due_at"),
+    )
+
+
+class UserStat(Base):
+    """Daily answer counters of a user."""
+
+    __tablename__ = "user_stats"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    date = Column(Date, primary_key=True)
+    bonnes_reponses = Column(Integer, nullable=False)
+    mauvaises_reponses = Column(Integer, nullable=False)
+
+
+class RollupState(Base):
+    """High-water marks of the incremental rollups."""
+
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    last_review_id = Column(Integer, nullable=False)
+
+
+DEFAULT_THEMES = ["Math", "Programming Language", "Git"]
+
 
 def init_db():
     """Initialize the database.
@@ -79,33 +205,12 @@ def init_db():
         os.makedirs(os.path.dirname(config.DATABASE_PATH), exist_ok=True)
 
     try:
-        # Connect to the database
-        with config.engine.connect() as conn:
-            if conn.dialect.name == "sqlite":
-                conn.execute(text("PRAGMA foreign_keys = ON;"))
+        # Connect to the database, PRAGMAs are applied by the engine on connect
+        with startup.timings.step("schéma"), config.engine.begin() as conn:
+            create_schema(conn)
 
-            Base.metadata.create_all(conn)  # Use config.engine here
-
-            Session = sessionmaker(bind=config.engine)  # and here
-            with Session() as session:  # Use context manager
-                try:
-                    themes = [
-                        Theme(theme=theme)
-                        for theme in ["Math", "Programming Language", "Git"]
-                    ]
-                    session.add_all(themes)
-                    session.commit()
-
-                except SQLAlchemyError as e:
-                    session.rollback()
-                    logging.error(
-                        f"An error occured during the insertion of predefined themes: {e}"
-                    )
-                except Exception as e:
-                    session.rollback()
-                    logging.error(
-                        f"An unexpected error occured during the insertion of predefined themes: {e}"
-                    )
+        with startup.timings.step("thèmes"), config.get_session() as session:
+            seed_themes(session)
 
     except SQLAlchemyError as e:
         logging.error(f"An error occured during table creation: {e}")
@@ -115,24 +220,114 @@ def init_db():
         )
 
 
-def get_session(func):
-    """Decorator to create a session context and handle exceptions."""
+def is_schema_current(conn) -> bool:
+    """Whether the database is at the latest schema version with every table,
+    checked with two cheap reads instead of the DDL of `create_all`.
+    :param conn: The database connection."""
+    if migrations.get_schema_version(conn) != migrations.LATEST_VERSION:
+        return False
+    tables = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table'")
+    ).scalars()
+    return set(Base.metadata.tables) <= set(tables)
+
+
+def create_schema(conn) -> bool:
+    """Create the missing tables and apply the pending migrations.
+    :param conn: A connection inside a transaction.
+    :return: Whether the schema had to be created or migrated."""
+    if is_schema_current(conn):
+        logging.debug("Database schema up to date.")
+        return False
+    Base.metadata.create_all(conn)
+    # create_all skips existing tables, migrations bring them up to date
+    migrations.migrate(conn)
+    return True
+
+
+def seed_themes(session):
+    """Insert the predefined themes into a database without any theme.
+    :param session: The database session."""
+    try:
+        if session.scalar(select(Theme.id).limit(1)) is not None:
+            return
+        session.add_all([Theme(theme=theme) for theme in DEFAULT_THEMES])
+        session.commit()
+
+    except SQLAlchemyError as e:
+        session.rollback()
+        logging.error(
+            f"An error occured during the insertion of predefined themes: {e}"
+        )
+    except Exception as e:
+        session.rollback()
+        logging.error(
+            f"An unexpected error occured during the insertion of predefined themes: {e}"
+        )
+
+
+def _service_name(func, service: str | None) -> str:
+    """Name of the service for the instrumentation. The generic helpers of
+    this module are prefixed with the service calling them, passed as the
+    `service` keyword."""
+    if service is None:
+        return func.__name__
+    return f"{service}/{func.__name__}"
+
+
+def _open_session():
+    if contention.writer.is_current():
+        return contention.writer.session()
+    return config.get_session()
 
+
+def get_session(func=None, *, write: bool = False):
+    """Decorator to create a session context and handle exceptions.
+    Transactions failing on the lock of another connection are retried
+    following `contention.policy`.
+    :param write: Whether the function writes, writes are run by the single
+        writer when it is enabled."""
+    if func is None:
+        return functools.partial(get_session, write=write)
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        with config.get_session() as session:
-            try:
-                return func(*args, session=session, **kwargs)
-            except SQLAlchemyError as e:
-                session.rollback()
-                logging.error(f"An error occured while execution on the database: {e}")
-            except Exception as e:
-                session.rollback()
-                logging.error(f"Unexpected error occured: {e}")
+        writer = contention.writer
+        if write and writer.enabled and not writer.is_current():
+            return writer.submit(wrapper, *args, **kwargs)
+        service = kwargs.pop("service", None)
+        name = _service_name(func, service) if instrumentation.enabled else None
+        delays = contention.policy.delays()
+        while True:
+            with _open_session() as session, instrumentation.service(name) as result:
+                try:
+                    result.append(func(*args, session=session, **kwargs))
+                    return result[0]
+                except SQLAlchemyError as e:
+                    session.rollback()
+                    if not contention.is_busy(e):
+                        logging.error(
+                            f"An error occured while execution on the database: {e}"
+                        )
+                        return None
+                    delay = next(delays, None)
+                    if delay is None:
+                        contention.stats.record_failure()
+                        logging.error(f"The database is still locked, giving up: {e}")
+                        return None
+                except Exception as e:
+                    session.rollback()
+                    logging.error(f"Unexpected error occured: {e}")
+                    return None
+            contention.stats.record_retry(delay)
+            logging.warning(f"The database is locked, retry in {delay:.3f} s")
+            time.sleep(delay)
 
+    wrapper.write = write
     return wrapper
 
 
-@get_session
+@get_session(write=True)
 def add_row(table, **kwargs):
     """Add a row to a table.
     :param session: The database session.
@@ -181,7 +376,7 @@ def get_row_by(table, **kwargs):
     return rows
 
 
-@get_session
+@get_session(write=True)
 def update_row(table, id, **kwargs):
     """Update a row in a table.
     :param session: The database session.
@@ -200,7 +395,7 @@ def update_row(table, id, **kwargs):
     logging.error(f"Row in table '{table.__tablename__}' with id={id} not found.")
 
 
-@get_session
+@get_session(write=True)
 def delete_row(table, id, **kwargs):
     """Delete a row from a table.
     :param session: The database session.
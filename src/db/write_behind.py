@@ -0,0 +1,206 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.db import services
+
+logging.debug("Write-behind module loaded.")
+
+
+class AnswerEvent(NamedTuple):
+    card_id: int
+    is_correct: bool
+    answered_at: datetime
+    latency_ms: Optional[int] = None
+    user_id: Optional[int] = None
+
+
+def _pending_key(event: AnswerEvent) -> Tuple[Optional[int], date]:
+    return event.user_id, event.answered_at.date()
+
+
+class WriteBehindQueue:
+    """In-process queue of quiz answers flushed by a background thread.
+
+    Answers are written in batches, one transaction per `batch_size` events
+    or per `flush_interval` seconds, whichever comes first. Pending answers
+    are flushed on `stop`, which is registered to run at interpreter exit.
+
+    A failed batch is set aside and retried up to `max_retries` times,
+    while the newer answers keep being written. After that, its answers are
+    tried one by one so that a single bad answer does not take the others
+    down, and those failing again are moved to `dead_letters`."""
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        writer: Optional[Callable] = None,
+        max_retries: int = 3,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._writer = writer or services.record_answers
+        self._queue = queue.Queue()  # type: queue.Queue[AnswerEvent]
+        self._retry = []  # type: List[Tuple[List[AnswerEvent], int]]
+        self.dead_letters = []  # type: List[AnswerEvent]
+        self._pending = {}  # type: Dict[Tuple[Optional[int], date], List[int]]
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+        self._atexit_registered = False
+
+    def start(self):
+        """Start the background flushing thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="answers-write-behind", daemon=True
+        )
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+        logging.debug("Write-behind thread started.")
+
+    def stop(self, timeout: float | None = None):
+        """Stop the background thread and durably flush the pending answers.
+        :param timeout: The maximum time to wait for the thread, in seconds."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._atexit_registered:
+            atexit.unregister(self.stop)
+            self._atexit_registered = False
+        self.flush()
+        while self._has_retries():
+            time.sleep(self.flush_interval)
+            self._write_retries()
+        if self.dead_letters:
+            logging.error(f"{len(self.dead_letters)} answer(s) could not be written")
+
+    def submit(
+        self,
+        card_id: int,
+        is_correct: bool,
+        latency_ms: int | None = None,
+        user_id: int | None = None,
+    ):
+        """Queue an answer.
+        :param card_id: The ID of the card.
+        :param is_correct: Whether the user answered correctly or not.
+        :param latency_ms: The time taken to answer, in milliseconds.
+        :param user_id: The ID of the user, None for the shared state."""
+        event = AnswerEvent(card_id, is_correct, datetime.today(), latency_ms, user_id)
+        with self._pending_lock:
+            counter = self._pending.setdefault(_pending_key(event), [0, 0])
+            counter[0 if is_correct else 1] += 1
+        self._queue.put(event)
+        self.start()
+
+    def pending(self) -> int:
+        """Return the number of answers not written yet."""
+        with self._pending_lock:
+            return sum(good + bad for good, bad in self._pending.values())
+
+    def pending_counts(
+        self, user_id: Optional[int] = None
+    ) -> Dict[date, Tuple[int, int]]:
+        """Return the (correct, incorrect) answers not written yet, per day.
+        :param user_id: The ID of the user, None for the answers without a user."""
+        with self._pending_lock:
+            return {
+                day: (good, bad)
+                for (user, day), (good, bad) in self._pending.items()
+                if user == user_id and (good or bad)
+            }
+
+    def flush(self):
+        """Write every queued answer from the calling thread, the failed
+        batches are set aside for a retry."""
+        self._write_retries()
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _take(self, block: bool) -> List[AnswerEvent]:
+        batch = []
+        if block:
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                return batch
+        # Gather more events until the batch is full or the interval elapsed
+        deadline = time.monotonic() + (self.flush_interval if block else 0)
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _has_retries(self) -> bool:
+        with self._pending_lock:
+            return bool(self._retry)
+
+    def _write_retries(self):
+        with self._pending_lock:
+            retries, self._retry = self._retry, []
+        for batch, attempts in retries:
+            self._write(batch, attempts)
+
+    def _write(self, batch: List[AnswerEvent], attempts: int = 0) -> bool:
+        with self._flush_lock:
+            written = self._writer(batch) is not None
+        if not written:
+            self._fail(batch, attempts + 1)
+            return False
+        self._done(batch)
+        logging.debug(f"{len(batch)} answer(s) flushed.")
+        return True
+
+    def _fail(self, batch: List[AnswerEvent], attempts: int):
+        if attempts <= self.max_retries:
+            logging.error(f"Failed to write {len(batch)} answer(s), will retry")
+            with self._pending_lock:
+                self._retry.append((batch, attempts))
+        elif len(batch) > 1:
+            # Find out which answers fail: one last try each
+            with self._pending_lock:
+                self._retry.extend(([event], attempts - 1) for event in batch)
+        else:
+            logging.error(f"Giving up on {batch[0]} after {attempts} attempt(s)")
+            with self._pending_lock:
+                self.dead_letters.extend(batch)
+            self._done(batch)
+
+    def _done(self, batch: List[AnswerEvent]):
+        """Remove written, or given up, answers from the pending counts."""
+        with self._pending_lock:
+            for event in batch:
+                counter = self._pending[_pending_key(event)]
+                counter[0 if event.is_correct else 1] -= 1
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._take(block=True)
+            if batch and not self._write(batch):
+                self._stop_event.wait(self.flush_interval)
+            self._write_retries()
+
+
+write_behind = WriteBehindQueue()
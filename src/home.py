@@ -1,13 +1,19 @@
+import logging
+
 import streamlit as st
 
+from src.db import config, contention, services, startup
 from src.db.config import setup_config
+from src.db.instrumentation import instrumentation
+from src.db.tables import init_db
 
-if "init_db" not in st.session_state:
-    st.session_state.init_db = False
-
-if not st.session_state.init_db:
-    setup_config()
-    st.session_state.init_db = True
+# Once per process: the new sessions reuse the engine and the checked schema
+with startup.lock:
+    if not config.engine_initialized:
+        with startup.timings.step("configuration"):
+            setup_config()
+        init_db()
+        logging.info(f"Database ready in {1000 * startup.timings.total_seconds:.1f} ms")
 
 # ---- Header ----
 st.set_page_config(
@@ -18,6 +24,26 @@ st.set_page_config(
 )
 
 with st.sidebar:
+    # Each user has their own card probabilities and statistics
+    # Pick an existing user or type the name of a new one
+    users = services.get_all_users() or []
+    user_name = (
+        st.selectbox(
+            "Utilisateur",
+            [user.name for user in users],
+            index=None,
+            placeholder="Anonyme",
+            accept_new_options=True,
+            key="user_name",
+        )
+        or ""
+    ).strip()
+    # Only look the user up when the name changes, not on every rerun
+    if st.session_state.get("user_id_name") != user_name:
+        user = services.get_or_create_user(user_name) if user_name else None
+        st.session_state.user_id = user.id if user else None
+        st.session_state.user_id_name = user_name
+
     pages = [
         st.Page("pages/answer_flashcards.py", title="Quizz"),
         st.Page("pages/manage_display.py", title="Report"),
@@ -25,4 +51,39 @@ with st.sidebar:
     ]
 
     pg = st.navigation(pages=pages)
-pg.run()
+
+if config.SINGLE_WRITER and not contention.writer.enabled:
+    contention.writer.enable()
+
+if config.INSTRUMENTATION and not instrumentation.enabled:
+    instrumentation.enable()
+
+with instrumentation.scope(pg.title) as rerun:
+    pg.run()
+
+if instrumentation.enabled:
+    logging.info(rerun.summary())
+    with st.sidebar.expander("Débogage SQL"):
+        st.write(
+            f"{rerun.total_statements} requête(s) en "
+            f"{1000 * rerun.total_sql_seconds:.1f} ms"
+        )
+        st.dataframe(rerun.service_rows(), hide_index=True)
+        counters = services.get_contention_stats()
+        st.write(
+            f"{counters['retries']} reprise(s) sur verrou "
+            f"({1000 * counters['retry_seconds']:.1f} ms), "
+            f"{counters['failures']} abandon(s), "
+            f"{counters['writes']} écriture(s) sérialisée(s) "
+            f"({1000 * counters['queue_seconds']:.1f} ms d'attente)"
+        )
+        cache_counters = services.get_cache_stats()
+        st.write(
+            f"Cache : {cache_counters['hits']} succès, "
+            f"{cache_counters['misses']} échec(s), "
+            f"{cache_counters['entries']} entrée(s)"
+        )
+        for service, statement, executions in rerun.repeated():
+            st.warning(f"N+1 possible dans {service} : {executions} x {statement}")
+        st.write(f"Démarrage en {1000 * startup.timings.total_seconds:.1f} ms")
+        st.dataframe(startup.timings.rows(), hide_index=True)
@@ -1,10 +1,13 @@
-import random
+import time
 from typing import TYPE_CHECKING, Optional
 
 import streamlit as st
 
 import src.db.services as services
+from src.db import config
+from src.db.prefetch import CardPrefetcher
 from src.db.tables import Card
+from src.db.write_behind import write_behind
 
 if TYPE_CHECKING:
     from src.db.tables import Card
@@ -12,21 +15,51 @@ if TYPE_CHECKING:
 # ---- affichage local texte ou response ---
 if "show_response" not in st.session_state:
     st.session_state.show_response = False
+    st.session_state.question_shown_at = None
 
 if "response_input" not in st.session_state:
     st.session_state.response_input = ""
 
+if "question_shown_at" not in st.session_state:
+    st.session_state.question_shown_at = None
+
 # ---- selected themes ---
 all_themes = services.get_all_themes()
 
 if "usr_themes" not in st.session_state:
     st.session_state.usr_themes = all_themes
 
+# ---- upcoming cards, drawn in advance ---
+if "prefetch" not in st.session_state:
+    # Each thread has its own in-memory database: refill in the background
+    # only with a file database
+    st.session_state.prefetch = CardPrefetcher(
+        background=config.DATABASE_PATH != ":memory:"
+    )
+
 
 def update_statistics(card: Card, is_correct: bool):
-    services.update_stats(is_correct)
-    services.update_card_probability(card_id=card.id, is_correct=is_correct)
+    latency_ms = None
+    if st.session_state.question_shown_at is not None:
+        latency_ms = round(
+            1000 * (time.monotonic() - st.session_state.question_shown_at)
+        )
+    if config.WRITE_BEHIND:
+        write_behind.submit(
+            card_id=card.id,
+            is_correct=is_correct,
+            latency_ms=latency_ms,
+            user_id=st.session_state.user_id,
+        )
+    else:
+        services.record_answer(
+            card_id=card.id,
+            is_correct=is_correct,
+            latency_ms=latency_ms,
+            user_id=st.session_state.user_id,
+        )
     st.toast("Les statistiques ont été actualisé avec succès!")
+    st.session_state.prefetch.advance()
     reset()
 
 
@@ -34,23 +67,20 @@ def submit_response():
     st.session_state.show_response = True
 
 
-@st.cache_data
-def get_themes():
-    return {theme.theme: theme for theme in services.get_all_themes()}
-
-
 def get_card() -> Optional[Card]:
-    cards = []
-    for theme in st.session_state.usr_themes:
-        cards.extend(services.get_cards_by_theme(theme.id))
-    if cards:
-        return random.choice(cards)
-    return None
+    # The same card is kept across reruns until it is answered
+    prefetch = st.session_state.prefetch
+    prefetch.select(
+        [theme.id for theme in st.session_state.usr_themes],
+        user_id=st.session_state.user_id,
+    )
+    return prefetch.current()
 
 
 def reset():
     st.session_state.response_input = ""
     st.session_state.show_response = False
+    st.session_state.question_shown_at = None
 
 
 st.title("Flashcard Application")
@@ -95,6 +125,8 @@ with st.container(border=True):
         st.stop()
 
     st.info(card.question)
+    if st.session_state.question_shown_at is None:
+        st.session_state.question_shown_at = time.monotonic()
 
     if not st.session_state.show_response:
         st.text_area(
@@ -1,64 +1,52 @@
 import datetime
 
-import plotly.express as px
 import streamlit as st
 
-from src.db import services
-
-TODAY = "Aujourd´hui"
-LAST_5_DAY = "5 derniers jours"
-LAST_MONTH = "Dernier mois"
-THIS_YEAR = "Cette année"
-PERIODS = [TODAY, LAST_5_DAY, LAST_MONTH, THIS_YEAR]
+from src.db import config, services
+from src.db.report import (
+    LAST_5_DAY,
+    PERIODS,
+    pending_in_period,
+    period_range,
+    prepare_data,
+)
+from src.db.startup import lazy_import
+from src.db.write_behind import write_behind
 
 st.title("Rapport d´activités")
 st.divider()
 
 
-period_selection = st.segmented_control("Selectionner une période:", PERIODS, default=LAST_5_DAY)
-
-today = datetime.datetime.today()
-datetime.timedelta()
-
-if period_selection == TODAY:
-    start_date, end_date = today, today
-elif period_selection == LAST_5_DAY:
-    start_date, end_date = today - datetime.timedelta(days=5), today
-elif period_selection == LAST_MONTH:
-    start_date, end_date = today - datetime.timedelta(days=30), today
-elif period_selection == THIS_YEAR:
-    start_date, end_date = today - datetime.timedelta(days=365), today
-else:
-    start_date, end_date = None, None
-
-stats = services.get_stats(start_date=start_date, end_date=end_date)
-
+period_selection = st.segmented_control(
+    "Selectionner une période:", PERIODS, default=LAST_5_DAY
+)
 
-def prepare_data(stats):
-    data = [
-        {
-            "date": stat.date,
-            "bonnes_reponses": stat.bonnes_reponses,
-            "mauvaises_reponses": stat.mauvaises_reponses,
-        }
-        for stat in stats
-    ]
-    pie_data = {
-        "Réponses": ["Bonnes réponses", "Mauvaises réponses"],
-        "Nombre": [
-            sum(d["bonnes_reponses"] for d in data),
-            sum(d["mauvaises_reponses"] for d in data),
-        ],
-    }
-    return data, pie_data
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_figures(period, today, stats_version, pending, user_id=None):
+    """Build the figures of a period, cached until the stats change.
+    :param period: One of PERIODS.
+    :param today: The current day, the periods end on it.
+    :param stats_version: The version of the stats, only part of the cache key.
+    :param pending: The answers queued by the write-behind mode, per day.
+    :param user_id: The ID of the user, None for the answers without a user.
+    :return: The pie and line figures, None without any answer."""
+    start_date, end_date, bucket = period_range(period, today)
+    summary = services.get_stats_summary(
+        start_date=start_date, end_date=end_date, bucket=bucket, user_id=user_id
+    )
+    pending = dict(pending)
+    if not (summary and summary["series"]["date"]) and not pending:
+        return None
 
-if stats:
     # Préparer les données pour les graphiques
-    data, pie_data = prepare_data(stats)
+    data, pie_data = prepare_data(summary, pending, bucket)
 
     COLOR_MAP = {"Bonnes réponses": "green", "Mauvaises réponses": "red"}
 
+    # Imported on the first figure rather than at startup, it takes a while
+    px = lazy_import("plotly.express")
+
     # Graphique circulaire (pie chart)
     pie_fig = px.pie(
         pie_data,
@@ -106,6 +94,28 @@ if stats:
         title_text="Date",
     )
 
+    return pie_fig, line_fig
+
+
+today = datetime.date.today()
+start_date, end_date, _ = period_range(period_selection, today)
+
+# Answers queued by the write-behind mode are not in the database yet
+user_id = st.session_state.get("user_id")
+pending = write_behind.pending_counts(user_id) if config.WRITE_BEHIND else {}
+pending = pending_in_period(pending, start_date, end_date)
+
+# Recording an answer bumps the stats version, the day rolls the periods over
+figures = build_figures(
+    period_selection,
+    today,
+    services.get_data_version(services.STATS),
+    tuple(sorted(pending.items())),
+    user_id,
+)
+
+if figures is not None:
+    pie_fig, line_fig = figures
     c_pie, c_scatter = st.columns((2, 3))
     c_pie.plotly_chart(pie_fig, use_container_width=True)
     c_scatter.plotly_chart(line_fig, use_container_width=True)
@@ -1,9 +1,16 @@
+import io
 import logging
+from typing import TYPE_CHECKING
 
-import pandas as pd
 import streamlit as st
 
 from src.db import services
+from src.db.formats import BINARY, FORMATS, MIME_TYPES, guess_format
+from src.db.importer import import_cards
+from src.db.startup import lazy_import
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ---- session state ----
 if "config_selected_card" not in st.session_state:
@@ -15,9 +22,30 @@ if "all_themes" not in st.session_state:
 if "theme_lookup" not in st.session_state:
     st.session_state.theme_lookup = dict()
 
+# Cursors (ID of the last card of the previous page) of the visited pages
+if "config_page_cursors" not in st.session_state:
+    st.session_state.config_page_cursors = [None]
+
+if "config_page_key" not in st.session_state:
+    st.session_state.config_page_key = None
+
+# Bumped to clear the table selection once the selected card is handled
+if "config_table_version" not in st.session_state:
+    st.session_state.config_table_version = 0
+
+PAGE_SIZE = 50
+
+ORDER_LABELS = {
+    "id": "Date d´ajout",
+    "question": "Question",
+    "reponse": "Réponse",
+    "probabilite": "Occurence",
+}
+
 
 def reset():
     st.session_state.config_selected_card = None
+    st.session_state.config_table_version += 1
     st.session_state.all_themes = services.get_all_themes()
     st.session_state.theme_lookup = {
         obj.theme: obj.id for obj in st.session_state.all_themes
@@ -25,12 +53,16 @@ def reset():
     st.rerun()
 
 
-def cards_to_dataframe(cards: list) -> pd.DataFrame:
-    """Convert a list of Card objects to a pandas DataFrame."""
-    # Convert each Card object to a dictionary using the `to_dict` method
-    data = [card.to_dict() for card in cards]
-    # Create a DataFrame from the list of dictionaries
-    return pd.DataFrame(data)
+def cards_to_dataframe(columns: dict) -> "pd.DataFrame":
+    """Convert the columns of a page of cards to a pandas DataFrame."""
+    pd = lazy_import("pandas")  # Only imported by the pages showing a table
+    return pd.DataFrame(
+        {
+            "Question": columns["question"],
+            "Réponse": columns["reponse"],
+            "Occurence (en %)": [round(100 * p) for p in columns["probabilite"]],
+        }
+    )
 
 
 def _common_card_form(
@@ -98,7 +130,7 @@ def display_card_details():
                     question=question,
                     reponse=reponse,
                     probabilite=proba,
-                    id_theme=card.theme.id,
+                    id_theme=card.id_theme,
                 )
 
                 # Reset the configuration
@@ -111,30 +143,168 @@ def display_card_details():
                 reset()
 
 
+def display_search_results(id_theme: int, query: str):
+    cards = services.search_cards(query, theme_ids=[id_theme], limit=PAGE_SIZE)
+    if not cards:
+        st.warning("Aucune flascard ne correspond à la recherche...")
+        return
+
+    columns = {
+        "question": [card.question for card in cards],
+        "reponse": [card.reponse for card in cards],
+        "probabilite": [card.probabilite for card in cards],
+    }
+    event = st.dataframe(
+        cards_to_dataframe(columns),
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"search_table_{st.session_state.config_table_version}_{id_theme}_{query}",
+    )
+    if event.selection.rows:
+        card = cards[event.selection.rows[0]]
+        st.session_state.config_selected_card = card  # Stocker la carte sélectionnée
+        logging.info(f"Card avec id={card.id}")
+
+
 def display_flascard(id_theme: int):
     logging.debug("Start to display flascard.")
-    cards = services.get_cards_by_theme(id_theme=id_theme)
-    if not cards:
+    query = st.text_input(
+        "Rechercher", placeholder="Mots ou début de mots de la question ou réponse"
+    )
+    if query.strip():
+        display_search_results(id_theme, query)
+        return
+
+    order_by = st.selectbox(
+        "Trier par", options=list(ORDER_LABELS), format_func=ORDER_LABELS.get
+    )
+
+    # Restart from the first page when the theme or the order changes
+    if st.session_state.config_page_key != (id_theme, order_by):
+        st.session_state.config_page_key = (id_theme, order_by)
+        st.session_state.config_page_cursors = [None]
+    cursors = st.session_state.config_page_cursors
+
+    # Fetch one more card to know whether there is a next page
+    columns = services.list_card_columns(
+        theme_id=id_theme,
+        after_id=cursors[-1],
+        limit=PAGE_SIZE + 1,
+        order_by=order_by,
+    )
+    has_next = len(columns["id"]) > PAGE_SIZE
+    columns = {name: values[:PAGE_SIZE] for name, values in columns.items()}
+    if not columns["id"]:
+        if len(cursors) > 1:  # The last page became empty
+            cursors.pop()
+            st.rerun()
         st.warning("Aucune flascards pour le thème sélectionné...")
         st.stop()
 
-    # Convertir les cartes en DataFrame
-    header_cols = st.columns((5, 5, 5, 2))  # Ajuster les proportions des colonnes
-    header_cols[0].write("**Question**")
-    header_cols[1].write("**Réponse**")
-    header_cols[2].write("**Occurence (en %)**")
-
-    for card in cards:
-        with st.container():
-            cols = st.columns((5, 5, 5, 2))  # Ajuster les proportions des colonnes
-            cols[0].write(card.question)
-            cols[1].write(card.reponse)
-            cols[2].write(round(100 * card.probabilite))
-            if cols[3].button("Modifier", key=f"modify_btn_{card.id}"):
-                st.session_state.config_selected_card = (
-                    card  # Stocker la carte sélectionnée
+    event = st.dataframe(
+        cards_to_dataframe(columns),
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"cards_table_{st.session_state.config_table_version}_{id_theme}_{order_by}_{len(cursors)}",
+    )
+    if event.selection.rows:
+        card = services.get_card(columns["id"][event.selection.rows[0]])
+        st.session_state.config_selected_card = card  # Stocker la carte sélectionnée
+        logging.info(f"Card avec id={card.id}")
+
+    c_prev, c_page, c_next = st.columns((1, 2, 1))
+    if c_prev.button("Précédent", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    c_page.caption(f"Page {len(cursors)}")
+    if c_next.button("Suivant", disabled=not has_next):
+        cursors.append(columns["id"][-1])
+        st.rerun()
+
+
+def display_import_form():
+    with st.form("import_form", clear_on_submit=True):
+        uploaded = st.file_uploader(
+            "Fichier CSV, JSON Lines ou binaire (colonnes question, reponse, probabilite, theme)",
+            type=["csv", "jsonl", "ndjson", BINARY],
+        )
+        skip_duplicates = st.checkbox("Ignorer les questions en double", value=True)
+        if st.form_submit_button("Importer") and uploaded is not None:
+            logging.info(f"Request to import '{uploaded.name}'")
+            try:
+                format = guess_format(uploaded.name)
+                if format == BINARY:
+                    report = import_cards(
+                        uploaded, format, skip_duplicates=skip_duplicates
+                    )
+                else:
+                    with io.TextIOWrapper(
+                        uploaded, encoding="utf-8", newline=""
+                    ) as stream:
+                        report = import_cards(
+                            stream, format, skip_duplicates=skip_duplicates
+                        )
+            except ValueError as e:
+                st.error(f"Import impossible: {e}")
+                return
+            st.success(
+                f"{report.inserted} question(s) importée(s) en {report.elapsed:.1f}s "
+                f"({report.throughput:.0f} questions/s)."
+            )
+            if report.rejected:
+                st.warning(f"{report.rejected} ligne(s) rejetée(s).")
+                pd = lazy_import("pandas")
+                st.dataframe(
+                    pd.DataFrame(report.rejections, columns=["Ligne", "Raison"]),
+                    hide_index=True,
                 )
-                logging.info(f"Card avec id={card.id}")
+            # Refresh the themes, the import may have created some
+            st.session_state.all_themes = services.get_all_themes()
+            st.session_state.theme_lookup = {
+                obj.theme: obj.id for obj in st.session_state.all_themes
+            }
+
+
+def display_export_form():
+    options = [th.theme for th in st.session_state.all_themes]
+    selected_themes = st.multiselect(
+        "Thèmes à exporter", options=options, placeholder="Tous les thèmes"
+    )
+    format = st.selectbox("Format", options=FORMATS)
+    if st.button("Préparer l´export"):
+        theme_ids = [st.session_state.theme_lookup[name] for name in selected_themes]
+        # download_button holds the whole file in memory anyway: pass bytes
+        data = b"".join(services.export_cards(theme_ids or None, format))
+        st.download_button(
+            "Télécharger",
+            data=data,
+            file_name=f"flashcards.{format}",
+            mime=MIME_TYPES[format],
+        )
+
+
+def display_duplicates(id_theme: int):
+    groups = services.find_duplicates(id_theme)
+    if not groups:
+        st.info("Aucune question en double dans ce thème.")
+        return
+    st.write(f"{len(groups)} groupe(s) de questions similaires :")
+    pd = lazy_import("pandas")
+    for group in groups:
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Question": [card.question for card in group],
+                    "Réponse": [card.reponse for card in group],
+                }
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
 
 
 def display_theme_form():
@@ -161,6 +331,12 @@ st.session_state.theme_lookup = {
 with st.expander("Ajouter une question"):
     display_new_card_form()
 
+with st.expander("Importer des questions"):
+    display_import_form()
+
+with st.expander("Exporter les questions"):
+    display_export_form()
+
 display_theme_form()
 
 c_data, c_config = st.columns((3, 2))
@@ -180,6 +356,10 @@ with c_data:
 
     display_flascard(st.session_state.theme_lookup[selection])
 
+    with st.expander("Questions en double"):
+        if st.button("Rechercher les doublons"):
+            display_duplicates(st.session_state.theme_lookup[selection])
+
 if st.session_state.config_selected_card:
     with c_config:
         display_card_details()
@@ -0,0 +1,44 @@
+Feature: Asynchronous services
+  As a developer
+  I want to await the database services
+  So that an async server does not block a thread per request
+
+  Scenario: Create and read a card asynchronously
+    Given the async database is initialized
+    When a card is created asynchronously with theme ID 1 and question "What is 2+2?"
+    Then the card should be read asynchronously with question "What is 2+2?"
+    And the number of cards should be 1
+
+  Scenario: Page through the cards of a theme asynchronously
+    Given the async database is initialized
+    And 5 cards are created asynchronously with theme ID 1
+    When the cards of theme ID 1 are listed asynchronously by pages of 2
+    Then the pages should hold 2, 2 and 1 cards
+
+  Scenario: Record concurrent answers asynchronously
+    Given the async database is initialized
+    And 4 cards are created asynchronously with theme ID 1
+    When 20 answers are recorded concurrently
+    Then the stats summary should count 20 answers
+
+  Scenario: Delete a theme asynchronously
+    Given the async database is initialized
+    And 2 cards are created asynchronously with theme ID 2
+    When the theme ID 2 is deleted asynchronously
+    Then the theme ID 2 should not exist
+    And the number of cards should be 0
+
+  Scenario: A locked async write is retried until the lock is released
+    Given the async database file has no busy timeout
+    And a retry policy of 20 attempts
+    And another connection locks the database for 0.2 seconds
+    When a card is created asynchronously with theme ID 1 and question "Verrou ?"
+    Then the card should be read asynchronously with question "Verrou ?"
+    And at least 1 retry should be counted
+
+  Scenario: Async writes are run by the single writer
+    Given the async database file has no busy timeout
+    And the single writer is enabled
+    When a card is created asynchronously with theme ID 1 and question "Écrivain ?"
+    Then the card should be read asynchronously with question "Écrivain ?"
+    And 1 writes should be counted by the single writer
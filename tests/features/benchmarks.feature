@@ -0,0 +1,42 @@
+Feature: Benchmark results
+  As a developer
+  I want the benchmark results compared against a baseline
+  So that a slower service is reported before it is merged
+
+  Scenario Outline: Percentiles use the nearest rank
+    Given the latencies "5,3,1,4,2"
+    Then the percentile <fraction> should be <expected>
+
+    Examples:
+      | fraction | expected |
+      | 0.0      | 1        |
+      | 0.2      | 1        |
+      | 0.5      | 3        |
+      | 0.9      | 5        |
+      | 0.99     | 5        |
+      | 1.0      | 5        |
+
+  Scenario: The percentile of a single latency is that latency
+    Given the latencies "0.25"
+    Then the percentile 0.99 should be 0.25
+
+  Scenario: Results within the threshold are no regression
+    Given a baseline of 100 ops/s and a p99 of 10 ms for record_answers on 10000 cards
+    When results of 90 ops/s and a p99 of 11 ms for record_answers on 10000 cards are compared with a threshold of 0.2
+    Then no regression should be reported
+
+  Scenario: Fewer ops and a slower p99 are regressions
+    Given a baseline of 100 ops/s and a p99 of 10 ms for record_answers on 10000 cards
+    When results of 70 ops/s and a p99 of 13 ms for record_answers on 10000 cards are compared with a threshold of 0.2
+    Then 2 regressions should be reported
+    And the regressions should mention "10000 cards, record_answers: 70 ops/s" and "p99 13.00 ms"
+
+  Scenario Outline: Results missing from the baseline are skipped
+    Given a baseline of 100 ops/s and a p99 of 10 ms for record_answers on 10000 cards
+    When results of 1 ops/s and a p99 of 100 ms for <service> on <size> cards are compared with a threshold of 0.2
+    Then no regression should be reported
+
+    Examples:
+      | service        | size   |
+      | record_answers | 100000 |
+      | draw_card      | 10000  |
@@ -0,0 +1,35 @@
+Feature: Versioned read-through cache
+
+  Scenario: Repeated reads are served from the cache
+    Given the database is initialized
+    When all themes are retrieved 3 times
+    Then the cache should have 2 hits and 1 misses
+
+  Scenario: Creating a theme invalidates the cached themes
+    Given the database is initialized
+    And all themes are retrieved 1 times
+    When a new theme is created with name "Science"
+    And all themes are retrieved 1 times
+    Then 4 themes should be returned
+    And the cache should have 0 hits and 2 misses
+
+  Scenario: Updating a card invalidates the cached decks
+    Given the database is initialized
+    And a card exists with question "What is Python?" and theme ID 1
+    And the cards of theme ID 1 are retrieved
+    When the card's question is updated to "What is Git?"
+    And the cards of theme ID 1 are retrieved
+    Then the first retrieved card should have the question "What is Git?"
+
+  Scenario: Recording an answer bumps the stats version
+    Given the database is initialized
+    And a card exists with question "What is Python?" and theme ID 1
+    When a correct answer is recorded for the card
+    Then the stats version should have changed
+    And the themes version should not have changed
+
+  Scenario: The cache is bounded
+    Given the database is initialized
+    And the cache is limited to 2 entries
+    When the themes with ID 1, 2 and 3 are retrieved
+    Then the cache should hold 2 entries
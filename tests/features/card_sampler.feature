@@ -0,0 +1,74 @@
+Feature: Weighted card sampler
+
+  Scenario: Draw only from the selected themes
+    Given the database is initialized
+    And 3 cards exist with theme ID 1 and probability 0.5
+    And 3 cards exist with theme ID 2 and probability 0.5
+    When 50 cards are drawn from theme ID 1
+    Then all drawn cards should belong to theme ID 1
+
+  Scenario: No card is drawn from an empty theme
+    Given the database is initialized
+    When 1 cards are drawn from theme ID 3
+    Then no card should be drawn
+
+  Scenario: Draws follow the card probabilities
+    Given the database is initialized
+    And a card exists with question "rare" and probability 0.1 and theme ID 1
+    And a card exists with question "frequent" and probability 0.9 and theme ID 1
+    When 2000 cards are drawn from theme ID 1
+    Then the card "frequent" should be drawn about 9 times more often than "rare"
+
+  Scenario: Probability updates are applied to the loaded index
+    Given the database is initialized
+    And a card exists with question "first" and probability 0.1 and theme ID 1
+    And a card exists with question "second" and probability 0.1 and theme ID 1
+    And 1 cards are drawn from theme ID 1
+    When the card "second" is updated to probability 0.9
+    And 2000 cards are drawn from theme ID 1
+    Then the card "second" should be drawn about 9 times more often than "first"
+
+  Scenario: Deleted cards are never drawn
+    Given the database is initialized
+    And a card exists with question "kept" and probability 0.5 and theme ID 1
+    And a card exists with question "deleted" and probability 0.5 and theme ID 1
+    And 1 cards are drawn from theme ID 1
+    When the card "deleted" is deleted
+    And 200 cards are drawn from theme ID 1
+    Then only the card "kept" should be drawn
+
+  Scenario: Cards created after loading are drawn
+    Given the database is initialized
+    And 1 cards are drawn from theme ID 1
+    When a card exists with question "new" and probability 0.5 and theme ID 1
+    And 20 cards are drawn from theme ID 1
+    Then only the card "new" should be drawn
+
+
+  Scenario: Draw in SQL across several themes
+    Given the database is initialized
+    And 3 cards exist with theme ID 1 and probability 0.5
+    And 3 cards exist with theme ID 2 and probability 0.5
+    And 3 cards exist with theme ID 3 and probability 0.5
+    When 100 cards are drawn in SQL from themes ID 1 and 2
+    Then all drawn cards should belong to themes ID 1 and 2
+
+  Scenario: Draws in SQL follow the card probabilities
+    Given the database is initialized
+    And a card exists with question "rare" and probability 0.1 and theme ID 1
+    And a card exists with question "frequent" and probability 0.9 and theme ID 2
+    When 2000 cards are drawn in SQL from themes ID 1 and 2
+    Then the card "frequent" should be drawn about 9 times more often than "rare"
+
+  Scenario: Draws fall back to the sampler without the SQL math functions
+    Given the database is initialized
+    And SQLite has no math functions
+    And a card exists with question "rare" and probability 0.1 and theme ID 1
+    And a card exists with question "frequent" and probability 0.9 and theme ID 2
+    When 2000 cards are drawn in SQL from themes ID 1 and 2
+    Then the card "frequent" should be drawn about 9 times more often than "rare"
+
+  Scenario: No card is drawn in SQL from empty themes
+    Given the database is initialized
+    When 1 cards are drawn in SQL from themes ID 1 and 2
+    Then no card should be drawn
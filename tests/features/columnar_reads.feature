@@ -0,0 +1,36 @@
+Feature: Columnar reads
+  As a developer
+  I want to read cards and statistics as columns
+  So that large listings do not build ORM objects
+
+  Scenario: Read the cards of some themes as columns
+    Given the database is initialized
+    And 2 cards exist with theme ID 1 and questions "a,b"
+    And 1 cards exist with theme ID 2 and questions "c"
+    And 1 cards exist with theme ID 3 and questions "d"
+    When the card columns of theme IDs "1,3" are read
+    Then the "question" column should be "a,b,d"
+    And the "theme" column should be "Math,Math,Git"
+
+  Scenario: Page through the card columns like the cards
+    Given the database is initialized
+    And 5 cards exist with theme ID 1 and questions "e,d,c,b,a"
+    When the card columns of theme ID 1 are listed by pages of 2 ordered by question
+    Then the pages should be "a,b|c,d|e"
+
+  Scenario: Read the statistics of a period as columns
+    Given the database is initialized
+    And stats exist for the last 10 days
+    When the stats columns of the last 5 days are read at the current time
+    Then the "date" column should hold 6 days in order
+
+  Scenario: Read an empty table as columns
+    Given the database is initialized
+    When the card columns of theme IDs "1" are read
+    Then every column should be empty
+
+  Scenario: Read the card columns as arrays
+    Given the database is initialized
+    And 2 cards exist with theme ID 1 and questions "a,b"
+    When the card columns of theme IDs "1" are read as arrays
+    Then the "probabilite" column should be a NumPy array
@@ -0,0 +1,29 @@
+Feature: Write contention
+  As a user of a shared deployment
+  I want the writes to wait for the database lock
+  So that my answers are not lost when other sessions write
+
+  Scenario: A locked write is retried until the lock is released
+    Given a database file without busy timeout
+    And a retry policy of 20 attempts
+    And another connection locks the database for 0.2 seconds
+    When a card is created
+    Then the card should be created
+    And at least 1 retry should be counted
+
+  Scenario: A write still locked after the last retry is given up
+    Given a database file without busy timeout
+    And a retry policy of 2 attempts
+    And another connection locks the database
+    When a card is created
+    Then the card should not be created
+    And 2 retries and 1 failure should be counted
+
+  Scenario: The single writer serializes concurrent answers
+    Given a database file without busy timeout
+    And the single writer is enabled
+    And 4 cards exist
+    When 8 threads record 25 answers each
+    Then 200 answers should be counted in the stats
+    And 204 writes should be counted by the single writer
+    And no failure should be counted
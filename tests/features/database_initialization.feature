@@ -16,3 +16,34 @@ Feature: Database Initialization
     When the init_db function is called again with the same path
     Then no error should be raised
     And no new themes should be inserted
+    And no error should be logged
+
+  Scenario: An up-to-date database is checked without any DDL
+    Given the database exists
+    When the init_db function is called again in a recorded scope
+    Then at most 3 statements should be executed
+    And no DDL statement should be executed
+
+  Scenario: A missing table is created even at the latest schema version
+    Given the database exists
+    And the table "user_stats" was dropped
+    When the init_db function is called again with the same path
+    Then the table "user_stats" should exist
+
+  Scenario: The predefined themes are only inserted into a database without themes
+    Given the database exists
+    And the predefined themes were deleted but the theme "Perso"
+    When the init_db function is called again with the same path
+    Then the only theme should be "Perso"
+
+
+  Scenario: PRAGMAs are applied to every connection
+    Given the database exists
+    When a new connection is opened
+    Then foreign keys should be enforced on the connection
+    And the busy timeout of the connection should be 5000
+
+  Scenario: Sessions share the same factory
+    Given the database exists
+    When two sessions are opened
+    Then both sessions should come from the same factory
@@ -0,0 +1,55 @@
+Feature: Near-duplicate cards
+  As a user
+  I want the cards with almost the same question to be detected
+  So that my decks do not fill up with duplicates
+
+  Background:
+    Given the database is initialized
+    And a card "Que fait la commande git rebase ?" exists in theme ID 3
+    And a card "Que fait la commande git commit ?" exists in theme ID 3
+    And a card "Qu'est-ce qu'une dérivée ?" exists in theme ID 1
+
+  Scenario: Find the near-duplicates of a theme
+    Given a card "que fait la commande GIT rebase" exists in theme ID 3
+    And a card "Que fait la commande git rebase ?" exists in theme ID 1
+    When the duplicates of theme ID 3 are searched
+    Then the duplicate groups should be "1,4"
+
+  Scenario: A card stops being a duplicate once its question changes
+    Given a card "Que fait la commande git rebase ?" exists in theme ID 3
+    And the question of the card with ID 4 is changed to "Comment créer une branche ?"
+    When the duplicates of theme ID 3 are searched
+    Then no duplicate should be found
+
+  Scenario: Find existing near-duplicates of new questions
+    When near-duplicates are searched for "Qu'est ce qu'une derivee ?" in theme ID 1 and "Que fait la commande git rebase ?" in theme ID 1
+    Then the similar cards should be "3,None"
+
+  Scenario: Skip the duplicates when importing a deck
+    When the following CSV deck is imported skipping duplicates
+      """
+      question,reponse,probabilite,theme
+      Que fait la commande git rebase ?,Réécrit l'historique,0.5,Git
+      Comment créer une branche ?,git switch -c,0.5,Git
+      Comment créer une branche?,git branch,0.5,Git
+      Comment fusionner deux branches ?,git merge,0.5,Git
+      """
+    Then 2 cards should be imported and 2 rejected
+    And line 2 should be rejected as a duplicate of card 1
+    And line 4 should be rejected as a duplicate of line 3
+
+  Scenario: Distinct short questions do not share any bucket
+    Given cards with the questions "chat,chien,maison,voiture,arbre,soleil,lune,pomme,poire,table" exist in theme ID 2
+    Then no bucket should be shared by two cards of theme ID 2
+
+  Scenario: Find the exact duplicates of short questions
+    Given a card "Chat" exists in theme ID 2
+    And a card "chat !" exists in theme ID 2
+    And a card "Chien" exists in theme ID 2
+    When the duplicates of theme ID 2 are searched
+    Then the duplicate groups should be "4,5"
+
+  Scenario: Find an existing exact duplicate of a new question
+    Given a card "Chat" exists in theme ID 2
+    When near-duplicates are searched for "CHAT" in theme ID 2 and "chat" in theme ID 1
+    Then the similar cards should be "4,None"
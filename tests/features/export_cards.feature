@@ -0,0 +1,22 @@
+Feature: Streaming export of cards
+
+  Scenario Outline: Export a deck and import it back
+    Given the database is initialized
+    And 3 cards exist with theme ID 1
+    And 2 cards exist with theme ID 2
+    When the cards of themes ID 1 are exported as <format> by chunks of 2 cards
+    Then the export should contain 3 cards of the theme "Math"
+    And importing the export should create 3 cards
+
+    Examples:
+      | format |
+      | csv    |
+      | jsonl  |
+      | fcd    |
+
+  Scenario: Export every theme
+    Given the database is initialized
+    And 3 cards exist with theme ID 1
+    And 2 cards exist with theme ID 2
+    When all cards are exported as csv by chunks of 1000 cards
+    Then the export should contain 5 cards
@@ -0,0 +1,39 @@
+Feature: Streaming import of cards
+
+  Scenario: Import a CSV deck
+    Given the database is initialized
+    When the following CSV deck is imported by batches of 2 cards
+      """
+      question,reponse,probabilite,theme
+      What is Python?,A programming language,0.5,Programming Language
+      What is SQL?,A query language,,Programming Language
+      What is 1+1?,2,0.3,Math
+      What is a commit?,A snapshot,0.4,Versioning
+      """
+    Then 4 cards should be imported and 0 rejected
+    And the theme "Versioning" should exist
+    And the theme "Programming Language" should have 2 cards
+
+  Scenario: Invalid CSV rows are rejected
+    Given the database is initialized
+    When the following CSV deck is imported by batches of 10 cards
+      """
+      question,reponse,probabilite,theme
+      What is Python?,A programming language,0.5,Math
+      ,No question,0.5,Math
+      What is SQL?,A query language,2,Math
+      What is Git?,A VCS,abc,Math
+      """
+    Then 1 cards should be imported and 3 rejected
+    And line 3 should be rejected
+
+  Scenario: Import a JSON Lines deck
+    Given the database is initialized
+    When the following JSON Lines deck is imported by batches of 10 cards
+      """
+      {"question": "What is Python?", "reponse": "A language", "theme": "Math"}
+      not json
+      {"question": "What is SQL?", "reponse": "A query language", "probabilite": 0.2, "theme": "Git"}
+      """
+    Then 2 cards should be imported and 1 rejected
+    And line 2 should be rejected
@@ -0,0 +1,30 @@
+Feature: SQL instrumentation
+  As a developer
+  I want to record the SQL statements executed by each service
+  So that I can find slow services and N+1 query patterns
+
+  Scenario: Count the statements and rows of the services
+    Given the database is initialized
+    And the SQL instrumentation is enabled
+    When 3 cards are created then read all at once in a recorded scope
+    Then the scope should record 1 call of "_create_cards"
+    And the scope should record 1 call of "get_all_cards/get_all_rows" returning 3 rows
+    And no repeated statement should be reported
+
+  Scenario: Detect an N+1 query pattern
+    Given the database is initialized
+    And the SQL instrumentation is enabled
+    When 3 cards are created then read one by one in a recorded scope
+    Then a repeated statement of "get_card/get_row_by_id" should be reported 3 times
+
+  Scenario: Nothing is recorded when the instrumentation is disabled
+    Given the database is initialized
+    When 3 cards are created in a recorded scope
+    Then the scope should record no statement
+
+  Scenario: Writes run by the single writer keep the name of their service
+    Given a database file
+    And the SQL instrumentation is enabled
+    And the single writer is enabled
+    When the theme "Verbes" is created
+    Then the totals should record 1 call of "create_theme/add_row"
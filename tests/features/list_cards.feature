@@ -0,0 +1,26 @@
+Feature: Keyset pagination of the cards of a theme
+
+  Scenario: Page through the cards by ID
+    Given the database is initialized
+    And 5 cards exist with theme ID 1 and questions "e,d,c,b,a"
+    And 2 cards exist with theme ID 2 and questions "x,y"
+    When the cards of theme ID 1 are listed by pages of 2 ordered by id
+    Then the pages should be "e,d|c,b|a"
+
+  Scenario: Page through the cards by question
+    Given the database is initialized
+    And 5 cards exist with theme ID 1 and questions "e,d,c,b,a"
+    When the cards of theme ID 1 are listed by pages of 2 ordered by question
+    Then the pages should be "a,b|c,d|e"
+
+  Scenario: Ties are broken by ID
+    Given the database is initialized
+    And 5 cards exist with theme ID 1 and questions "b,a,b,a,b"
+    When the cards of theme ID 1 are listed by pages of 2 ordered by question
+    Then the pages should be "a,a|b,b|b"
+    And every card should be listed once
+
+  Scenario: Reject an unknown order
+    Given the database is initialized
+    When the cards of theme ID 1 are listed ordered by theme
+    Then a ValueError should be raised
@@ -0,0 +1,69 @@
+Feature: Schema migrations and query plans
+
+  Scenario: A new database is at the latest schema version
+    Given a new database
+    Then the schema version should be the latest
+
+  Scenario: A legacy database gains the missing indexes
+    Given a legacy database with duplicated daily stats
+    When the init_db function is called
+    Then the schema version should be the latest
+    And the index "ix_cards_id_theme" should exist
+    And the index "ix_stats_date" should exist
+    And the duplicated daily stats should be merged
+    And the index "ix_cards_fingerprint" should exist
+    And the index "ix_cards_id_theme_due_at" should exist
+    And every legacy card should be due
+    And the legacy cards should be grouped as duplicates "1,2"
+
+  Scenario: The reviews gain the user of the answer
+    Given a database at schema version 4 with reviews
+    When the init_db function is called
+    Then the schema version should be the latest
+    And the table "reviews" should have the column "user_id"
+    And the table "user_card_states" should exist
+    And the table "user_card_states" should have the column "due_at"
+    And the index "ix_user_card_states_user_id_due_at" should exist
+
+  Scenario: A failing migration rolls back the whole schema
+    Given a new database file
+    And a migration failing after creating a table
+    When the init_db function is called
+    Then no migration should be applied
+    And the table "cards" should not exist
+
+  Scenario: Migrations are only applied once
+    Given a new database
+    When the init_db function is called
+    Then no migration should be applied
+
+  Scenario Outline: Hot service queries use an index
+    Given a new database
+    And a card exists with theme ID 1
+    When the service <service> is called
+    Then its queries should not scan the table "<table>"
+
+    Examples:
+      | service                    | table            |
+      | get_cards_by_theme         | cards            |
+      | list_cards                 | cards            |
+      | draw_card                  | cards            |
+      | record_answer              | cards            |
+      | record_answer              | reviews          |
+      | get_stats                  | stats            |
+      | draw_card_for_user         | user_card_states |
+      | get_stats_summary_for_user | user_stats       |
+      | next_due_cards             | cards            |
+      | next_due_cards_for_user    | cards            |
+
+  Scenario Outline: The due queues are read from the due date indexes
+    Given a new database
+    And a card exists with theme ID 1
+    When the service <service> is called
+    Then its queries should use the index "<index>"
+
+    Examples:
+      | service                 | index                              |
+      | next_due_cards          | ix_cards_id_theme_due_at           |
+      | next_due_cards_for_user | ix_cards_id_theme_due_at           |
+      | next_due_cards_for_user | ix_user_card_states_user_id_due_at |
@@ -0,0 +1,81 @@
+Feature: Prefetch of the quiz cards
+  As a user taking a quiz
+  I want the next cards to be drawn in advance
+  So that the page reruns without waiting for the database
+
+  Scenario: The current card is kept across reruns without any query
+    Given the database is initialized
+    And 5 cards exist in theme ID 1
+    And a prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    And the page is rerun 3 times
+    Then the same card should be shown on every rerun
+    And no statement should be executed by the reruns
+
+  Scenario: The buffer is refilled from the due cards with a single query
+    Given the database is initialized
+    And 20 cards exist in theme ID 1
+    And a prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    And the cards are answered until the buffer drops below the low-water mark
+    Then the refill should execute 1 statement
+    And 4 cards should be buffered
+
+  Scenario: The cards answered correctly are not due anymore
+    Given the database is initialized
+    And 3 cards exist in theme ID 1
+    And the card with ID 1 was answered correctly
+    And a prefetcher of 2 cards for theme ID 1
+    When the current card is shown
+    Then the next cards should start with "2,3"
+
+  Scenario: Changing the themes drops the prefetched cards
+    Given the database is initialized
+    And 5 cards exist in theme ID 1
+    And 5 cards exist in theme ID 2
+    And a prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    And the theme ID 2 is selected
+    And the current card is shown
+    Then the current card should be in theme ID 2
+    And every buffered card should be in theme ID 2
+
+  Scenario: Nothing is shown for themes without cards
+    Given the database is initialized
+    And a prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    Then no card should be shown
+
+  Scenario: The buffer is refilled in the background
+    Given a database file
+    And 20 cards exist in theme ID 1
+    And a background prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    And the cards are answered until the buffer drops below the low-water mark
+    And the background refill is done
+    Then 4 cards should be buffered
+
+  Scenario: A card is never buffered twice
+    Given the database is initialized
+    And 3 cards exist in theme ID 1
+    And every card of theme ID 1 was answered correctly
+    And a prefetcher of 10 cards for theme ID 1
+    When the current card is shown
+    Then no card should be shown twice in a row
+
+  Scenario: Editing a card reloads the prefetched cards
+    Given the database is initialized
+    And 5 cards exist in theme ID 1
+    And a prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    And the question of the current card is changed to "modifiée"
+    Then the current card should have the question "modifiée"
+    And the buffer should have been reloaded
+
+  Scenario: Deleting the current card moves on to the next one
+    Given the database is initialized
+    And 5 cards exist in theme ID 1
+    And a prefetcher of 4 cards for theme ID 1
+    When the current card is shown
+    And the current card is deleted
+    Then the current card should not be the deleted one
@@ -0,0 +1,42 @@
+Feature: Activity report
+  As a user
+  I want the report to count every answer of a period
+  So that the answers not written yet by the write-behind mode are not missing
+
+  Scenario Outline: Periods end today
+    When the period "<period>" is computed on 2024-05-15
+    Then the period should run from <start> to <end> by <bucket>
+
+    Examples:
+      | period           | start      | end        | bucket |
+      | Aujourd´hui      | 2024-05-15 | 2024-05-15 | day    |
+      | 5 derniers jours | 2024-05-10 | 2024-05-15 | day    |
+      | Dernier mois     | 2024-04-15 | 2024-05-15 | day    |
+      | Cette année      | 2023-05-16 | 2024-05-15 | week   |
+      | Toujours         | None       | None       | month  |
+
+  Scenario: Pending answers outside the period are left out
+    Given the pending answers "2024-05-09:1/0,2024-05-10:2/0,2024-05-15:0/1,2024-05-16:4/4"
+    When the pending answers are kept from 2024-05-10 to 2024-05-15
+    Then the pending answers should be "2024-05-10:2/0,2024-05-15:0/1"
+
+  Scenario Outline: Pending answers are folded into the buckets of the database
+    Given the database is initialized
+    And a card exists in theme ID 1
+    And the answers "2024-05-14:1/0,2024-05-20:0/1,2024-04-30:1/1" are recorded
+    And the pending answers "2024-05-15:2/1,2024-05-26:0/1,2024-05-27:1/0,2024-06-01:1/1"
+    When the report is prepared from 2024-04-01 to 2024-06-30 by <bucket>
+    Then the report rows should be "<rows>"
+    And the report totals should be 6 correct and 5 incorrect answers
+
+    Examples:
+      | bucket | rows                                                                 |
+      | day    | 2024-04-30:1/1,2024-05-14:1/0,2024-05-15:2/1,2024-05-20:0/1,2024-05-26:0/1,2024-05-27:1/0,2024-06-01:1/1 |
+      | week   | 2024-04-29:1/1,2024-05-13:3/1,2024-05-20:0/2,2024-05-27:2/1          |
+      | month  | 2024-04-01:1/1,2024-05-01:4/3,2024-06-01:1/1                         |
+
+  Scenario: Pending answers alone make a report
+    Given the pending answers "2024-05-15:2/1"
+    When the report is prepared without summary by week
+    Then the report rows should be "2024-05-13:2/1"
+    And the report totals should be 2 correct and 1 incorrect answers
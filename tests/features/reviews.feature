@@ -0,0 +1,32 @@
+Feature: Review log and daily rollup
+
+  Scenario: Answers are appended to the review log
+    Given the database is initialized
+    And a card exists with ID 1 and probability 0.5 and theme ID 2
+    When a correct answer taking 1200 ms is recorded for the card with ID 1
+    Then the review log should contain 1 reviews
+    And the last review should be correct for card 1 and theme 2 with a latency of 1200 ms
+
+  Scenario: Bulk reviews are rolled up into the daily stats
+    Given the database is initialized
+    And 3 correct and 2 incorrect reviews exist for theme ID 2, 3 days ago
+    When the reviews are rolled up
+    Then the stat of 3 days ago should have 3 correct answers and 2 incorrect answers
+    And the theme ID 2 stat of 3 days ago should have 3 correct answers and 2 incorrect answers
+
+  Scenario: The rollup is incremental
+    Given the database is initialized
+    And 3 correct and 2 incorrect reviews exist for theme ID 2, 3 days ago
+    And the reviews are rolled up
+    And 1 correct and 1 incorrect reviews exist for theme ID 2, 3 days ago
+    When the reviews are rolled up
+    Then 2 reviews should have been rolled up
+    And the stat of 3 days ago should have 4 correct answers and 3 incorrect answers
+
+  Scenario: Rolling up without new reviews does nothing
+    Given the database is initialized
+    And 3 correct and 2 incorrect reviews exist for theme ID 2, 3 days ago
+    And the reviews are rolled up
+    When the reviews are rolled up
+    Then 0 reviews should have been rolled up
+    And the stat of 3 days ago should have 3 correct answers and 2 incorrect answers
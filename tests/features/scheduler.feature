@@ -0,0 +1,47 @@
+Feature: Spaced repetition
+  As a user
+  I want the cards I know to come back less and less often
+  So that my reviews focus on the cards I am about to forget
+
+  Scenario: Correct answers space the reviews out
+    Given the database is initialized
+    And a card exists with question "q" in theme ID 1
+    When the card "q" is answered correctly 3 times
+    Then the card "q" should be due in 15 days
+    And the card "q" should have 3 repetitions and an ease of 2.5
+
+  Scenario: An incorrect answer brings the card back the next day
+    Given the database is initialized
+    And a card exists with question "q" in theme ID 1
+    When the card "q" is answered correctly 3 times
+    And the card "q" is answered incorrectly 1 times
+    Then the card "q" should be due in 1 days
+    And the card "q" should have 0 repetitions and an ease of 1.96
+
+  Scenario: New cards are due at once
+    Given the database is initialized
+    And a card exists with question "a" in theme ID 1
+    And a card exists with question "b" in theme ID 2
+    Then the next 10 due cards of themes ID "1,2" should be "a,b"
+
+  Scenario: Only the due cards are returned, the most overdue first
+    Given the database is initialized
+    And a card exists with question "a" in theme ID 1
+    And a card exists with question "b" in theme ID 2
+    And a card exists with question "c" in theme ID 1
+    And a card exists with question "d" in theme ID 3
+    When the card "a" is answered correctly 1 times
+    Then the next 10 due cards of themes ID "1,2" should be "b,c"
+    And the next 1 due cards of themes ID "1,2" should be "b"
+    And the next 10 due cards of themes ID "1,2" in 2 days should be "b,c,a"
+
+  Scenario: Each user has their own schedule
+    Given the database is initialized
+    And a card exists with question "a" in theme ID 1
+    And a card exists with question "b" in theme ID 1
+    And the user "alice" exists
+    When "alice" answers the card "a" correctly 1 times
+    Then the next 10 due cards of themes ID "1" for "alice" should be "b"
+    And the next 10 due cards of themes ID "1" for "alice" in 2 days should be "b,a"
+    And the next 10 due cards of themes ID "1" should be "a,b"
+    And the card "a" should have 0 repetitions and an ease of 2.5
@@ -0,0 +1,36 @@
+Feature: Full-text search of the cards
+  As a user
+  I want to search the cards by the words of their question or answer
+  So that I can find a card without scrolling through a whole theme
+
+  Background:
+    Given the database is initialized
+    And a card "Qu'est-ce qu'une dérivée ?" with answer "Le taux de variation" exists in theme ID 1
+    And a card "Que fait git rebase ?" with answer "Il réécrit l'historique" exists in theme ID 3
+    And a card "Que fait git commit ?" with answer "Il enregistre les changements" exists in theme ID 3
+
+  Scenario: Search by word prefix, ignoring case and accents
+    When the cards are searched for "DERIV"
+    Then the found questions should be "Qu'est-ce qu'une dérivée ?"
+
+  Scenario: Every word of the query must match
+    When the cards are searched for "git historique"
+    Then the found questions should be "Que fait git rebase ?"
+
+  Scenario: Restrict the search to some themes
+    When the cards of theme ID 1 are searched for "git"
+    Then no card should be found
+
+  Scenario: The index follows the updates of the cards
+    Given the question of the card with ID 2 is changed to "Que fait hg rebase ?"
+    When the cards are searched for "git"
+    Then the found questions should be "Que fait git commit ?"
+
+  Scenario: The index follows the deletion of the cards
+    Given the card with ID 3 is deleted
+    When the cards are searched for "git"
+    Then the found questions should be "Que fait git rebase ?"
+
+  Scenario: The search syntax is not interpreted
+    When the cards are searched for "(git* "rebase"
+    Then the found questions should be "Que fait git rebase ?"
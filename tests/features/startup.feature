@@ -0,0 +1,15 @@
+Feature: Startup of a process
+  As the operator of the application
+  I want the startup steps to be timed and the heavy imports deferred
+  So that new processes are ready quickly and I can see where the time goes
+
+  Scenario: The initialization steps are timed
+    Given the startup timings are reset
+    When the database is initialized
+    Then the startup steps should be "schéma,thèmes"
+
+  Scenario: A module is imported and timed only once
+    Given the startup timings are reset
+    And the module "json.tool" is not imported yet
+    When the module "json.tool" is lazily imported 2 times
+    Then the startup steps should be "import json.tool"
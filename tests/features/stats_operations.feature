@@ -46,3 +46,57 @@ Feature: Operations on card probabilities and stats
     And 10 stats exists
     When all stats are retrieved
     Then 10 stats are retrieved
+
+  Scenario Outline: Summarize the stats of a period by bucket
+    Given the database is initialized
+    And one correct and two incorrect answers each day from 2024-02-21 to 2024-03-31
+    When the stats from 2024-03-01 to 2024-03-31 are summarized by <bucket>
+    Then the totals should be 31 correct and 62 incorrect answers
+    And the series should be "<series>"
+
+    Examples:
+      | bucket | series                                                                      |
+      | month  | 2024-03-01:31                                                               |
+      | week   | 2024-02-26:3,2024-03-04:7,2024-03-11:7,2024-03-18:7,2024-03-25:7           |
+
+  Scenario: Summarize the stats of a period bounded by datetimes
+    Given the database is initialized
+    And one correct and two incorrect answers each day from 2024-02-21 to 2024-03-31
+    When the stats from 2024-03-30 12:30 to 2024-03-31 12:30 are summarized by day
+    Then the totals should be 2 correct and 4 incorrect answers
+
+  Scenario: Record a correct answer in a single transaction
+    Given the database is initialized
+    And a card exists with ID 1 and probability 0.5
+    And stat exist or is created and contain 5 correct answers and 3 incorrect answers
+    When a correct answer is recorded for the card with ID 1
+    Then the card with ID 1 should have the probability 0.45
+    And the stat should have 6 correct answers and 3 incorrect answers
+
+  Scenario: Record an incorrect answer without daily stat
+    Given the database is initialized
+    And a card exists with ID 1 and probability 0.5
+    And the daily stat does not exist
+    When a incorrect answer is recorded for the card with ID 1
+    Then the card with ID 1 should have the probability 0.55
+    And the stat should have 0 correct answers and 1 incorrect answers
+
+  Scenario: Recorded probabilities stay within bounds
+    Given the database is initialized
+    And a card exists with ID 1 and probability 0.95
+    When a incorrect answer is recorded for the card with ID 1
+    Then the card with ID 1 should have the probability 1.0
+
+  Scenario: Attempt to record an answer for a non-existent card
+    Given the database is initialized
+    And the daily stat does not exist
+    When a correct answer is recorded for the card with ID 999
+    Then an error should be logged indicating the card with ID 999 was not found
+    And the daily stat should still not exist
+
+  Scenario: Record a batch of answers in a single transaction
+    Given the database is initialized
+    And a card exists with ID 1 and probability 0.5
+    And the daily stat does not exist
+    When a batch of 3 correct and 2 incorrect answers is recorded for the card with ID 1
+    Then the stat should have 3 correct answers and 2 incorrect answers
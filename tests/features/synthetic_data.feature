@@ -0,0 +1,28 @@
+Feature: Synthetic data generation
+  As a developer
+  I want to generate a reproducible synthetic database
+  So that benchmarks and profiling run against the same realistic dataset
+
+  Scenario: Generate a synthetic deck with its review history
+    Given the database is initialized
+    When a synthetic dataset of 500 cards in 10 themes is generated with seed 42
+    Then the database should contain 500 synthetic cards in 10 themes
+    And every card probability should be between 0.1 and 1
+    And the first theme should be the largest
+    And the daily stats should match the generated reviews
+
+  Scenario: The same seed generates the same dataset
+    Given the database is initialized
+    When a synthetic dataset of 200 cards in 5 themes is generated with seed 7
+    Then generating again with seed 7 should append the same cards
+
+  Scenario Outline: A failed batch stops the generation
+    Given the database is initialized
+    And the database fails to write the <rows>
+    Then generating a synthetic dataset should fail with "<error>"
+    And no review should be written
+
+    Examples:
+      | rows    | error                                           |
+      | cards   | Could not write the synthetic cards 0 to 19     |
+      | reviews | Could not write a batch of .* synthetic reviews |
@@ -0,0 +1,78 @@
+Feature: Users
+  As a user of a shared deployment
+  I want my own card probabilities and statistics
+  So that other users do not overwrite my learning state
+
+  Scenario: The answers of a user only change their own probability
+    Given the database is initialized
+    And a card exists with question "q" and probability 0.5 and theme ID 1
+    And the users "alice,bob" exist
+    When "alice" answers the card "q" correctly
+    Then the shared probability of the card "q" should be 0.5
+    And the probability of the card "q" for "alice" should be 0.45
+    And the card "q" should have no probability for "bob"
+
+  Scenario: Each user has their own statistics
+    Given the database is initialized
+    And a card exists with question "q" and probability 0.5 and theme ID 1
+    And the users "alice,bob" exist
+    When "alice" answers the card "q" correctly
+    And "alice" answers the card "q" correctly
+    And "alice" answers the card "q" incorrectly
+    And "bob" answers the card "q" incorrectly
+    Then the stats of "alice" should count 2 correct and 1 incorrect answers
+    And the stats of "bob" should count 0 correct and 1 incorrect answers
+    And the shared stats should count 0 correct and 0 incorrect answers
+
+  Scenario: The answers of the users are rolled up into the theme stats
+    Given the database is initialized
+    And a card exists with question "q" and probability 0.5 and theme ID 1
+    And the users "alice,bob" exist
+    When "alice" answers the card "q" correctly
+    And "bob" answers the card "q" incorrectly
+    Then the stats of theme ID 1 should count 1 correct and 1 incorrect answers
+    And no review should be left to roll up
+
+  Scenario Outline: Draws follow the probabilities of the user
+    Given the database is initialized
+    And a card exists with question "known" and probability 0.9 and theme ID 1
+    And a card exists with question "unknown" and probability 0.1 and theme ID 1
+    And the users "alice" exist
+    And 1 cards are drawn <method> from theme ID 1 for "alice"
+    When "alice" answers the card "known" correctly 22 times
+    And "alice" answers the card "unknown" incorrectly 25 times
+    And 2000 cards are drawn <method> from theme ID 1 for "alice"
+    Then the card "unknown" should be drawn about 10 times more often than "known"
+
+    Examples:
+      | method    |
+      | in memory |
+      | in SQL    |
+
+  Scenario: Only the sampler indexes of the last drawing users are kept
+    Given the database is initialized
+    And a card exists with question "q" and probability 0.5 and theme ID 1
+    And the users "alice,bob,carol" exist
+    And the sampler keeps 2 user indexes
+    When 1 cards are drawn in memory from theme ID 1 for "alice"
+    And 1 cards are drawn in memory from theme ID 1 for "bob"
+    And 1 cards are drawn in memory from theme ID 1 for "carol"
+    Then the sampler should keep the indexes of "bob,carol"
+    When 1 cards are drawn in memory from theme ID 1 for "bob"
+    And 1 cards are drawn in memory from theme ID 1 for "alice"
+    Then the sampler should keep the indexes of "bob,alice"
+    And only the card "q" should be drawn
+
+  Scenario: The users are listed for the sidebar
+    Given the database is initialized
+    And the users "alice,bob" exist
+    When the user "alice" is deleted
+    Then the users should be listed as "bob"
+
+  Scenario: Deleting a user deletes their learning state
+    Given the database is initialized
+    And a card exists with question "q" and probability 0.5 and theme ID 1
+    And the users "alice" exist
+    When "alice" answers the card "q" correctly
+    And the user "alice" is deleted
+    Then the card "q" should have no probability for "alice"
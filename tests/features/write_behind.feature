@@ -0,0 +1,31 @@
+Feature: Write-behind queue of quiz answers
+
+  Scenario: Queued answers are reported as pending
+    Given a write-behind queue with a blocked writer
+    When 2 correct and 1 incorrect answers are submitted
+    Then 3 answers should be pending
+    And today should have 2 correct and 1 incorrect pending answers
+
+  Scenario: Answers are written in batches
+    Given a write-behind queue with batches of 3 answers
+    When 2 correct and 5 incorrect answers are submitted
+    And the queue is stopped
+    Then 7 answers should have been written
+    And no batch should contain more than 3 answers
+    And 0 answers should be pending
+
+  Scenario: Failed batches are retried
+    Given a write-behind queue whose writer fails once
+    When 1 correct and 1 incorrect answers are submitted
+    And the queue is stopped
+    Then 2 answers should have been written
+    And 0 answers should be pending
+
+  Scenario: An answer that cannot be written does not block the others
+    Given a write-behind queue whose writer always fails on card ID 99
+    When an answer for the card ID 99 is submitted
+    And 2 correct and 1 incorrect answers are submitted
+    And the queue is stopped
+    Then 3 answers should have been written
+    And 1 answer should have been given up
+    And 0 answers should be pending
@@ -0,0 +1,172 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+pytest.importorskip("aiosqlite")
+
+from src.db import aio_services, config, contention
+from src.db.config import setup_config
+from src.db.contention import RetryPolicy
+
+scenarios("features/aio_services.feature")
+
+
+@pytest.fixture
+def run():
+    # One loop per test: the in-memory connection is bound to it
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.run_until_complete(aio_services.dispose())
+    loop.close()
+
+
+@given("the async database is initialized")
+def initialize_database(run):
+    # Reset the shared cache and sampler along with the sync engine
+    setup_config(":memory:")
+    aio_services.setup_async_config(":memory:")
+    run(aio_services.init_async_db())
+
+
+@given("the async database file has no busy timeout", target_fixture="database")
+def initialize_database_file(run, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "engine_initialized", False)
+    monkeypatch.setattr(config, "DATABASE_PATH", config.DATABASE_PATH)
+    path = str(tmp_path / "flashcards.db")
+    setup_config(path, pragmas={"busy_timeout": 0})
+    aio_services.setup_async_config(path)
+    run(aio_services.init_async_db())
+    contention.stats.reset()
+    yield path
+    contention.writer.disable()
+    config.engine.dispose()
+
+
+@given(parsers.parse("a retry policy of {attempts:d} attempts"))
+def retry_policy(monkeypatch, attempts):
+    monkeypatch.setattr(contention, "policy", RetryPolicy(attempts, base_delay=0.05))
+
+
+@given(
+    parsers.parse("another connection locks the database for {seconds:f} seconds"),
+    target_fixture="lock",
+)
+def lock_database_for(database, seconds):
+    lock = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+    lock.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(seconds, lock.execute, ["COMMIT"])
+    timer.start()
+    yield lock
+    timer.join()
+    lock.close()
+
+
+@given("the single writer is enabled")
+def enable_single_writer():
+    contention.writer.enable()
+
+
+@given(
+    parsers.parse(
+        "{counter:d} cards are created asynchronously with theme ID {id_theme:d}"
+    ),
+    target_fixture="card_ids",
+)
+def create_cards(counter, id_theme, run):
+    async def create():
+        return await asyncio.gather(
+            *(
+                aio_services.create_card(f"Question {i}", "Réponse", 0.5, id_theme)
+                for i in range(counter)
+            )
+        )
+
+    return [card.id for card in run(create())]
+
+
+@when(
+    parsers.parse(
+        'a card is created asynchronously with theme ID {id_theme:d} and question "{question}"'
+    ),
+    target_fixture="card_id",
+)
+def create_card(id_theme, question, run):
+    card = run(aio_services.create_card(question, "4", 0.5, id_theme))
+    return card.id
+
+
+@when(
+    parsers.parse(
+        "the cards of theme ID {id_theme:d} are listed asynchronously by pages of {limit:d}"
+    ),
+    target_fixture="pages",
+)
+def list_pages(id_theme, limit, run):
+    async def pages():
+        result, after_id = [], None
+        while page := await aio_services.list_cards(id_theme, after_id, limit):
+            result.append(page)
+            after_id = page[-1].id
+        return result
+
+    return run(pages())
+
+
+@when(parsers.parse("{counter:d} answers are recorded concurrently"))
+def record_answers(card_ids, counter, run):
+    async def record():
+        await asyncio.gather(
+            *(
+                aio_services.record_answer(card_ids[i % len(card_ids)], i % 2 == 0)
+                for i in range(counter)
+            )
+        )
+
+    run(record())
+
+
+@when(parsers.parse("the theme ID {id_theme:d} is deleted asynchronously"))
+def delete_theme(id_theme, run):
+    run(aio_services.delete_theme(id_theme))
+
+
+@then(
+    parsers.parse('the card should be read asynchronously with question "{question}"')
+)
+def check_card(card_id, question, run):
+    card = run(aio_services.get_card(card_id))
+    assert card.question == question
+
+
+@then(parsers.parse("the number of cards should be {counter:d}"))
+def check_number_of_cards(counter, run):
+    assert run(aio_services.get_number_of_cards()) == counter
+
+
+@then(parsers.parse("the pages should hold {first:d}, {second:d} and {third:d} cards"))
+def check_pages(pages, first, second, third):
+    assert [len(page) for page in pages] == [first, second, third]
+
+
+@then(parsers.parse("the stats summary should count {counter:d} answers"))
+def check_summary(counter, run):
+    summary = run(aio_services.get_stats_summary())
+    assert summary["bonnes_reponses"] + summary["mauvaises_reponses"] == counter
+
+
+@then(parsers.parse("the theme ID {id_theme:d} should not exist"))
+def check_theme(id_theme, run):
+    assert run(aio_services.get_theme(id_theme)) is None
+
+
+@then(parsers.parse("at least {counter:d} retry should be counted"))
+def check_some_retries(counter):
+    assert contention.stats.stats()["retries"] >= counter
+
+
+@then(parsers.parse("{counter:d} writes should be counted by the single writer"))
+def check_writes(counter):
+    assert contention.stats.stats()["writes"] == counter
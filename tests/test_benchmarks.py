@@ -0,0 +1,57 @@
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from benchmarks.run import compare, percentile
+
+scenarios("features/benchmarks.feature")
+
+
+def results(ops_per_sec, p99_ms, service, size):
+    stats = {"ops_per_sec": ops_per_sec, "p99_ms": p99_ms}
+    return {"sizes": {str(size): {"services": {service: stats}}}}
+
+
+@given(parsers.parse('the latencies "{latencies}"'), target_fixture="latencies")
+def given_latencies(latencies):
+    return [float(latency) for latency in latencies.split(",")]
+
+
+@given(
+    parsers.parse(
+        "a baseline of {ops:d} ops/s and a p99 of {p99:d} ms for {service} on {size:d} cards"
+    ),
+    target_fixture="baseline",
+)
+def given_baseline(ops, p99, service, size):
+    return results(ops, p99, service, size)
+
+
+@when(
+    parsers.parse(
+        "results of {ops:d} ops/s and a p99 of {p99:d} ms for {service} on {size:d} cards "
+        "are compared with a threshold of {threshold:f}"
+    ),
+    target_fixture="regressions",
+)
+def compare_results(baseline, ops, p99, service, size, threshold):
+    return compare(results(ops, p99, service, size), baseline, threshold)
+
+
+@then(parsers.parse("the percentile {fraction:g} should be {expected:g}"))
+def check_percentile(latencies, fraction, expected):
+    assert percentile(latencies, fraction) == expected
+
+
+@then("no regression should be reported")
+def check_no_regression(regressions):
+    assert regressions == []
+
+
+@then(parsers.parse("{counter:d} regressions should be reported"))
+def check_regressions(regressions, counter):
+    assert len(regressions) == counter
+
+
+@then(parsers.parse('the regressions should mention "{first}" and "{second}"'))
+def check_regression_messages(regressions, first, second):
+    assert regressions[0].startswith(first)
+    assert second in regressions[1]
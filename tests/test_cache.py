@@ -0,0 +1,128 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.cache import cache
+from src.db.config import setup_config
+from src.db.services import (
+    STATS,
+    THEMES,
+    create_card,
+    create_theme,
+    get_all_themes,
+    get_cards_by_theme,
+    get_data_version,
+    get_theme,
+    record_answer,
+    update_card,
+)
+from src.db.tables import init_db
+
+scenarios("features/cache.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    cache.clear()
+    max_entries = cache.max_entries
+    with config.get_session() as session:
+        yield session
+    cache.max_entries = max_entries
+
+
+@given("the database is initialized", target_fixture="versions")
+def initialize_database(session):
+    return get_data_version(THEMES, STATS)
+
+
+@given(parsers.parse("all themes are retrieved {counter:d} times"))
+@when(
+    parsers.parse("all themes are retrieved {counter:d} times"),
+    target_fixture="all_themes",
+)
+def retrieve_all_themes(counter):
+    for _ in range(counter):
+        themes = get_all_themes()
+    return themes
+
+
+@when('a new theme is created with name "Science"')
+def create_new_theme():
+    create_theme("Science")
+
+
+@given(
+    parsers.parse('a card exists with question "{question}" and theme ID {id_theme:d}'),
+    target_fixture="card",
+)
+def ensure_card_exists(question, id_theme):
+    return create_card(question, "reponse", 0.5, id_theme)
+
+
+@given(
+    parsers.parse("the cards of theme ID {id_theme:d} are retrieved"),
+    target_fixture="retrieved_cards",
+)
+@when(
+    parsers.parse("the cards of theme ID {id_theme:d} are retrieved"),
+    target_fixture="retrieved_cards",
+)
+def retrieve_theme_cards(id_theme):
+    return get_cards_by_theme(id_theme)
+
+
+@when(parsers.parse('the card\'s question is updated to "{question}"'))
+def update_card_question(card, question):
+    update_card(card.id, question, card.reponse, card.probabilite, card.id_theme)
+
+
+@when("a correct answer is recorded for the card")
+def record_correct_answer(card):
+    record_answer(card.id, True)
+
+
+@given(parsers.parse("the cache is limited to {max_entries:d} entries"))
+def limit_cache(max_entries):
+    cache.max_entries = max_entries
+
+
+@when("the themes with ID 1, 2 and 3 are retrieved")
+def retrieve_themes():
+    for id_theme in (1, 2, 3):
+        get_theme(id_theme)
+
+
+@then(parsers.parse("the cache should have {hits:d} hits and {misses:d} misses"))
+def check_cache_counters(hits, misses):
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (hits, misses)
+
+
+@then(parsers.parse("{nr_themes:d} themes should be returned"))
+def check_all_themes_retrieved(all_themes, nr_themes):
+    assert len(all_themes) == nr_themes
+
+
+@then(parsers.parse('the first retrieved card should have the question "{question}"'))
+def check_retrieved_card(retrieved_cards, question):
+    assert retrieved_cards[0].question == question
+
+
+@then("the stats version should have changed")
+def check_stats_version(versions):
+    assert get_data_version(STATS) != versions[1:]
+
+
+@then("the themes version should not have changed")
+def check_themes_version(versions):
+    assert get_data_version(THEMES) == versions[:1]
+
+
+@then(parsers.parse("the cache should hold {entries:d} entries"))
+def check_cache_entries(entries):
+    assert cache.stats()["entries"] == entries
@@ -0,0 +1,153 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.sampler import FenwickTree
+from src.db.services import (
+    create_card,
+    delete_card,
+    draw_card,
+    sample_card,
+    update_card,
+)
+from src.db.tables import init_db
+
+scenarios("features/card_sampler.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@pytest.fixture
+def cards():
+    return {}
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given("SQLite has no math functions")
+def no_math_functions(monkeypatch):
+    monkeypatch.setattr(config, "has_math_functions", lambda: False)
+
+
+@given(
+    parsers.parse(
+        "{counter:d} cards exist with theme ID {id_theme:d} and probability {probability:f}"
+    )
+)
+def ensure_cards_exist(counter, id_theme, probability):
+    for i in range(counter):
+        create_card(f"question {i}", f"reponse {i}", probability, id_theme)
+
+
+@given(
+    parsers.parse(
+        'a card exists with question "{question}" and probability {probability:f} and theme ID {id_theme:d}'
+    )
+)
+@when(
+    parsers.parse(
+        'a card exists with question "{question}" and probability {probability:f} and theme ID {id_theme:d}'
+    )
+)
+def ensure_card_exists(cards, question, probability, id_theme):
+    cards[question] = create_card(question, "reponse", probability, id_theme)
+
+
+@given(
+    parsers.parse("{counter:d} cards are drawn from theme ID {id_theme:d}"),
+    target_fixture="drawn_cards",
+)
+@when(
+    parsers.parse("{counter:d} cards are drawn from theme ID {id_theme:d}"),
+    target_fixture="drawn_cards",
+)
+def draw_cards(counter, id_theme):
+    rng = random.Random(42)
+    return [sample_card([id_theme], rng=rng) for _ in range(counter)]
+
+
+@when(
+    parsers.parse(
+        "{counter:d} cards are drawn in SQL from themes ID {first:d} and {second:d}"
+    ),
+    target_fixture="drawn_cards",
+)
+def draw_cards_in_sql(counter, first, second):
+    return [draw_card([first, second]) for _ in range(counter)]
+
+
+@when(parsers.parse('the card "{question}" is updated to probability {probability:f}'))
+def update_card_probability(cards, question, probability):
+    card = cards[question]
+    update_card(card.id, card.question, card.reponse, probability, card.id_theme)
+
+
+@when(parsers.parse('the card "{question}" is deleted'))
+def delete_card_by_question(cards, question):
+    delete_card(cards[question].id)
+
+
+@then(parsers.parse("all drawn cards should belong to theme ID {id_theme:d}"))
+def check_drawn_cards_theme(drawn_cards, id_theme):
+    assert all(card.id_theme == id_theme for card in drawn_cards)
+
+
+@then(
+    parsers.parse("all drawn cards should belong to themes ID {first:d} and {second:d}")
+)
+def check_drawn_cards_themes(drawn_cards, first, second):
+    assert {card.id_theme for card in drawn_cards} <= {first, second}
+
+
+@then("no card should be drawn")
+def check_no_card_drawn(drawn_cards):
+    assert drawn_cards == [None]
+
+
+@then(
+    parsers.parse(
+        'the card "{frequent}" should be drawn about {factor:d} times more often than "{rare}"'
+    )
+)
+def check_draw_ratio(drawn_cards, frequent, rare, factor):
+    # The SQL draws cannot be seeded: allow 5 standard deviations of the
+    # binomial count of the rare card
+    counter = Counter(card.question for card in drawn_cards)
+    n, p = counter[frequent] + counter[rare], 1 / (factor + 1)
+    assert abs(counter[rare] - n * p) < 5 * math.sqrt(n * p * (1 - p))
+
+
+@then(parsers.parse('only the card "{question}" should be drawn'))
+def check_only_card_drawn(drawn_cards, question):
+    assert {card.question for card in drawn_cards} == {question}
+
+
+def test_fenwick_tree_find_and_append():
+    tree = FenwickTree([1.0, 0.0, 2.0])
+    assert tree.total() == 3.0
+    assert tree.find(0.5) == 0
+    assert tree.find(1.5) == 2
+    for weight in [4.0, 0.5]:
+        tree.append(weight)
+    assert tree.total() == 7.5
+    assert tree.find(3.0) == 3
+    assert tree.find(7.4) == 4
+    tree.set(2, 0.0)
+    assert tree.find(1.0) == 3
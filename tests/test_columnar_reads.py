@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.services import (
+    create_card,
+    get_card_columns,
+    get_stats_columns,
+    list_card_columns,
+)
+from src.db.tables import Stat, add_row, init_db
+
+scenarios("features/columnar_reads.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(
+    parsers.parse(
+        '{counter:d} cards exist with theme ID {id_theme:d} and questions "{questions}"'
+    )
+)
+def ensure_cards_exist(counter, id_theme, questions):
+    questions = questions.split(",")
+    assert len(questions) == counter
+    for question in questions:
+        create_card(question, "reponse", 0.5, id_theme)
+
+
+@given(parsers.parse("stats exist for the last {days:d} days"))
+def ensure_stats_exist(days):
+    today = datetime.today().date()
+    for day in range(days):
+        add_row(
+            table=Stat,
+            date=today - timedelta(days=day),
+            bonnes_reponses=day,
+            mauvaises_reponses=1,
+        )
+
+
+@when(
+    parsers.parse('the card columns of theme IDs "{theme_ids}" are read'),
+    target_fixture="columns",
+)
+def read_card_columns(theme_ids):
+    return get_card_columns([int(i) for i in theme_ids.split(",")])
+
+
+@when(
+    parsers.parse('the card columns of theme IDs "{theme_ids}" are read as arrays'),
+    target_fixture="columns",
+)
+def read_card_arrays(theme_ids):
+    pytest.importorskip("numpy")
+    return get_card_columns([int(i) for i in theme_ids.split(",")], arrays=True)
+
+
+@when(
+    parsers.parse(
+        "the card columns of theme ID {id_theme:d} are listed by pages of {limit:d} ordered by {order_by}"
+    ),
+    target_fixture="pages",
+)
+def list_columns_by_pages(id_theme, limit, order_by):
+    pages = []
+    after_id = None
+    while (columns := list_card_columns(id_theme, after_id, limit, order_by))["id"]:
+        pages.append(columns["question"])
+        after_id = columns["id"][-1]
+    return pages
+
+
+@when(
+    parsers.parse(
+        "the stats columns of the last {days:d} days are read at the current time"
+    ),
+    target_fixture="columns",
+)
+def read_stats_columns(days):
+    # Bounds with a time part must still include the first and last days
+    now = datetime.now()
+    return get_stats_columns(now - timedelta(days=days), now)
+
+
+@then(parsers.parse('the "{name}" column should be "{expected}"'))
+def check_column(columns, name, expected):
+    assert ",".join(columns[name]) == expected
+
+
+@then("every column should be empty")
+def check_empty(columns):
+    assert "question" in columns
+    assert all(values == [] for values in columns.values())
+
+
+@then(parsers.parse('the "{name}" column should hold {days:d} days in order'))
+def check_days(columns, name, days):
+    assert len(columns[name]) == days
+    assert columns[name] == sorted(columns[name])
+
+
+@then(parsers.parse('the "{name}" column should be a NumPy array'))
+def check_array(columns, name):
+    import numpy
+
+    assert isinstance(columns[name], numpy.ndarray)
+
+
+@then(parsers.parse('the pages should be "{expected}"'))
+def check_pages(pages, expected):
+    assert "|".join(",".join(page) for page in pages) == expected
@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config, contention
+from src.db.config import setup_config
+from src.db.contention import RetryPolicy
+from src.db.services import create_card, get_stats_summary, record_answer
+from src.db.tables import init_db
+
+scenarios("features/contention.feature")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # Each thread would have its own in-memory database: use a file
+    monkeypatch.setattr(config, "engine_initialized", False)
+    monkeypatch.setattr(config, "DATABASE_PATH", config.DATABASE_PATH)
+    path = str(tmp_path / "flashcards.db")
+    setup_config(path, pragmas={"busy_timeout": 0})
+    init_db()
+    contention.stats.reset()
+    yield path
+    contention.writer.disable()
+    config.engine.dispose()
+
+
+@given("a database file without busy timeout")
+def database_file(database):
+    pass  # Nothing to do here
+
+
+@given(parsers.parse("a retry policy of {attempts:d} attempts"))
+def retry_policy(monkeypatch, attempts):
+    monkeypatch.setattr(contention, "policy", RetryPolicy(attempts, base_delay=0.05))
+
+
+@given(
+    parsers.parse("another connection locks the database for {seconds:f} seconds"),
+    target_fixture="lock",
+)
+def lock_database_for(database, seconds):
+    lock = lock_database(database)
+    timer = threading.Timer(seconds, lock.execute, ["COMMIT"])
+    timer.start()
+    yield lock
+    timer.join()
+    lock.close()
+
+
+@given("another connection locks the database", target_fixture="lock")
+def lock_database_until_the_end(database):
+    lock = lock_database(database)
+    yield lock
+    lock.execute("COMMIT")
+    lock.close()
+
+
+def lock_database(path):
+    lock = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    lock.execute("BEGIN IMMEDIATE")
+    return lock
+
+
+@given("the single writer is enabled")
+def enable_single_writer():
+    contention.writer.enable()
+
+
+@given(parsers.parse("{counter:d} cards exist"), target_fixture="card_ids")
+def ensure_cards_exist(counter):
+    return [create_card(f"question {i}", "reponse", 0.5, 1).id for i in range(counter)]
+
+
+@when("a card is created", target_fixture="card")
+def create_a_card():
+    return create_card("question", "reponse", 0.5, 1)
+
+
+@when(parsers.parse("{threads:d} threads record {counter:d} answers each"))
+def record_concurrently(card_ids, threads, counter):
+    def record(offset):
+        for i in range(counter):
+            record_answer(card_ids[(offset + i) % len(card_ids)], i % 2 == 0)
+
+    workers = [threading.Thread(target=record, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+@then("the card should be created")
+def check_card_created(card):
+    assert card is not None
+
+
+@then("the card should not be created")
+def check_card_not_created(card):
+    assert card is None
+
+
+@then(parsers.parse("at least {counter:d} retry should be counted"))
+def check_some_retries(counter):
+    assert contention.stats.stats()["retries"] >= counter
+
+
+@then(parsers.parse("{retries:d} retries and {failures:d} failure should be counted"))
+def check_retries_and_failures(retries, failures):
+    counters = contention.stats.stats()
+    assert (counters["retries"], counters["failures"]) == (retries, failures)
+
+
+@then(parsers.parse("{counter:d} answers should be counted in the stats"))
+def check_answers(counter):
+    summary = get_stats_summary()
+    assert summary["bonnes_reponses"] + summary["mauvaises_reponses"] == counter
+
+
+@then(parsers.parse("{counter:d} writes should be counted by the single writer"))
+def check_writes(counter):
+    assert contention.stats.stats()["writes"] == counter
+
+
+@then("no failure should be counted")
+def check_no_failure():
+    assert contention.stats.stats()["failures"] == 0
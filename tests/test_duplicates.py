@@ -0,0 +1,125 @@
+import io
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import func, select
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.formats import CSV
+from src.db.importer import import_cards
+from src.db.services import (
+    create_card,
+    find_duplicates,
+    find_similar_cards,
+    update_card,
+)
+from src.db.tables import Card, CardBucket, init_db
+
+scenarios("features/duplicates.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(parsers.parse('a card "{question}" exists in theme ID {id_theme:d}'))
+def ensure_card_exists(question, id_theme):
+    create_card(question, "reponse", 0.5, id_theme)
+
+
+@given(
+    parsers.parse(
+        'cards with the questions "{questions}" exist in theme ID {id_theme:d}'
+    )
+)
+def ensure_cards_exist(questions, id_theme):
+    for question in questions.split(","):
+        create_card(question, "reponse", 0.5, id_theme)
+
+
+@given(
+    parsers.parse(
+        'the question of the card with ID {card_id:d} is changed to "{question}"'
+    )
+)
+def change_question(card_id, question):
+    update_card(card_id, question, "reponse", 0.5, 3)
+
+
+@when(
+    parsers.parse("the duplicates of theme ID {id_theme:d} are searched"),
+    target_fixture="groups",
+)
+def search_duplicates(id_theme):
+    return find_duplicates(id_theme)
+
+
+@when(
+    parsers.parse(
+        'near-duplicates are searched for "{first}" in theme ID {first_theme:d} '
+        'and "{second}" in theme ID {second_theme:d}'
+    ),
+    target_fixture="similar",
+)
+def search_similar(first, first_theme, second, second_theme):
+    return find_similar_cards([(first, first_theme), (second, second_theme)])
+
+
+@when(
+    "the following CSV deck is imported skipping duplicates",
+    target_fixture="report",
+)
+def import_deck(docstring):
+    return import_cards(io.StringIO(docstring), CSV, skip_duplicates=True)
+
+
+@then(parsers.parse('the duplicate groups should be "{expected}"'))
+def check_groups(groups, expected):
+    assert "|".join(",".join(str(c.id) for c in group) for group in groups) == expected
+
+
+@then("no duplicate should be found")
+def check_no_group(groups):
+    assert groups == []
+
+
+@then(parsers.parse('the similar cards should be "{expected}"'))
+def check_similar(similar, expected):
+    assert ",".join(str(id) for id in similar) == expected
+
+
+@then(parsers.parse("{inserted:d} cards should be imported and {rejected:d} rejected"))
+def check_report(session, report, inserted, rejected):
+    assert report.inserted == inserted
+    assert report.rejected == rejected
+    assert session.query(Card).count() == 3 + inserted
+
+
+@then(parsers.parse("line {line_num:d} should be rejected as a duplicate of {origin}"))
+def check_rejection(report, line_num, origin):
+    assert (line_num, f"duplicate of {origin}") in report.rejections
+
+
+@then(parsers.parse("no bucket should be shared by two cards of theme ID {id_theme:d}"))
+def check_no_shared_bucket(session, id_theme):
+    shared = session.scalars(
+        select(CardBucket.bucket)
+        .join(Card, Card.id == CardBucket.card_id)
+        .where(Card.id_theme == id_theme)
+        .group_by(CardBucket.bucket)
+        .having(func.count() > 1)
+    ).all()
+    assert shared == []
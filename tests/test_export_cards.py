@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.formats import BINARY, READERS
+from src.db.importer import import_cards
+from src.db.services import create_card, export_cards, get_number_of_cards
+from src.db.tables import init_db
+
+scenarios("features/export_cards.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(parsers.parse("{counter:d} cards exist with theme ID {id_theme:d}"))
+def ensure_cards_exist(counter, id_theme):
+    for i in range(counter):
+        create_card(f"Question {i}, «{id_theme}»", f"Réponse\n{i}", 0.5, id_theme)
+
+
+@when(
+    parsers.parse(
+        "the cards of themes ID {id_theme:d} are exported as {format} by chunks of {chunk_size:d} cards"
+    ),
+    target_fixture="exported",
+)
+def export_theme_cards(id_theme, format, chunk_size):
+    chunks = list(export_cards([id_theme], format, chunk_size=chunk_size))
+    return format, b"".join(chunks)
+
+
+@when(
+    parsers.parse(
+        "all cards are exported as {format} by chunks of {chunk_size:d} cards"
+    ),
+    target_fixture="exported",
+)
+def export_all_cards(format, chunk_size):
+    return format, b"".join(export_cards(None, format, chunk_size=chunk_size))
+
+
+def _open(format, data):
+    if format == BINARY:
+        return io.BytesIO(data)
+    return io.StringIO(data.decode("utf-8"), newline="")
+
+
+def _read(exported):
+    format, data = exported
+    return [record for _, record in READERS[format](_open(format, data))]
+
+
+@then(
+    parsers.parse('the export should contain {counter:d} cards of the theme "{theme}"')
+)
+def check_exported_theme(exported, counter, theme):
+    records = _read(exported)
+    assert len(records) == counter
+    assert {record["theme"] for record in records} == {theme}
+    assert records[0]["reponse"] == "Réponse\n0"
+
+
+@then(parsers.parse("the export should contain {counter:d} cards"))
+def check_exported(exported, counter):
+    assert len(_read(exported)) == counter
+
+
+@then(parsers.parse("importing the export should create {counter:d} cards"))
+def check_import_export(exported, counter):
+    format, data = exported
+    before = get_number_of_cards()
+    report = import_cards(_open(format, data), format)
+    assert report.inserted == counter
+    assert get_number_of_cards() == before + counter
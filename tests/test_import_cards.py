@@ -0,0 +1,71 @@
+import io
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.formats import CSV, JSONL
+from src.db.importer import import_cards
+from src.db.tables import Card, Theme, init_db
+
+scenarios("features/import_cards.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@when(
+    parsers.parse(
+        "the following CSV deck is imported by batches of {batch_size:d} cards"
+    ),
+    target_fixture="report",
+)
+def import_csv_deck(docstring, batch_size):
+    return import_cards(io.StringIO(docstring), CSV, batch_size=batch_size)
+
+
+@when(
+    parsers.parse(
+        "the following JSON Lines deck is imported by batches of {batch_size:d} cards"
+    ),
+    target_fixture="report",
+)
+def import_jsonl_deck(docstring, batch_size):
+    return import_cards(io.StringIO(docstring), JSONL, batch_size=batch_size)
+
+
+@then(parsers.parse("{inserted:d} cards should be imported and {rejected:d} rejected"))
+def check_report(session, report, inserted, rejected):
+    assert report.inserted == inserted
+    assert report.rejected == rejected
+    assert session.query(Card).count() == inserted
+
+
+@then(parsers.parse("line {line_num:d} should be rejected"))
+def check_rejected_line(report, line_num):
+    assert line_num in [line for line, _ in report.rejections]
+
+
+@then(parsers.parse('the theme "{name}" should exist'))
+def check_theme_exists(session, name):
+    assert session.query(Theme).filter_by(theme=name).count() == 1
+
+
+@then(parsers.parse('the theme "{name}" should have {counter:d} cards'))
+def check_theme_cards(session, name, counter):
+    theme = session.query(Theme).filter_by(theme=name).one()
+    assert session.query(Card).filter_by(id_theme=theme.id).count() == counter
@@ -1,8 +1,12 @@
+import logging
+
 import pytest
-from pytest_bdd import given, scenarios, then, when
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import inspect, text
 
 from src.db import config
 from src.db.config import setup_config
+from src.db.instrumentation import instrumentation
 from src.db.tables import Theme, init_db
 
 # Load the feature file
@@ -107,3 +111,88 @@ def no_error_should_be_raised():
 def no_new_themes_should_be_inserted(session):
     theme_count = session.query(Theme).count()
     assert theme_count == 3  # The number of themes should not increase
+
+
+@when("a new connection is opened", target_fixture="connection")
+def open_new_connection():
+    # Check the DBAPI connection itself, not the ORM session
+    return config.engine.raw_connection().driver_connection
+
+
+@then("foreign keys should be enforced on the connection")
+def foreign_keys_enforced(connection):
+    assert connection.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+@then(parsers.parse("the busy timeout of the connection should be {timeout:d}"))
+def busy_timeout_set(connection, timeout):
+    assert connection.execute("PRAGMA busy_timeout").fetchone()[0] == timeout
+
+
+@when("two sessions are opened", target_fixture="opened_sessions")
+def open_two_sessions():
+    with config.get_session() as first, config.get_session() as second:
+        return first, second
+
+
+@then("both sessions should come from the same factory")
+def same_session_factory(opened_sessions):
+    first, second = opened_sessions
+    assert first is not second
+    assert first.bind is second.bind is config.engine
+    assert isinstance(first, config.SessionFactory.class_)
+
+
+@then("no error should be logged")
+def no_error_logged(caplog):
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+@when(
+    "the init_db function is called again in a recorded scope", target_fixture="scope"
+)
+def init_db_called_in_scope():
+    instrumentation.enable()
+    try:
+        with instrumentation.scope("init_db") as scope:
+            init_db()
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    return scope
+
+
+@then(parsers.parse("at most {counter:d} statements should be executed"))
+def at_most_statements(scope, counter):
+    assert scope.total_statements <= counter
+
+
+@then("no DDL statement should be executed")
+def no_ddl_statement(scope):
+    statements = [statement for _, statement in scope.statements]
+    assert not [
+        s for s in statements if s.lstrip().upper().startswith(("CREATE", "ALTER"))
+    ]
+
+
+@given(parsers.parse('the table "{table}" was dropped'))
+def drop_table(session, table):
+    with config.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {table}"))
+
+
+@then(parsers.parse('the table "{table}" should exist'))
+def table_exists(session, table):
+    assert inspect(config.engine).has_table(table)
+
+
+@given(parsers.parse('the predefined themes were deleted but the theme "{theme}"'))
+def keep_own_theme(session, theme):
+    session.query(Theme).delete()
+    session.add(Theme(theme=theme))
+    session.commit()
+
+
+@then(parsers.parse('the only theme should be "{theme}"'))
+def only_theme(session, theme):
+    assert [t.theme for t in session.query(Theme).all()] == [theme]
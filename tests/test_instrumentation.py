@@ -0,0 +1,151 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config, contention, services
+from src.db.config import setup_config
+from src.db.instrumentation import instrumentation
+from src.db.tables import init_db
+
+scenarios("features/instrumentation.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given("a database file")
+def database_file(tmp_path, monkeypatch):
+    # The writer thread would have its own in-memory database: use a file
+    monkeypatch.setattr(config, "engine_initialized", False)
+    monkeypatch.setattr(config, "DATABASE_PATH", config.DATABASE_PATH)
+    setup_config(str(tmp_path / "flashcards.db"))
+    init_db()
+    yield
+    contention.writer.disable()
+    instrumentation.disable()
+    instrumentation.reset()
+    config.engine.dispose()
+
+
+@given("the single writer is enabled")
+def enable_single_writer():
+    contention.writer.enable()
+
+
+@given("the SQL instrumentation is enabled")
+def enable_instrumentation():
+    instrumentation.enable()
+
+
+def _create_cards(counter):
+    services.create_cards(
+        {
+            "question": f"Question {i}",
+            "reponse": f"Réponse {i}",
+            "probabilite": 0.5,
+            "id_theme": 1,
+        }
+        for i in range(counter)
+    )
+
+
+@when(
+    parsers.parse("{counter:d} cards are created in a recorded scope"),
+    target_fixture="scope",
+)
+def create_cards(counter):
+    with instrumentation.scope("test") as scope:
+        _create_cards(counter)
+    return scope
+
+
+@when(
+    parsers.parse(
+        "{counter:d} cards are created then read all at once in a recorded scope"
+    ),
+    target_fixture="scope",
+)
+def create_and_read_cards(counter):
+    with instrumentation.scope("test") as scope:
+        _create_cards(counter)
+        services.get_all_cards()
+    return scope
+
+
+@when(
+    parsers.parse(
+        "{counter:d} cards are created then read one by one in a recorded scope"
+    ),
+    target_fixture="scope",
+)
+def create_and_read_each_card(counter):
+    with instrumentation.scope("test") as scope:
+        _create_cards(counter)
+        for card_id in range(1, counter + 1):
+            services.get_card(card_id)
+    return scope
+
+
+@when(parsers.parse('the theme "{theme}" is created'))
+def create_theme(theme):
+    services.create_theme(theme)
+
+
+@then(parsers.parse('the totals should record {calls:d} call of "{service}"'))
+def check_total_calls(calls, service):
+    # The writer thread does not see the scopes of the caller, only the totals
+    assert instrumentation.totals.services[service].calls == calls
+
+
+@then(parsers.parse('the scope should record {calls:d} call of "{service}"'))
+def check_calls(scope, calls, service):
+    stats = scope.services[service]
+    assert stats.calls == calls
+    assert stats.statements >= 1
+
+
+@then(
+    parsers.parse(
+        'the scope should record {calls:d} call of "{service}" returning {rows:d} rows'
+    )
+)
+def check_rows(scope, calls, service, rows):
+    stats = scope.services[service]
+    assert stats.calls == calls
+    assert stats.rows == rows
+
+
+@then("no repeated statement should be reported")
+def check_no_repeat(scope):
+    assert scope.repeated(threshold=2) == []
+
+
+@then(
+    parsers.parse(
+        'a repeated statement of "{service}" should be reported {executions:d} times'
+    )
+)
+def check_repeat(scope, service, executions):
+    repeated = scope.repeated(threshold=executions)
+    assert [(name, count) for name, _, count in repeated] == [(service, executions)]
+    assert service in scope.summary(threshold=executions)
+
+
+@then("the scope should record no statement")
+def check_nothing(scope):
+    assert scope.total_statements == 0
+    assert scope.services == {}
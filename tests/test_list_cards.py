@@ -0,0 +1,81 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.services import create_card, list_cards
+from src.db.tables import init_db
+
+scenarios("features/list_cards.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(
+    parsers.parse(
+        '{counter:d} cards exist with theme ID {id_theme:d} and questions "{questions}"'
+    )
+)
+def ensure_cards_exist(counter, id_theme, questions):
+    questions = questions.split(",")
+    assert len(questions) == counter
+    for question in questions:
+        create_card(question, "reponse", 0.5, id_theme)
+
+
+@when(
+    parsers.parse(
+        "the cards of theme ID {id_theme:d} are listed by pages of {limit:d} ordered by {order_by}"
+    ),
+    target_fixture="pages",
+)
+def list_cards_by_pages(id_theme, limit, order_by):
+    pages = []
+    after_id = None
+    while cards := list_cards(id_theme, after_id, limit, order_by):
+        pages.append(cards)
+        after_id = cards[-1].id
+    return pages
+
+
+@when(
+    parsers.parse(
+        "the cards of theme ID {id_theme:d} are listed ordered by {order_by}"
+    ),
+    target_fixture="excinfo",
+)
+def list_cards_with_order(id_theme, order_by):
+    with pytest.raises(ValueError) as excinfo:
+        list_cards(id_theme, order_by=order_by)
+    return excinfo
+
+
+@then(parsers.parse('the pages should be "{expected}"'))
+def check_pages(pages, expected):
+    questions = "|".join(",".join(card.question for card in page) for page in pages)
+    assert questions == expected
+
+
+@then("every card should be listed once")
+def check_listed_once(pages):
+    ids = [card.id for page in pages for card in page]
+    assert len(ids) == len(set(ids))
+
+
+@then("a ValueError should be raised")
+def check_value_error(excinfo):
+    assert "Cannot order cards by" in str(excinfo.value)
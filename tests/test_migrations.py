@@ -0,0 +1,234 @@
+from datetime import datetime
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import event, inspect, text
+
+from src.db import config, migrations, services
+from src.db.config import setup_config
+from src.db.tables import Stat, init_db
+
+scenarios("features/migrations.feature")
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE themes (id INTEGER PRIMARY KEY, theme VARCHAR UNIQUE)",
+    """CREATE TABLE cards (
+        id INTEGER PRIMARY KEY, question VARCHAR, reponse VARCHAR,
+        probabilite FLOAT, id_theme INTEGER REFERENCES themes (id) ON DELETE CASCADE,
+        CONSTRAINT probabilite_range CHECK (probabilite >= 0.1 AND probabilite <= 1)
+    )""",
+    """CREATE TABLE stats (
+        id INTEGER PRIMARY KEY, bonnes_reponses INTEGER,
+        mauvaises_reponses INTEGER, date DATE
+    )""",
+    "INSERT INTO stats VALUES (1, 1, 2, '2024-01-01'), (2, 3, 4, '2024-01-01')",
+    "INSERT INTO stats VALUES (3, 5, 6, '2024-01-02')",
+    "INSERT INTO themes VALUES (1, 'Legacy')",
+    """INSERT INTO cards VALUES
+        (1, 'Que fait git rebase ?', 'r', 0.5, 1),
+        (2, 'Que fait  GIT rebase?', 'r', 0.5, 1),
+        (3, 'Que fait git commit ?', 'r', 0.5, 1)""",
+]
+
+VERSION_4_REVIEWS = [
+    """CREATE TABLE reviews (
+        id INTEGER PRIMARY KEY, card_id INTEGER NOT NULL, theme_id INTEGER,
+        reviewed_at DATETIME NOT NULL, correct BOOLEAN NOT NULL, latency_ms INTEGER
+    )""",
+    "INSERT INTO reviews VALUES (1, 1, 1, '2024-01-01 10:00:00', 1, NULL)",
+    "PRAGMA user_version = 4",
+]
+
+
+def user_id():
+    return services.get_or_create_user("alice").id
+
+
+SERVICE_CALLS = {
+    "get_cards_by_theme": lambda: services.get_cards_by_theme(1),
+    "list_cards": lambda: services.list_cards(1, after_id=1, order_by="question"),
+    "draw_card": lambda: services.draw_card([1, 2]),
+    "record_answer": lambda: services.record_answer(1, True),
+    "get_stats": lambda: services.get_stats(datetime(2024, 1, 1), datetime.today()),
+    "next_due_cards": lambda: services.next_due_cards([1, 2], 5),
+    "next_due_cards_for_user": lambda: services.next_due_cards(
+        [1, 2], 5, user_id=user_id()
+    ),
+    "draw_card_for_user": lambda: services.draw_card([1, 2], user_id=user_id()),
+    "get_stats_summary_for_user": lambda: services.get_stats_summary(
+        datetime(2024, 1, 1), datetime.today(), user_id=user_id()
+    ),
+}
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+    with config.get_session() as session:
+        yield session
+
+
+@given("a new database")
+def new_database(session):
+    init_db()
+
+
+@given("a new database file")
+def new_database_file(tmp_path, monkeypatch):
+    # The in-memory database does not let SQLAlchemy control the transactions
+    monkeypatch.setattr(config, "engine_initialized", False)
+    monkeypatch.setattr(config, "DATABASE_PATH", config.DATABASE_PATH)
+    setup_config(str(tmp_path / "flashcards.db"))
+    yield
+    config.engine.dispose()
+
+
+def _fail(conn):
+    conn.execute(text("CREATE TABLE partial (id INTEGER PRIMARY KEY)"))
+    raise RuntimeError("Migration failed")
+
+
+@given("a migration failing after creating a table")
+def failing_migration(monkeypatch):
+    failing = migrations.Migration(migrations.LATEST_VERSION + 1, "Fail halfway", _fail)
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [failing])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", failing.version)
+
+
+@given("a legacy database with duplicated daily stats")
+def legacy_database(session):
+    with config.engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+
+@given("a database at schema version 4 with reviews")
+def version_4_database(session):
+    with config.engine.begin() as conn:
+        for statement in LEGACY_SCHEMA + VERSION_4_REVIEWS:
+            conn.execute(text(statement))
+
+
+@when("the init_db function is called", target_fixture="applied")
+def init_db_called():
+    with config.engine.begin() as conn:
+        before = migrations.get_schema_version(conn)
+    init_db()
+    with config.engine.begin() as conn:
+        after = migrations.get_schema_version(conn)
+    return list(range(before + 1, after + 1))
+
+
+@given(parsers.parse("a card exists with theme ID {id_theme:d}"))
+def ensure_card_exists(id_theme):
+    services.create_card("question", "reponse", 0.5, id_theme)
+
+
+@when(parsers.parse("the service {service} is called"), target_fixture="statements")
+def call_service(service):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(config.engine, "before_cursor_execute", capture)
+    try:
+        SERVICE_CALLS[service]()
+    finally:
+        event.remove(config.engine, "before_cursor_execute", capture)
+    return statements
+
+
+@then("the schema version should be the latest")
+def check_latest_version():
+    with config.engine.begin() as conn:
+        assert migrations.get_schema_version(conn) == migrations.LATEST_VERSION
+
+
+@then(parsers.parse('the index "{name}" should exist'))
+def check_index_exists(name):
+    indexes = [
+        index["name"]
+        for table in ("cards", "stats", "user_card_states")
+        for index in inspect(config.engine).get_indexes(table)
+    ]
+    assert name in indexes
+
+
+@then(parsers.parse('the table "{table}" should have the column "{name}"'))
+def check_column_exists(table, name):
+    columns = [column["name"] for column in inspect(config.engine).get_columns(table)]
+    assert name in columns
+
+
+@then(parsers.parse('the table "{table}" should exist'))
+def check_table_exists(table):
+    assert inspect(config.engine).has_table(table)
+
+
+@then(parsers.parse('the table "{table}" should not exist'))
+def check_table_does_not_exist(table):
+    assert not inspect(config.engine).has_table(table)
+    assert not inspect(config.engine).has_table("partial")
+
+
+@then("every legacy card should be due")
+def check_legacy_cards_due():
+    cards = services.next_due_cards([1], 10)
+    assert [card.id for card in cards] == [1, 2, 3]
+    assert all(card.ease == 2.5 and card.repetitions == 0 for card in cards)
+
+
+@then("the duplicated daily stats should be merged")
+def check_merged_stats(session):
+    stats = session.query(Stat).order_by(Stat.date).all()
+    assert [(s.bonnes_reponses, s.mauvaises_reponses) for s in stats] == [
+        (4, 6),
+        (5, 6),
+    ]
+
+
+@then("no migration should be applied")
+def check_no_migration(applied):
+    assert applied == []
+
+
+def query_plans(statements):
+    plans = []
+    with config.engine.connect() as conn:
+        for statement, parameters in statements:
+            if (
+                not statement.lstrip()
+                .upper()
+                .startswith(("SELECT", "UPDATE", "INSERT"))
+            ):
+                continue
+            rows = conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            ).all()
+            plans.extend(row[-1] for row in rows)
+    return plans
+
+
+@then(parsers.parse('its queries should not scan the table "{table}"'))
+def check_query_plans(statements, table):
+    plans = query_plans(statements)
+    assert any(table in plan for plan in plans)
+    assert not [plan for plan in plans if plan.startswith(f"SCAN {table}")], plans
+
+
+@then(parsers.parse('its queries should use the index "{index}"'))
+def check_index_used(statements, index):
+    plans = query_plans(statements)
+    # The index may be a covering one
+    assert any(f"INDEX {index} " in plan for plan in plans), plans
+
+
+@then(parsers.parse('the legacy cards should be grouped as duplicates "{expected}"'))
+def check_legacy_duplicates(expected):
+    groups = services.find_duplicates(1)
+    assert ",".join(str(card.id) for card in groups[0]) == expected
+    assert len(groups) == 1
@@ -0,0 +1,227 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.instrumentation import instrumentation
+from src.db.prefetch import CardPrefetcher
+from src.db.services import (
+    create_cards,
+    delete_card,
+    get_cards_by_theme,
+    record_answer,
+    update_card,
+)
+from src.db.tables import init_db
+
+scenarios("features/prefetch.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # Each thread would have its own in-memory database: use a file
+    monkeypatch.setattr(config, "engine_initialized", False)
+    monkeypatch.setattr(config, "DATABASE_PATH", config.DATABASE_PATH)
+    setup_config(str(tmp_path / "flashcards.db"))
+    init_db()
+    yield
+    config.engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def instrumented():
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@pytest.fixture
+def shown():
+    return []
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given("a database file")
+def database_file(database):
+    pass  # Nothing to do here
+
+
+@given(parsers.parse("{counter:d} cards exist in theme ID {id_theme:d}"))
+def ensure_cards_exist(counter, id_theme):
+    create_cards(
+        [
+            dict(
+                question=f"question {i}",
+                reponse="reponse",
+                probabilite=0.5,
+                id_theme=id_theme,
+            )
+            for i in range(counter)
+        ]
+    )
+
+
+@given(parsers.parse("the card with ID {card_id:d} was answered correctly"))
+def answer_card(card_id):
+    record_answer(card_id, True)
+
+
+@given(parsers.parse("every card of theme ID {id_theme:d} was answered correctly"))
+def answer_every_card(id_theme):
+    # None of them is due anymore, the cards are drawn
+    for card in get_cards_by_theme(id_theme):
+        record_answer(card.id, True)
+
+
+@given(
+    parsers.parse("a prefetcher of {size:d} cards for theme ID {id_theme:d}"),
+    target_fixture="prefetch",
+)
+def prefetcher(size, id_theme):
+    prefetch = CardPrefetcher(size=size, low_water=2, background=False)
+    prefetch.select([id_theme])
+    return prefetch
+
+
+@given(
+    parsers.parse(
+        "a background prefetcher of {size:d} cards for theme ID {id_theme:d}"
+    ),
+    target_fixture="prefetch",
+)
+def background_prefetcher(size, id_theme):
+    prefetch = CardPrefetcher(size=size, low_water=2, background=True)
+    prefetch.select([id_theme])
+    yield prefetch
+    prefetch.wait()
+
+
+@when("the current card is shown")
+def show_current_card(prefetch, shown):
+    shown.append(prefetch.current())
+
+
+@when(parsers.parse("the page is rerun {counter:d} times"), target_fixture="scope")
+def rerun(prefetch, shown, counter):
+    with instrumentation.scope("reruns") as scope:
+        for _ in range(counter):
+            shown.append(prefetch.current())
+    return scope
+
+
+@when(
+    "the cards are answered until the buffer drops below the low-water mark",
+    target_fixture="scope",
+)
+def answer_until_low_water(prefetch):
+    # Answering the last buffered cards triggers the refill
+    while prefetch.buffered > prefetch.low_water:
+        prefetch.advance()
+    with instrumentation.scope("refill") as scope:
+        prefetch.advance()
+    return scope
+
+
+@when(parsers.parse("the theme ID {id_theme:d} is selected"))
+def select_theme(prefetch, id_theme):
+    prefetch.select([id_theme])
+
+
+@when("the background refill is done")
+def wait_for_refill(prefetch):
+    prefetch.wait()
+
+
+@then("the same card should be shown on every rerun")
+def check_same_card(shown):
+    assert len({card.id for card in shown}) == 1
+
+
+@then("no statement should be executed by the reruns")
+def check_no_statement(scope):
+    assert scope.total_statements == 0
+
+
+@then(parsers.parse("the refill should execute {counter:d} statement"))
+def check_refill_statements(scope, counter):
+    assert scope.total_statements == counter
+
+
+@then(parsers.parse("{counter:d} cards should be buffered"))
+def check_buffered(prefetch, counter):
+    assert prefetch.buffered == counter
+
+
+@then(parsers.parse("the current card should be in theme ID {id_theme:d}"))
+def check_current_theme(prefetch, id_theme):
+    assert prefetch.current().id_theme == id_theme
+
+
+@then(parsers.parse("every buffered card should be in theme ID {id_theme:d}"))
+def check_buffered_themes(prefetch, id_theme):
+    assert prefetch.buffered > 0
+    assert all(card.id_theme == id_theme for card in prefetch._buffer)
+
+
+@then("no card should be shown")
+def check_no_card(shown):
+    assert shown == [None]
+
+
+@then(parsers.parse('the next cards should start with "{ids}"'))
+def check_next_ids(prefetch, shown, ids):
+    ids = [int(id) for id in ids.split(",")]
+    cards = shown + list(prefetch._buffer)
+    # The due cards come first, drawn ones may follow
+    assert sorted(card.id for card in cards[: len(ids)]) == ids
+
+
+@when(parsers.parse('the question of the current card is changed to "{question}"'))
+def edit_current_card(prefetch, shown, question):
+    card = shown[-1]
+    shown.append(list(prefetch._buffer))
+    update_card(card.id, question, card.reponse, card.probabilite, card.id_theme)
+
+
+@when("the current card is deleted")
+def delete_current_card(shown):
+    delete_card(shown[-1].id)
+
+
+@then("no card should be shown twice in a row")
+def check_no_repeat(prefetch, shown):
+    ids = [card.id for card in shown + list(prefetch._buffer)]
+    assert len(ids) == len(set(ids))
+
+
+@then(parsers.parse('the current card should have the question "{question}"'))
+def check_current_question(prefetch, question):
+    assert prefetch.current().question == question
+
+
+@then("the buffer should have been reloaded")
+def check_reloaded(prefetch, shown):
+    before = shown[-1]
+    assert all(card not in before for card in prefetch._buffer)
+
+
+@then("the current card should not be the deleted one")
+def check_current_not_deleted(prefetch, shown):
+    card = prefetch.current()
+    assert card is not None and card.id != shown[-1].id
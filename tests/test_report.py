@@ -0,0 +1,121 @@
+from datetime import date, datetime
+
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db.config import setup_config
+from src.db.report import pending_in_period, period_range, prepare_data
+from src.db.services import create_card, get_stats_summary, record_answers
+from src.db.tables import init_db
+
+scenarios("features/report.feature")
+
+
+def parse_counts(text):
+    """Parse "day:correct/incorrect,..." into a dict of (correct, incorrect)."""
+    counts = {}
+    for item in text.split(","):
+        day, answers = item.split(":")
+        good, bad = answers.split("/")
+        counts[date.fromisoformat(day)] = (int(good), int(bad))
+    return counts
+
+
+def format_counts(counts):
+    return ",".join(
+        f"{day.isoformat()}:{good}/{bad}" for day, (good, bad) in sorted(counts.items())
+    )
+
+
+def parse_day(text):
+    return None if text == "None" else date.fromisoformat(text)
+
+
+@given("the database is initialized")
+def initialize_database():
+    setup_config(":memory:")
+    init_db()
+
+
+@given(parsers.parse("a card exists in theme ID {id_theme:d}"), target_fixture="card")
+def ensure_card_exists(id_theme):
+    return create_card("question", "reponse", 0.5, id_theme)
+
+
+@given(parsers.parse('the answers "{answers}" are recorded'))
+def record_answers_on_days(card, answers):
+    batch = []
+    for day, (good, bad) in parse_counts(answers).items():
+        answered_at = datetime.combine(day, datetime.min.time()).replace(hour=12)
+        batch += [(card.id, True, answered_at)] * good
+        batch += [(card.id, False, answered_at)] * bad
+    record_answers(batch)
+
+
+@given(parsers.parse('the pending answers "{answers}"'), target_fixture="pending")
+def pending_answers(answers):
+    return parse_counts(answers)
+
+
+@when(
+    parsers.parse('the period "{period}" is computed on {today}'),
+    target_fixture="period",
+)
+def compute_period(period, today):
+    return period_range(period, date.fromisoformat(today))
+
+
+@when(
+    parsers.parse("the pending answers are kept from {start} to {end}"),
+    target_fixture="pending",
+)
+def keep_pending_answers(pending, start, end):
+    return pending_in_period(pending, parse_day(start), parse_day(end))
+
+
+@when(
+    parsers.parse("the report is prepared from {start} to {end} by {bucket}"),
+    target_fixture="report",
+)
+def prepare_report(pending, start, end, bucket):
+    start, end = parse_day(start), parse_day(end)
+    summary = get_stats_summary(start_date=start, end_date=end, bucket=bucket)
+    return prepare_data(summary, pending_in_period(pending, start, end), bucket)
+
+
+@when(
+    parsers.parse("the report is prepared without summary by {bucket}"),
+    target_fixture="report",
+)
+def prepare_report_without_summary(pending, bucket):
+    return prepare_data(None, pending, bucket)
+
+
+@then(parsers.parse("the period should run from {start} to {end} by {bucket}"))
+def check_period(period, start, end, bucket):
+    assert period == (parse_day(start), parse_day(end), bucket)
+
+
+@then(parsers.parse('the pending answers should be "{expected}"'))
+def check_pending_answers(pending, expected):
+    assert format_counts(pending) == expected
+
+
+@then(parsers.parse('the report rows should be "{expected}"'))
+def check_report_rows(report, expected):
+    rows, _ = report
+    assert [row["date"] for row in rows] == sorted(row["date"] for row in rows)
+    counts = {
+        row["date"]: (row["bonnes_reponses"], row["mauvaises_reponses"]) for row in rows
+    }
+    assert len(counts) == len(rows)  # A single row per bucket
+    assert format_counts(counts) == expected
+
+
+@then(
+    parsers.parse(
+        "the report totals should be {correct:d} correct and {incorrect:d} incorrect answers"
+    )
+)
+def check_report_totals(report, correct, incorrect):
+    _, pie_data = report
+    assert pie_data["Nombre"] == [correct, incorrect]
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.services import (
+    add_reviews,
+    create_card,
+    get_theme_stats,
+    record_answer,
+    rollup_reviews,
+)
+from src.db.tables import Review, Stat, init_db
+
+scenarios("features/reviews.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(
+    parsers.parse(
+        "a card exists with ID {card_id:d} and probability {probability:f} and theme ID {id_theme:d}"
+    )
+)
+def ensure_card_exists(card_id, probability, id_theme):
+    card = create_card("question", "reponse", probability, id_theme)
+    assert card.id == card_id
+
+
+@when(
+    parsers.parse(
+        "a correct answer taking {latency_ms:d} ms is recorded for the card with ID {card_id:d}"
+    )
+)
+def record_correct_answer(card_id, latency_ms):
+    record_answer(card_id=card_id, is_correct=True, latency_ms=latency_ms)
+
+
+@given(
+    parsers.parse(
+        "{correct:d} correct and {incorrect:d} incorrect reviews exist for theme ID {id_theme:d}, {days:d} days ago"
+    )
+)
+def ensure_reviews_exist(correct, incorrect, id_theme, days):
+    reviewed_at = datetime.today() - timedelta(days=days)
+    reviews = [
+        {
+            "card_id": 1,
+            "theme_id": id_theme,
+            "reviewed_at": reviewed_at,
+            "correct": i < correct,
+        }
+        for i in range(correct + incorrect)
+    ]
+    assert add_reviews(reviews) == correct + incorrect
+
+
+@given("the reviews are rolled up", target_fixture="rolled_up")
+@when("the reviews are rolled up", target_fixture="rolled_up")
+def roll_up_reviews():
+    return rollup_reviews()
+
+
+@then(parsers.parse("the review log should contain {counter:d} reviews"))
+def check_review_count(session, counter):
+    assert session.query(Review).count() == counter
+
+
+@then(
+    parsers.parse(
+        "the last review should be correct for card {card_id:d} and theme {id_theme:d} with a latency of {latency_ms:d} ms"
+    )
+)
+def check_last_review(session, card_id, id_theme, latency_ms):
+    review = session.query(Review).order_by(Review.id.desc()).first()
+    assert review.correct
+    assert review.card_id == card_id
+    assert review.theme_id == id_theme
+    assert review.latency_ms == latency_ms
+
+
+@then(parsers.parse("{counter:d} reviews should have been rolled up"))
+def check_rolled_up(rolled_up, counter):
+    assert rolled_up == counter
+
+
+@then(
+    parsers.parse(
+        "the stat of {days:d} days ago should have {correct:d} correct answers and {incorrect:d} incorrect answers"
+    )
+)
+def check_stat(session, days, correct, incorrect):
+    date = (datetime.today() - timedelta(days=days)).date()
+    stat = session.query(Stat).filter_by(date=date).one()
+    assert stat.bonnes_reponses == correct
+    assert stat.mauvaises_reponses == incorrect
+
+
+@then(
+    parsers.parse(
+        "the theme ID {id_theme:d} stat of {days:d} days ago should have {correct:d} correct answers and {incorrect:d} incorrect answers"
+    )
+)
+def check_theme_stat(id_theme, days, correct, incorrect):
+    date = datetime.today() - timedelta(days=days)
+    (stat,) = get_theme_stats(id_theme, start_date=date, end_date=date)
+    assert stat.bonnes_reponses == correct
+    assert stat.mauvaises_reponses == incorrect
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.scheduler import MAX_INTERVAL, Schedule, due_at, review
+from src.db.services import (
+    create_card,
+    get_card,
+    get_or_create_user,
+    next_due_cards,
+    record_answer,
+)
+from src.db.tables import init_db
+
+scenarios("features/scheduler.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@pytest.fixture
+def cards():
+    return {}
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(
+    parsers.parse('a card exists with question "{question}" in theme ID {id_theme:d}')
+)
+def ensure_card_exists(cards, question, id_theme):
+    cards[question] = create_card(question, "reponse", 0.5, id_theme)
+
+
+@given(parsers.parse('the user "{name}" exists'), target_fixture="user")
+def ensure_user_exists(name):
+    return get_or_create_user(name)
+
+
+@when(
+    parsers.parse('"{name}" answers the card "{question}" {answer}ly {counter:d} times')
+)
+def user_answers_card(cards, user, name, question, answer, counter):
+    for _ in range(counter):
+        record_answer(cards[question].id, answer == "correct", user_id=user.id)
+
+
+@when(parsers.parse('the card "{question}" is answered {answer}ly {counter:d} times'))
+def answer_card(cards, question, answer, counter):
+    for _ in range(counter):
+        record_answer(cards[question].id, answer == "correct")
+
+
+@then(parsers.parse('the card "{question}" should be due in {days:d} days'))
+def check_due_date(cards, question, days):
+    due_in = get_card(cards[question].id).due_at - datetime.today()
+    assert timedelta(days=days) - timedelta(minutes=1) < due_in <= timedelta(days=days)
+
+
+@then(
+    parsers.parse(
+        'the card "{question}" should have {repetitions:d} repetitions and an ease of {ease:f}'
+    )
+)
+def check_schedule(cards, question, repetitions, ease):
+    card = get_card(cards[question].id)
+    assert card.repetitions == repetitions
+    assert card.ease == pytest.approx(ease)
+
+
+@then(
+    parsers.re(
+        r'the next (?P<n>\d+) due cards of themes ID "(?P<theme_ids>[\d,]+)"'
+        r'( for "(?P<name>\w+)")?( in (?P<days>\d+) days)? should be "(?P<questions>.*)"'
+    )
+)
+def check_due_cards(request, n, theme_ids, name, days, questions):
+    now = datetime.today() + timedelta(days=int(days or 0))
+    theme_ids = [int(id) for id in theme_ids.split(",")]
+    user_id = request.getfixturevalue("user").id if name else None
+    due = next_due_cards(theme_ids, int(n), now=now, user_id=user_id)
+    assert [card.question for card in due] == questions.split(",")
+
+
+def test_review_follows_sm2():
+    schedule = Schedule()
+    intervals = []
+    for _ in range(4):
+        schedule = review(schedule, 5)
+        intervals.append(schedule.interval)
+    assert intervals == [1, 6, 16, 45]
+    assert review(Schedule(ease=1.3), 0).ease == 1.3
+
+
+def test_interval_is_capped():
+    schedule = Schedule()
+    for _ in range(50):
+        schedule = review(schedule, 5)
+    assert schedule.interval == MAX_INTERVAL
+    assert due_at(schedule, datetime.today()) > datetime.today()
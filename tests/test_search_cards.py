@@ -0,0 +1,74 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.services import create_card, delete_card, search_cards, update_card
+from src.db.tables import init_db
+
+scenarios("features/search_cards.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(
+    parsers.parse(
+        'a card "{question}" with answer "{reponse}" exists in theme ID {id_theme:d}'
+    )
+)
+def ensure_card_exists(question, reponse, id_theme):
+    create_card(question, reponse, 0.5, id_theme)
+
+
+@given(
+    parsers.parse(
+        'the question of the card with ID {card_id:d} is changed to "{question}"'
+    )
+)
+def change_question(card_id, question):
+    update_card(card_id, question, "réponse", 0.5, 3)
+
+
+@given(parsers.parse("the card with ID {card_id:d} is deleted"))
+def remove_card(card_id):
+    delete_card(card_id)
+
+
+@when(
+    parsers.re(r'the cards are searched for "(?P<query>.+)"$'),
+    target_fixture="found",
+)
+def search(query):
+    return search_cards(query)
+
+
+@when(
+    parsers.parse('the cards of theme ID {id_theme:d} are searched for "{query}"'),
+    target_fixture="found",
+)
+def search_in_theme(id_theme, query):
+    return search_cards(query, theme_ids=[id_theme])
+
+
+@then(parsers.parse('the found questions should be "{questions}"'))
+def check_found(found, questions):
+    assert sorted(card.question for card in found) == sorted(questions.split(","))
+
+
+@then("no card should be found")
+def check_nothing_found(found):
+    assert found == []
@@ -0,0 +1,45 @@
+import sys
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db import startup
+from src.db.config import setup_config
+from src.db.startup import lazy_import
+from src.db.tables import init_db
+
+scenarios("features/startup.feature")
+
+
+@pytest.fixture(autouse=True)
+def timings():
+    yield startup.timings
+    startup.timings.reset()
+
+
+@given("the startup timings are reset")
+def reset_timings(timings):
+    timings.reset()
+
+
+@given(parsers.parse('the module "{name}" is not imported yet'))
+def unload_module(monkeypatch, name):
+    monkeypatch.delitem(sys.modules, name, raising=False)
+
+
+@when("the database is initialized")
+def initialize_database():
+    setup_config(":memory:")
+    init_db()
+
+
+@when(parsers.parse('the module "{name}" is lazily imported {counter:d} times'))
+def import_module(name, counter):
+    modules = {lazy_import(name) for _ in range(counter)}
+    assert modules == {sys.modules[name]}
+
+
+@then(parsers.parse('the startup steps should be "{steps}"'))
+def check_steps(timings, steps):
+    assert [row["étape"] for row in timings.rows()] == steps.split(",")
+    assert timings.total_seconds >= 0
@@ -1,5 +1,5 @@
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Literal
 
 import pytest
@@ -11,6 +11,9 @@ from src.db.services import (
     create_card,
     get_card,
     get_stats,
+    get_stats_summary,
+    record_answer,
+    record_answers,
     update_card_probability,
     update_stats,
 )
@@ -54,6 +57,11 @@ def update_card_probability_with_id(
     update_card_probability(card_id=int(card_id), is_correct=correct)
 
 
+@when(parsers.parse("a {is_correct} answer is recorded for the card with ID {card_id}"))
+def record_answer_for_card(card_id, is_correct: Literal["correct", "incorrect"]):
+    record_answer(card_id=int(card_id), is_correct=is_correct == "correct")
+
+
 @then(
     parsers.parse(
         "the card with ID {card_id} should have the probability {probability}"
@@ -119,6 +127,21 @@ def ensure_no_stats_exists(session):
     assert stat is None
 
 
+@when(
+    parsers.parse(
+        "a batch of {correct:d} correct and {incorrect:d} incorrect answers is recorded for the card with ID {card_id:d}"
+    )
+)
+def record_batch_of_answers(correct, incorrect, card_id):
+    answers = [(card_id, True, None)] * correct + [(card_id, False, None)] * incorrect
+    assert len(record_answers(answers)) == correct + incorrect
+
+
+@then("the daily stat should still not exist")
+def check_no_stats_exists(session):
+    ensure_no_stats_exists(session)
+
+
 @given(parsers.parse("{counter} stats exists"))
 def ensure_stats_exists(counter):
     for i in range(int(counter)):
@@ -140,3 +163,47 @@ def retrieve_stats():
 @then(parsers.parse("{exp_counter} stats are retrieved"))
 def check_retrieved_stats(retrieved_cards, exp_counter):
     assert len(retrieved_cards) == int(exp_counter)
+
+
+@given(
+    parsers.parse(
+        "one correct and two incorrect answers each day from {first} to {last}"
+    )
+)
+def ensure_daily_stats_exist(first, last):
+    day, last = date.fromisoformat(first), date.fromisoformat(last)
+    while day <= last:
+        add_row(table=Stat, date=day, bonnes_reponses=1, mauvaises_reponses=2)
+        day += timedelta(days=1)
+
+
+@when(
+    parsers.parse("the stats from {start} to {end} are summarized by {bucket}"),
+    target_fixture="summary",
+)
+def summarize_stats(start, end, bucket):
+    return get_stats_summary(
+        datetime.fromisoformat(start), datetime.fromisoformat(end), bucket
+    )
+
+
+@then(
+    parsers.parse(
+        "the totals should be {correct:d} correct and {incorrect:d} incorrect answers"
+    )
+)
+def check_summary_totals(summary, correct, incorrect):
+    assert summary["bonnes_reponses"] == correct
+    assert summary["mauvaises_reponses"] == incorrect
+
+
+@then(parsers.parse('the series should be "{expected}"'))
+def check_summary_series(summary, expected):
+    series = summary["series"]
+    assert (
+        ",".join(
+            f"{day.isoformat()}:{good}"
+            for day, good in zip(series["date"], series["bonnes_reponses"])
+        )
+        == expected
+    )
@@ -0,0 +1,116 @@
+from datetime import date
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import func
+
+from src.db import config, services
+from src.db.config import setup_config
+from src.db.synthetic import generate
+from src.db.tables import Card, Review, Stat, Theme, init_db
+
+scenarios("features/synthetic_data.feature")
+
+END_DATE = date(2024, 6, 30)
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+def _cards(session):
+    return [
+        (card.question, card.reponse, card.probabilite, card.id_theme)
+        for card in session.query(Card).order_by(Card.id)
+    ]
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(parsers.parse("the database fails to write the {rows}"))
+def fail_writes(monkeypatch, rows):
+    service = {"cards": "create_cards", "reviews": "add_reviews"}[rows]
+    monkeypatch.setattr(services, service, lambda *args, **kwargs: None)
+
+
+@when(
+    parsers.parse(
+        "a synthetic dataset of {n_cards:d} cards in {n_themes:d} themes "
+        "is generated with seed {seed:d}"
+    ),
+    target_fixture="summary",
+)
+def generate_dataset(n_cards, n_themes, seed):
+    return generate(
+        n_cards, n_themes, seed=seed, days=30, reviews_per_day=20, end_date=END_DATE
+    )
+
+
+@then(
+    parsers.parse(
+        "the database should contain {n_cards:d} synthetic cards in {n_themes:d} themes"
+    )
+)
+def check_counts(session, n_cards, n_themes):
+    assert session.query(Card).count() == n_cards
+    assert (
+        session.query(Theme).filter(Theme.theme.like("Synthetic theme %")).count()
+        == n_themes
+    )
+
+
+@then("every card probability should be between 0.1 and 1")
+def check_probabilities(session):
+    low, high = session.query(
+        func.min(Card.probabilite), func.max(Card.probabilite)
+    ).one()
+    assert 0.1 <= low <= high <= 1
+
+
+@then("the first theme should be the largest")
+def check_skew(session):
+    sizes = (
+        session.query(Card.id_theme, func.count(Card.id))
+        .group_by(Card.id_theme)
+        .order_by(func.count(Card.id).desc())
+        .all()
+    )
+    first = session.query(Theme).filter_by(theme="Synthetic theme 0000").one()
+    assert sizes[0][0] == first.id
+
+
+@then("the daily stats should match the generated reviews")
+def check_stats(session, summary):
+    good, bad = session.query(
+        func.sum(Stat.bonnes_reponses), func.sum(Stat.mauvaises_reponses)
+    ).one()
+    assert good + bad == summary["reviews"]
+    assert session.query(func.max(Stat.date)).scalar() == END_DATE
+
+
+@then(parsers.parse("generating again with seed {seed:d} should append the same cards"))
+def check_determinism(session, seed):
+    first = _cards(session)
+    generate(len(first), 5, seed=seed, days=30, reviews_per_day=20, end_date=END_DATE)
+    assert _cards(session)[len(first) :] == first
+
+
+@then(parsers.parse('generating a synthetic dataset should fail with "{error}"'))
+def check_generation_fails(error):
+    with pytest.raises(RuntimeError, match=error):
+        generate(20, 2, days=1, reviews_per_day=20, end_date=END_DATE)
+
+
+@then("no review should be written")
+def check_no_review(session):
+    assert session.query(func.count(Review.id)).scalar() == 0
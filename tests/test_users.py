@@ -0,0 +1,215 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import select
+
+from src.db import config
+from src.db.config import setup_config
+from src.db.sampler import sampler
+from src.db.services import (
+    create_card,
+    delete_user,
+    draw_card,
+    get_all_users,
+    get_card,
+    get_or_create_user,
+    get_stats_summary,
+    get_theme_stats,
+    record_answer,
+    rollup_reviews,
+    sample_card,
+)
+from src.db.tables import UserCardState, init_db
+
+scenarios("features/users.feature")
+
+
+@pytest.fixture
+def session():
+    # Use an in-memory database for tests
+    TEST_DATABASE_URL = ":memory:"  # In-memory database
+    setup_config(TEST_DATABASE_URL)
+
+    init_db()  # Initialize the in-memory database for each test
+    with config.get_session() as session:
+        yield session
+
+
+@pytest.fixture
+def cards():
+    return {}
+
+
+@pytest.fixture
+def users():
+    return {}
+
+
+@given("the database is initialized", target_fixture="init_database")
+def initialize_database(session):
+    pass  # Nothing to do here
+
+
+@given(
+    parsers.parse(
+        'a card exists with question "{question}" and probability {probability:f} and theme ID {id_theme:d}'
+    )
+)
+def ensure_card_exists(cards, question, probability, id_theme):
+    cards[question] = create_card(question, "reponse", probability, id_theme)
+
+
+@given(parsers.parse('the users "{names}" exist'))
+def ensure_users_exist(users, names):
+    for name in names.split(","):
+        users[name] = get_or_create_user(name)
+
+
+@given(
+    parsers.parse(
+        '{counter:d} cards are drawn {method} from theme ID {id_theme:d} for "{name}"'
+    ),
+    target_fixture="drawn_cards",
+)
+@when(
+    parsers.parse(
+        '{counter:d} cards are drawn {method} from theme ID {id_theme:d} for "{name}"'
+    ),
+    target_fixture="drawn_cards",
+)
+def draw_cards(users, counter, method, id_theme, name):
+    user_id = users[name].id
+    if method == "in SQL":
+        return [draw_card([id_theme], user_id=user_id) for _ in range(counter)]
+    rng = random.Random(42)
+    return [sample_card([id_theme], rng=rng, user_id=user_id) for _ in range(counter)]
+
+
+@when(
+    parsers.parse('"{name}" answers the card "{question}" {answer}ly {counter:d} times')
+)
+def answer_card_several_times(cards, users, name, question, answer, counter):
+    for _ in range(counter):
+        record_answer(cards[question].id, answer == "correct", user_id=users[name].id)
+
+
+@when(parsers.parse('"{name}" answers the card "{question}" {answer}ly'))
+def answer_card(cards, users, name, question, answer):
+    record_answer(cards[question].id, answer == "correct", user_id=users[name].id)
+
+
+@given(parsers.parse("the sampler keeps {counter:d} user indexes"))
+def limit_user_indexes(monkeypatch, counter):
+    monkeypatch.setattr(sampler, "max_user_indexes", counter)
+
+
+@when(parsers.parse('the user "{name}" is deleted'))
+def delete_user_by_name(users, name):
+    delete_user(users[name].id)
+
+
+@then(
+    parsers.parse(
+        'the shared probability of the card "{question}" should be {probability:f}'
+    )
+)
+def check_card_probability(cards, question, probability):
+    assert get_card(cards[question].id).probabilite == pytest.approx(probability)
+
+
+def user_probability(session, card_id, user_id):
+    return session.scalar(
+        select(UserCardState.probabilite).where(
+            UserCardState.card_id == card_id, UserCardState.user_id == user_id
+        )
+    )
+
+
+@then(
+    parsers.parse(
+        'the probability of the card "{question}" for "{name}" should be {probability:f}'
+    )
+)
+def check_user_probability(session, cards, users, question, name, probability):
+    value = user_probability(session, cards[question].id, users[name].id)
+    assert value == pytest.approx(probability)
+
+
+@then(parsers.parse('the card "{question}" should have no probability for "{name}"'))
+def check_no_user_probability(session, cards, users, question, name):
+    assert user_probability(session, cards[question].id, users[name].id) is None
+
+
+@then(
+    parsers.parse(
+        'the stats of "{name}" should count {correct:d} correct and {incorrect:d} incorrect answers'
+    )
+)
+def check_user_stats(users, name, correct, incorrect):
+    summary = get_stats_summary(user_id=users[name].id)
+    assert (summary["bonnes_reponses"], summary["mauvaises_reponses"]) == (
+        correct,
+        incorrect,
+    )
+
+
+@then(
+    parsers.parse(
+        "the shared stats should count {correct:d} correct and {incorrect:d} incorrect answers"
+    )
+)
+def check_shared_stats(correct, incorrect):
+    summary = get_stats_summary()
+    assert (summary["bonnes_reponses"], summary["mauvaises_reponses"]) == (
+        correct,
+        incorrect,
+    )
+
+
+@then(
+    parsers.parse(
+        "the stats of theme ID {id_theme:d} should count {correct:d} correct "
+        "and {incorrect:d} incorrect answers"
+    )
+)
+def check_theme_stats(id_theme, correct, incorrect):
+    stats = get_theme_stats(id_theme)
+    assert sum(s.bonnes_reponses for s in stats) == correct
+    assert sum(s.mauvaises_reponses for s in stats) == incorrect
+
+
+@then("no review should be left to roll up")
+def check_rolled_up():
+    assert rollup_reviews() == 0
+
+
+@then(
+    parsers.parse(
+        'the card "{frequent}" should be drawn about {factor:d} times more often than "{rare}"'
+    )
+)
+def check_draw_ratio(drawn_cards, frequent, rare, factor):
+    # The SQL draws cannot be seeded: allow 5 standard deviations of the
+    # binomial count of the rare card
+    counter = Counter(card.question for card in drawn_cards)
+    n, p = counter[frequent] + counter[rare], 1 / (factor + 1)
+    assert abs(counter[rare] - n * p) < 5 * math.sqrt(n * p * (1 - p))
+
+
+@then(parsers.parse('the sampler should keep the indexes of "{names}"'))
+def check_user_indexes(users, names):
+    expected = [(users[name].id, 1) for name in names.split(",")]
+    assert sampler.user_indexes == expected
+
+
+@then(parsers.parse('only the card "{question}" should be drawn'))
+def check_only_card_drawn(drawn_cards, question):
+    assert {card.question for card in drawn_cards} == {question}
+
+
+@then(parsers.parse('the users should be listed as "{names}"'))
+def check_users_listed(names):
+    assert ",".join(user.name for user in get_all_users()) == names
@@ -0,0 +1,124 @@
+import threading
+from datetime import datetime
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from src.db.write_behind import WriteBehindQueue
+
+scenarios("features/write_behind.feature")
+
+
+class RecordingWriter:
+    """Fake writer keeping the batches in memory."""
+
+    def __init__(self, failures: int = 0, blocked: bool = False):
+        self.batches = []
+        self.failures = failures
+        self.poisoned = set()  # IDs of the cards whose answers always fail
+        self.unblocked = threading.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    def __call__(self, batch):
+        self.unblocked.wait()
+        if any(event.card_id in self.poisoned for event in batch):
+            return None
+        if self.failures:
+            self.failures -= 1
+            return None
+        self.batches.append(list(batch))
+        return [(event.card_id, 1, 0.5) for event in batch]
+
+
+@pytest.fixture
+def writer():
+    return RecordingWriter()
+
+
+@given("a write-behind queue with a blocked writer", target_fixture="answers_queue")
+def blocked_queue(writer):
+    writer.unblocked.clear()
+    answers_queue = WriteBehindQueue(batch_size=10, flush_interval=0.01, writer=writer)
+    yield answers_queue
+    writer.unblocked.set()
+    answers_queue.stop()
+
+
+@given(
+    parsers.parse("a write-behind queue with batches of {batch_size:d} answers"),
+    target_fixture="answers_queue",
+)
+def batched_queue(writer, batch_size):
+    return WriteBehindQueue(batch_size=batch_size, flush_interval=0.01, writer=writer)
+
+
+@given("a write-behind queue whose writer fails once", target_fixture="answers_queue")
+def failing_queue(writer):
+    writer.failures = 1
+    return WriteBehindQueue(batch_size=10, flush_interval=0.01, writer=writer)
+
+
+@given(
+    parsers.parse(
+        "a write-behind queue whose writer always fails on card ID {card_id:d}"
+    ),
+    target_fixture="answers_queue",
+)
+def poisoned_queue(writer, card_id):
+    writer.poisoned.add(card_id)
+    return WriteBehindQueue(
+        batch_size=10, flush_interval=0.01, writer=writer, max_retries=2
+    )
+
+
+@when(parsers.parse("an answer for the card ID {card_id:d} is submitted"))
+def submit_answer(answers_queue, card_id):
+    answers_queue.submit(card_id=card_id, is_correct=True)
+
+
+@when(
+    parsers.parse(
+        "{correct:d} correct and {incorrect:d} incorrect answers are submitted"
+    )
+)
+def submit_answers(answers_queue, correct, incorrect):
+    for _ in range(correct):
+        answers_queue.submit(card_id=1, is_correct=True)
+    for _ in range(incorrect):
+        answers_queue.submit(card_id=1, is_correct=False)
+
+
+@when("the queue is stopped")
+def stop_queue(answers_queue):
+    answers_queue.stop()
+
+
+@then(parsers.parse("{counter:d} answers should be pending"))
+def check_pending(answers_queue, counter):
+    assert answers_queue.pending() == counter
+
+
+@then(
+    parsers.parse(
+        "today should have {correct:d} correct and {incorrect:d} incorrect pending answers"
+    )
+)
+def check_pending_counts(answers_queue, correct, incorrect):
+    today = datetime.today().date()
+    assert answers_queue.pending_counts() == {today: (correct, incorrect)}
+
+
+@then(parsers.parse("{counter:d} answers should have been written"))
+def check_written(writer, counter):
+    assert sum(len(batch) for batch in writer.batches) == counter
+
+
+@then(parsers.parse("no batch should contain more than {batch_size:d} answers"))
+def check_batch_size(writer, batch_size):
+    assert all(len(batch) <= batch_size for batch in writer.batches)
+
+
+@then(parsers.parse("{counter:d} answer should have been given up"))
+def check_dead_letters(answers_queue, counter):
+    assert [event.card_id for event in answers_queue.dead_letters] == [99] * counter